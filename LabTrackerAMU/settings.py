@@ -95,6 +95,26 @@ DATABASES = {
     }
 }
 
+# Caches shared by every web and worker process: 'default' (GitHub signup checks, ...) and 'reports'
+# (faculty reports, see problems/report_cache.py)
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND','django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION',os.path.join(BASE_DIR,'django_cache')),
+    },
+    'reports': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('REPORT_CACHE_LOCATION',os.path.join(BASE_DIR,'django_cache','reports')),
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+
+# Seconds a cached faculty report is kept (it is invalidated earlier when its data changes)
+REPORT_CACHE_TIMEOUT=int(os.getenv('REPORT_CACHE_TIMEOUT','86400'))
+
+# Directory holding the cached report downloads (CSV, XLSX, PDF)
+REPORT_EXPORT_DIR=os.getenv('REPORT_EXPORT_DIR',os.path.join(BASE_DIR,'django_cache','exports'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -147,6 +167,73 @@ TEACHER_PASSWORD_BASE=os.getenv('TEACHER_PASSWORD_BASE')
 GITHUB_TOKEN=os.getenv('GITHUB_TOKEN')
 GITHUB_TOKEN2=os.getenv('GITHUB_TOKEN2')
 
+# Every token the GitHub sync spreads its requests over (GITHUB_EXTRA_TOKENS is comma separated)
+GITHUB_TOKENS=list(dict.fromkeys(
+    token for token in [GITHUB_TOKEN,GITHUB_TOKEN2,*os.getenv('GITHUB_EXTRA_TOKENS','').split(',')] if token
+))
+
+# Sustained GitHub request rate allowed across all tokens
+GITHUB_REQUESTS_PER_SECOND=float(os.getenv('GITHUB_REQUESTS_PER_SECOND','10'))
+
+# Number of student repositories fetched from GitHub in parallel by the sync
+GITHUB_SYNC_CONCURRENCY=int(os.getenv('GITHUB_SYNC_CONCURRENCY','8'))
+
+# Number of cohort shards the nightly sync runs in parallel, each in its own process. SQLite lets a single
+# process write at a time, so several processes are only worth it on a server database such as PostgreSQL.
+GITHUB_SYNC_PROCESSES=int(os.getenv('GITHUB_SYNC_PROCESSES',
+                                    '1' if DATABASES['default']['ENGINE'].endswith('sqlite3') else '2'))
+
+# Seconds to wait for GitHub's answer, and how many times a transient failure is retried
+GITHUB_TIMEOUT=float(os.getenv('GITHUB_TIMEOUT','20'))
+GITHUB_MAX_RETRIES=int(os.getenv('GITHUB_MAX_RETRIES','3'))
+
+# Longest Retry-After or backoff (in seconds) a GitHub call waits before retrying instead of giving up
+GITHUB_MAX_RETRY_WAIT=float(os.getenv('GITHUB_MAX_RETRY_WAIT','60'))
+
+# Longest time (in seconds) a web request waits for a GitHub token before giving up; the sync waits as long as needed
+GITHUB_WEB_TOKEN_WAIT=float(os.getenv('GITHUB_WEB_TOKEN_WAIT','1'))
+
+# Consecutive GitHub failures after which calls fail fast, and for how many seconds
+GITHUB_BREAKER_THRESHOLD=int(os.getenv('GITHUB_BREAKER_THRESHOLD','5'))
+GITHUB_BREAKER_COOLDOWN=float(os.getenv('GITHUB_BREAKER_COOLDOWN','30'))
+
+# Folder holding cached GitHub responses and their ETag/Last-Modified validators
+GITHUB_CACHE_DIR=os.getenv('GITHUB_CACHE_DIR',os.path.join(BASE_DIR,'github_cache'))
+
+# Cached GitHub responses unused for this many seconds are pruned after each sync, and the oldest ones beyond
+# this many bytes in total
+GITHUB_CACHE_MAX_AGE=int(os.getenv('GITHUB_CACHE_MAX_AGE',str(30*24*3600)))
+GITHUB_CACHE_MAX_BYTES=int(os.getenv('GITHUB_CACHE_MAX_BYTES',str(512*1024*1024)))
+
+# Where the sync reads repositories from: 'api' (GitHub REST API) or 'mirror' (local bare clones)
+GITHUB_SYNC_BACKEND=os.getenv('GITHUB_SYNC_BACKEND','api')
+
+# Folder holding the bare clones of the 'mirror' backend, and the remote URL they are cloned from
+GITHUB_MIRROR_DIR=os.getenv('GITHUB_MIRROR_DIR',os.path.join(BASE_DIR,'github_mirrors'))
+GITHUB_MIRROR_URL=os.getenv('GITHUB_MIRROR_URL','https://github.com/{owner}/{repo}.git')
+
+# Cohorts with a week deadline within this many hours are also synced every hour
+SYNC_DEADLINE_WINDOW_HOURS=int(os.getenv('SYNC_DEADLINE_WINDOW_HOURS','48'))
+
+# GitHub requests per hour the hourly deadline sync may spend
+SYNC_DEADLINE_BUDGET=int(os.getenv('SYNC_DEADLINE_BUDGET','2000'))
+
+# Seconds signup waits for GitHub before accepting an account provisionally
+GITHUB_SIGNUP_TIMEOUT=float(os.getenv('GITHUB_SIGNUP_TIMEOUT','3'))
+
+# Seconds an existing / a missing GitHub account or repository is remembered by the signup checker
+GITHUB_EXISTS_TTL=int(os.getenv('GITHUB_EXISTS_TTL','86400'))
+GITHUB_MISSING_TTL=int(os.getenv('GITHUB_MISSING_TTL','300'))
+
+# Secret shared with GitHub to sign push webhook deliveries (the webhook is disabled when unset)
+GITHUB_WEBHOOK_SECRET=os.getenv('GITHUB_WEBHOOK_SECRET')
+
+# Seconds a cohort's refresh lease lasts without being renewed by the worker running it
+REFRESH_LEASE_SECONDS=int(os.getenv('REFRESH_LEASE_SECONDS','300'))
+
+# Seconds after a finished refresh during which new requests for the same cohort reuse its result
+REFRESH_COOLDOWN_SECONDS=int(os.getenv('REFRESH_COOLDOWN_SECONDS','600'))
+
 AUTHENTICATION_BACKENDS = [
     'django.contrib.auth.backends.ModelBackend',  # Default for students
     'faculty.backends.FacultyBackend',
@@ -0,0 +1,144 @@
+"""
+The faculty activity feed: one formatter and one paginator for the activity pages and the dashboard previews.
+
+Pages are read with keyset pagination on (timestamp, id): a page is the `per_page` activities after (or
+before) the last row of the previous page, so each page costs a single indexed query whatever its position,
+and only the rows on the page are loaded, joined with their faculty member, and formatted.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateformat import format
+from django.utils.html import format_html
+
+ACTIVITY_MESSAGES = {
+    'Added Problem': "{actor} added a problem in {course}, Sem {semester} in Week {week} <br> Problem Description : {description}",
+    'Edited Problem': "{actor} edited a problem in {course}, Sem {semester} in Week {week} <br> Problem Description : {description}",
+    'Viewed Class Report': "{actor} viewed the class report of {course}, Sem {semester}",
+    'Downloaded Class Report': "{actor} downloaded the class report of {course}, Sem {semester}",
+    'Started a New Semester': "{actor} started a new Semester",
+    'Updated the data': "{actor} updated the data for {course}, Sem {semester}",
+    'Viewed Weekly Class Report': "{actor} viewed the weekly report of {course}, Sem {semester}, Week {week}",
+    'Downloaded Weekly Class Report': "{actor} downloaded the weekly report of {course}, Sem {semester}, Week {week}",
+    'Set Last Date': "{actor} set the last date for {course}, Sem {semester}, Week {week} as {description}",
+}
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def format_activity(activity, viewer, with_timestamp=True):
+    """
+    Formats an activity as the HTML shown in the feeds.
+
+    :param activity: The `FacultyActivity` to format, with its faculty member loaded.
+    :param viewer: The faculty member looking at the feed; their own activities are attributed to "You".
+    :param with_timestamp: Whether to prefix the message with the local time of the activity.
+    :return: The message, with the activity's fields escaped.
+    """
+    message = ACTIVITY_MESSAGES.get(activity.action)
+    if message is None:
+        return "Unknown activity"
+
+    actor = "You" if activity.faculty_id == viewer.pk else activity.faculty.name
+    text = format_html(message, actor=actor, course=activity.course, semester=activity.semester,
+                       week=activity.week, description=activity.description)
+    if with_timestamp:
+        text = format_html("{} : {}", format(timezone.localtime(activity.timestamp), 'd F Y, H:i'), text)
+    return text
+
+
+def encode_cursor(activity):
+    """
+    Encodes the position of an activity in the feed as `<microseconds since the epoch>-<id>`.
+    """
+    return f"{(activity.timestamp - EPOCH) // timedelta(microseconds=1)}-{activity.pk}"
+
+
+def decode_cursor(cursor):
+    """
+    Decodes a cursor made by `encode_cursor` into a (timestamp, id) pair, or returns None if it is malformed.
+    """
+    try:
+        microseconds, pk = cursor.split('-')
+        return EPOCH + timedelta(microseconds=int(microseconds)), int(pk)
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
+class ActivityPage:
+    """
+    One page of the activity feed, newest first.
+
+    Attributes:
+        activities (list): The formatted activities of the page.
+        has_next (bool): Whether older activities exist.
+        has_previous (bool): Whether newer activities exist.
+        next_cursor (str): Cursor to pass as `after` to get the next (older) page.
+        previous_cursor (str): Cursor to pass as `before` to get the previous (newer) page.
+    """
+
+    def __init__(self, activities, has_next, has_previous, next_cursor, previous_cursor):
+        self.activities = activities
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.activities)
+
+    def __len__(self):
+        return len(self.activities)
+
+
+def activity_page(activities, viewer, after=None, before=None, oldest=False, per_page=15, with_timestamp=True):
+    """
+    Reads and formats one page of an activity feed.
+
+    Without a cursor the newest page is returned. With `after`, the page of activities just older than the
+    cursor; with `before`, the page just newer than it; with `oldest`, the last page.
+
+    :param activities: Queryset of the `FacultyActivity` rows of the feed.
+    :param viewer: The faculty member looking at the feed.
+    :param after: Cursor (see `encode_cursor`) of the last activity of the previous page.
+    :param before: Cursor of the first activity of the next page.
+    :param oldest: Whether to return the oldest page.
+    :param per_page: Number of activities per page.
+    :param with_timestamp: Whether to prefix each message with the time of the activity.
+    :return: An `ActivityPage`.
+    """
+    activities = activities.select_related('faculty')
+    newest_first = ('-timestamp', '-id')
+    oldest_first = ('timestamp', 'id')
+
+    after, before = decode_cursor(after), decode_cursor(before)
+    if after:
+        timestamp, pk = after
+        rows = activities.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=pk)).order_by(*newest_first)
+    elif before:
+        timestamp, pk = before
+        rows = activities.filter(Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, id__gt=pk)).order_by(*oldest_first)
+    elif oldest:
+        rows = activities.order_by(*oldest_first)
+    else:
+        rows = activities.order_by(*newest_first)
+
+    # One extra row tells whether there is another page in the reading direction
+    rows = list(rows[:per_page + 1])
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if before or oldest:
+        rows.reverse()
+        has_next, has_previous = bool(before), more
+    else:
+        has_next, has_previous = more, bool(after)
+
+    return ActivityPage(
+        [format_activity(activity, viewer, with_timestamp) for activity in rows],
+        has_next=has_next and bool(rows),
+        has_previous=has_previous and bool(rows),
+        next_cursor=encode_cursor(rows[-1]) if rows else None,
+        previous_cursor=encode_cursor(rows[0]) if rows else None,
+    )
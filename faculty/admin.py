@@ -1,6 +1,6 @@
 
 from django.contrib import admin
-from .models import Faculty, FacultyActivity, LastDateOfWeek
+from .models import CohortRefreshLease, DataUpdateJob, Faculty, FacultyActivity, LastDateOfWeek
 from django.conf import settings
 
 class FacultyAdmin(admin.ModelAdmin):
@@ -56,3 +56,17 @@ class LastDateOfWeekAdmin(admin.ModelAdmin):
     ordering = ('course', 'semester', 'week')  # Default ordering
 
 admin.site.register(LastDateOfWeek, LastDateOfWeekAdmin)  # Register LastDateOfWeek model
+
+
+class DataUpdateJobAdmin(admin.ModelAdmin):
+    list_display = ('course', 'semester', 'faculty', 'status', 'done', 'total', 'errors', 'created_at')  # Fields to display in the list view
+    list_filter = ('status', 'course', 'semester')  # Fields to filter the list view
+    ordering = ('-created_at',)  # Latest jobs first
+
+admin.site.register(DataUpdateJob, DataUpdateJobAdmin)  # Register DataUpdateJob model
+
+class CohortRefreshLeaseAdmin(admin.ModelAdmin):
+    list_display = ('course', 'semester', 'job', 'expires_at')  # Fields to display in the list view
+    ordering = ('course', 'semester')  # Default ordering
+
+admin.site.register(CohortRefreshLease, CohortRefreshLeaseAdmin)  # Register CohortRefreshLease model
@@ -0,0 +1,209 @@
+"""
+Server-side exports of the class reports as CSV, XLSX and PDF files.
+
+Every export is a table: a title, header rows, an iterator of data rows and relative column widths. The
+writers consume the rows one at a time and write them straight to the output file, so a report is never
+held in memory as a whole: XLSX files are written by openpyxl's write-only workbook, and PDF pages are
+drawn on a ReportLab canvas as the rows arrive.
+"""
+import csv
+import io
+import itertools
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font
+from openpyxl.utils import get_column_letter
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+
+from faculty.utils import iter_whole_class_report, weekly_class_report
+
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'pdf': 'application/pdf',
+}
+
+# Short forms of the submission statuses, used in the PDF class report where every week has a single column
+STATUS_ABBREVIATIONS = {'On Time': 'OT', 'Late': 'L', '----': 'NC', '-----': '-'}
+STATUS_LEGEND = 'OT: On Time, L: Late, NC: Not Committed, -: No last date set'
+
+
+def commit_date(last_commit_time):
+    """
+    Formats a commit time as the report pages do (DD-MM-YYYY), keeping "No Commits" as is.
+    """
+    if last_commit_time == "No Commits" or last_commit_time is None:
+        return "No Commits"
+    return last_commit_time.strftime('%d-%m-%Y')
+
+
+def write_csv(file, title, header, rows, widths):
+    """
+    Writes a table as UTF-8 CSV (with a byte order mark, so Excel detects the encoding).
+    """
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    writer = csv.writer(text)
+    writer.writerows(header)
+    for row in rows:
+        writer.writerow(row)
+    text.flush()
+    text.detach()
+
+
+def write_xlsx(file, title, header, rows, widths):
+    """
+    Writes a table as an XLSX workbook with one sheet, using openpyxl's write-only mode.
+    """
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(title[:31])
+    for index, width in enumerate(widths, start=1):
+        worksheet.column_dimensions[get_column_letter(index)].width = width
+
+    def styled(values, font):
+        cells = []
+        for value in values:
+            cell = WriteOnlyCell(worksheet, value=value)
+            cell.font = font
+            cell.alignment = Alignment(horizontal='center', vertical='center')
+            cells.append(cell)
+        return cells
+
+    for number, values in enumerate(header):
+        worksheet.append(styled(values, Font(bold=True, size=14 if number == 0 else 11)))
+    for row in rows:
+        worksheet.append(styled(row, Font()))
+    workbook.save(file)
+
+
+def write_pdf(file, title, header, rows, widths, footer=None):
+    """
+    Writes a table as a landscape A4 PDF, repeating the header rows on every page.
+
+    The columns share the width of the page in proportion to `widths`, and the font size shrinks so that the
+    widest reports (many weeks) still fit. Cell text that does not fit its column is truncated.
+    """
+    page_width, page_height = landscape(A4)
+    margin, row_height = 30, 14
+    scale = (page_width - 2 * margin) / sum(widths)
+    columns = [width * scale for width in widths]
+    font_size = max(5, min(9, min(columns) / 4))
+
+    pdf = canvas.Canvas(file, pagesize=(page_width, page_height))
+    pdf.setTitle(title)
+    y = 0
+
+    def draw_row(values, font, background=None):
+        nonlocal y
+        x = margin
+        if background:
+            pdf.setFillColor(background)
+            pdf.rect(margin, y - row_height, page_width - 2 * margin, row_height, stroke=0, fill=1)
+        pdf.setFillColor(colors.white if background else colors.black)
+        pdf.setFont(font, font_size)
+        for value, width in zip(values, columns):
+            text = str(value)
+            while text and stringWidth(text, font, font_size) > width - 4:
+                text = text[:-1]
+            pdf.drawCentredString(x + width / 2, y - row_height + 4, text)
+            x += width
+        pdf.setStrokeColor(colors.grey)
+        pdf.line(margin, y - row_height, page_width - margin, y - row_height)
+        y -= row_height
+
+    def new_page():
+        nonlocal y
+        pdf.setFont("Helvetica-Bold", 14)
+        pdf.setFillColor(colors.maroon)
+        pdf.drawString(margin, page_height - margin, title)
+        if footer:
+            pdf.setFont("Helvetica", 7)
+            pdf.setFillColor(colors.black)
+            pdf.drawString(margin, margin / 2, footer)
+        y = page_height - margin - 10
+        for values in header:
+            draw_row(values, "Helvetica-Bold", colors.Color(47 / 255, 98 / 255, 86 / 255))
+
+    new_page()
+    for row in rows:
+        if y - row_height < margin:
+            pdf.showPage()
+            new_page()
+        draw_row(row, "Helvetica")
+    pdf.save()
+
+
+WRITERS = {'csv': write_csv, 'xlsx': write_xlsx, 'pdf': write_pdf}
+
+
+def write_class_report(file, file_format, course, semester):
+    """
+    Writes the whole-class report of a course and semester (see `faculty.utils.whole_class_report`).
+
+    Parameters:
+    - file: Binary file object to write to.
+    - file_format (str): One of 'csv', 'xlsx' and 'pdf'.
+    - course (str): The course of the class.
+    - semester (str): The semester of the class.
+
+    The spreadsheets have three columns per week (solved, commit date, status); the PDF has one column per
+    week combining the solved count and an abbreviated status, so that a whole semester fits on the page.
+    """
+    students = iter_whole_class_report(course, semester)
+    # Every student has the same weeks; read them from the first one without losing it
+    first = next(students, None)
+    weeks = [week['week'] for week in first['weeks_data']] if first else []
+    students = itertools.chain([first], students) if first else iter(())
+
+    title = f"{course} Sem {semester} Report"
+    if file_format == 'pdf':
+        header = [['Enroll no.', 'Faculty no.', 'Name'] + [f"Week {week}" for week in weeks]]
+        rows = (
+            [student['enrollment_number'], student['faculty_number'], student['name']] + [
+                f"{week['problems_solved']}/{week['total_problems']} {STATUS_ABBREVIATIONS[week['commit_status']]}"
+                for week in student['weeks_data']
+            ]
+            for student in students
+        )
+        write_pdf(file, title, header, rows, [12, 14, 20] + [7] * len(weeks), footer=STATUS_LEGEND)
+        return
+
+    header = [
+        ['Enroll no.', 'Faculty no.', 'Name'] + [label for week in weeks for label in (f"Week {week}", '', '')],
+        ['', '', ''] + ['Solved', 'Commit Date', 'Status'] * len(weeks),
+    ]
+    rows = (
+        [student['enrollment_number'], student['faculty_number'], student['name']] + [
+            value for week in student['weeks_data'] for value in (
+                f"{week['problems_solved']}/{week['total_problems']}", commit_date(week['last_commit_time']),
+                week['commit_status'],
+            )
+        ]
+        for student in students
+    )
+    WRITERS[file_format](file, title, header, rows, [12, 14, 20] + [7, 12, 7] * len(weeks))
+
+
+def write_weekly_report(file, file_format, course, semester, week):
+    """
+    Writes the report of a course and semester for one week (see `faculty.utils.weekly_class_report`).
+
+    Parameters:
+    - file: Binary file object to write to.
+    - file_format (str): One of 'csv', 'xlsx' and 'pdf'.
+    - course (str): The course of the class.
+    - semester (str): The semester of the class.
+    - week (str): The week of the report.
+    """
+    title = f"{course} Sem {semester} Week {week} Report"
+    header = [['Enrollment Number', 'Faculty Number', 'Name', 'Commit Date', 'Solved', 'Status']]
+    rows = (
+        [student['enrollment_number'], student['faculty_number'], student['full_name'],
+         commit_date(student['last_commit_time']), f"{student['problems_solved']}/{student['total_problems']}",
+         student['status']]
+        for student in weekly_class_report(course, semester, week)
+    )
+    WRITERS[file_format](file, title, header, rows, [25, 24, 20, 12, 10, 8])
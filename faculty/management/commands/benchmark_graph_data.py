@@ -0,0 +1,99 @@
+import random
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from faculty.utils import week_graph_data
+from problems.models import StudentWeekProgress
+from students.models import Student
+
+
+class Rollback(Exception):
+    """
+    Raised at the end of the benchmark to roll back the synthetic data.
+    """
+
+
+class Command(BaseCommand):
+    """
+    Benchmarks the dashboard graph data (`faculty.utils.week_graph_data`) against growing numbers of cohorts.
+
+    For each requested size, synthetic students and `StudentWeekProgress` rows are inserted inside a
+    transaction, the graph data of one week is computed several times, and the number of queries and the
+    mean and maximum duration are printed. The transaction is rolled back at the end, so the command can be
+    run against a live database. The query count must stay the same for every size.
+
+    Example usage:
+    ```
+    python manage.py benchmark_graph_data --cohorts 1,4,16,64 --students 120 --weeks 14
+    ```
+    """
+
+    help = 'Benchmark the faculty dashboard graph data as the number of cohorts grows'
+
+    def add_arguments(self, parser):
+        """
+        Adds the `--cohorts`, `--students`, `--weeks` and `--repeat` options.
+        """
+        parser.add_argument('--cohorts', default='1,4,16,64',
+                            help='Comma separated numbers of cohorts to benchmark.')
+        parser.add_argument('--students', type=int, default=120, help='Students per cohort.')
+        parser.add_argument('--weeks', type=int, default=14, help='Weeks of progress per student.')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per size.')
+
+    def handle(self, *args, **kwargs):
+        """
+        Runs the benchmark for every size and prints one line per size.
+        """
+        sizes = sorted(int(size) for size in kwargs['cohorts'].split(','))
+        random.seed(0)
+
+        try:
+            with transaction.atomic():
+                created = 0
+                for cohorts in sizes:
+                    for index in range(created, cohorts):
+                        self.create_cohort(index, kwargs['students'], kwargs['weeks'])
+                    created = max(created, cohorts)
+                    self.measure(cohorts, kwargs['students'], kwargs['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def create_cohort(self, index, students, weeks):
+        """
+        Inserts one synthetic cohort with random progress, using bulk inserts (which send no signals).
+        """
+        course, semester = f"BENCH{index}", '1'
+        Student.objects.bulk_create([
+            Student(username=f"bench{index}_{number}", course=course, semester=semester,
+                    enrollment_number=f"B{index:04d}{number:05d}", faculty_number=f"BF{index:04d}{number:05d}")
+            for number in range(students)
+        ])
+
+        rows = []
+        for student_id in Student.objects.filter(course=course, semester=semester).values_list('id', flat=True):
+            for week in range(1, weeks + 1):
+                committed = random.random() < 0.8
+                rows.append(StudentWeekProgress(
+                    student_id=student_id, week_number=week, total_problems=5,
+                    problems_solved=random.randint(0, 5), committed=committed,
+                    is_late=(random.random() < 0.3) if committed else None,
+                ))
+        StudentWeekProgress.objects.bulk_create(rows, batch_size=1000)
+
+    def measure(self, cohorts, students, repeat):
+        """
+        Times `week_graph_data` for the current data and prints the result.
+        """
+        durations = []
+        for _ in range(max(1, repeat)):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                week_graph_data(1)
+                durations.append(time.perf_counter() - started)
+
+        self.stdout.write(
+            f"{cohorts} cohorts, {cohorts * students} students: {len(queries.captured_queries)} queries, "
+            f"mean {sum(durations) / len(durations) * 1000:.1f}ms, max {max(durations) * 1000:.1f}ms"
+        )
@@ -0,0 +1,87 @@
+import threading
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from faculty.utils import claim_update_job, run_update_job
+
+
+class Command(BaseCommand):
+    """
+    Worker process running the data refreshes faculty members request from the dashboard.
+
+    The "Update data" button only enqueues a `DataUpdateJob`; this command polls the queue, claims one job at
+    a time and runs it outside of any HTTP request, so a refresh is no longer cut short by web server timeouts.
+    Several workers may run side by side, since every job is claimed by exactly one of them. The `--workers`
+    option runs that many worker threads in this process, so refreshes of different cohorts proceed in
+    parallel; refreshes of the same cohort are coalesced onto one job by its `CohortRefreshLease`.
+    """
+
+    help = 'Run queued faculty data update jobs'
+
+    def add_arguments(self, parser):
+        """
+        Adds the `--once` flag and the `--workers` and `--poll-interval` options.
+        """
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=2,
+            help='Number of jobs run in parallel.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run every queued job, then exit instead of waiting for new ones.',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to wait between two checks of an empty queue.',
+        )
+
+    def handle(self, *args, **kwargs):
+        """
+        Starts the worker threads and waits for them (they only return with `--once`).
+        """
+        workers = [threading.Thread(target=self.work, args=(kwargs['once'], kwargs['poll_interval']), daemon=True)
+                   for _ in range(max(1, kwargs['workers']))]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    def work(self, once, poll_interval):
+        """
+        Claims and runs queued jobs until interrupted (or until the queue is empty with `--once`).
+        A failing job is reported and marked as failed without stopping the worker.
+        """
+        try:
+            self.run_jobs(once, poll_interval)
+        finally:
+            connection.close()  # Each thread has its own database connection.
+
+    def run_jobs(self, once, poll_interval):
+        """
+        The polling loop of a single worker thread.
+        """
+        while True:
+            job = claim_update_job()
+            if job is None:
+                if once:
+                    return
+                time.sleep(poll_interval)
+                continue
+
+            self.stdout.write(f"Running update job {job.id} for {job.course}, Semester {job.semester}")
+            try:
+                run_update_job(job)
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"Update job {job.id} failed: {e}"))
+                continue
+
+            job.refresh_from_db()
+            self.stdout.write(self.style.SUCCESS(
+                f"Update job {job.id} finished: {job.done}/{job.total} students, "
+                f"{job.errors} error(s), {job.rows_changed} rows changed"
+            ))
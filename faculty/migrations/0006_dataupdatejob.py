@@ -0,0 +1,36 @@
+# Generated by Django 5.1.1 on 2026-10-18 12:31
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('faculty', '0005_alter_faculty_groups_alter_faculty_user_permissions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataUpdateJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('course', models.CharField(max_length=15)),
+                ('semester', models.CharField(max_length=15)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('finished', 'Finished'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('total', models.IntegerField(default=0)),
+                ('done', models.IntegerField(default=0)),
+                ('errors', models.IntegerField(default=0)),
+                ('error_log', models.TextField(blank=True, default='')),
+                ('rows_changed', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('faculty', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='faculty.faculty')),
+            ],
+            options={
+                'ordering': ('created_at',),
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.1 on 2026-10-18 13:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('faculty', '0006_dataupdatejob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CohortRefreshLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('course', models.CharField(max_length=15)),
+                ('semester', models.CharField(max_length=15)),
+                ('expires_at', models.DateTimeField()),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='faculty.dataupdatejob')),
+            ],
+            options={
+                'unique_together': {('course', 'semester')},
+            },
+        ),
+    ]
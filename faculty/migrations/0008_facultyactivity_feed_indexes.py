@@ -0,0 +1,21 @@
+# Generated by Django 5.1.1 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('faculty', '0007_cohortrefreshlease'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='facultyactivity',
+            index=models.Index(fields=['-timestamp', '-id'], name='activity_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='facultyactivity',
+            index=models.Index(fields=['faculty', '-timestamp', '-id'], name='activity_faculty_feed_idx'),
+        ),
+    ]
@@ -141,6 +141,7 @@ class FacultyActivity(models.Model):
 
     Meta:
         verbose_name_plural (str): Changes the plural form of the model in the admin interface to "Faculty Activities".
+        indexes (list): Serve the pages of the activity feeds (see `faculty.activity`), newest first.
 
     Methods:
         __str__: Returns a string representing the faculty member, the action, and the timestamp.
@@ -157,6 +158,10 @@ class FacultyActivity(models.Model):
 
     class Meta:
         verbose_name_plural = 'Faculty Activities'  # Updated plural name
+        indexes = [
+            models.Index(fields=['-timestamp', '-id'], name='activity_feed_idx'),
+            models.Index(fields=['faculty', '-timestamp', '-id'], name='activity_faculty_feed_idx'),
+        ]
 
     def __str__(self):
         """
@@ -182,3 +187,130 @@ class FacultyActivity(models.Model):
             # Delete older activities, keeping the 20 most recent ones
             for activity in activities[20:]:
                 activity.delete()
+
+
+class DataUpdateJob(models.Model):
+    """
+    A data refresh requested by a faculty member from the dashboard's "Update data" button.
+
+    The request only enqueues the job; a separate worker process (`manage.py run_update_jobs`) claims queued
+    jobs, runs `update_student_data` for the cohort and records its progress on the row, which the dashboard
+    polls to display students done, errors and the estimated time left.
+
+    Fields:
+        id (UUIDField): The job identifier returned to the browser.
+        faculty (ForeignKey): The faculty member who requested the refresh.
+        course (CharField): The course whose students are refreshed.
+        semester (CharField): The semester whose students are refreshed.
+        status (CharField): One of 'queued', 'running', 'finished' or 'failed'.
+        total (IntegerField): Number of students to refresh, known once the job has started.
+        done (IntegerField): Number of students processed so far.
+        errors (IntegerField): Number of students whose repository could not be read.
+        error_log (TextField): One line per failed student, plus the traceback summary if the job failed.
+        rows_changed (IntegerField): Number of completion and commit rows written by the job.
+        created_at (DateTimeField): When the job was enqueued.
+        started_at (DateTimeField): When a worker claimed the job.
+        finished_at (DateTimeField): When the job finished or failed.
+
+    Methods:
+        __str__: Returns a string displaying the cohort and status of the job.
+        eta_seconds: Returns the estimated number of seconds left, or None if it cannot be estimated yet.
+        progress: Returns the job's progress as a JSON-serialisable dictionary.
+    """
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FINISHED = 'finished'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (FINISHED, 'Finished'),
+        (FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    faculty = models.ForeignKey('Faculty', on_delete=models.CASCADE)
+    course = models.CharField(max_length=15)
+    semester = models.CharField(max_length=15)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    total = models.IntegerField(default=0)
+    done = models.IntegerField(default=0)
+    errors = models.IntegerField(default=0)
+    error_log = models.TextField(blank=True, default='')
+    rows_changed = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ('created_at',)
+
+    def __str__(self):
+        """
+        Returns a string representation of the job, displaying the cohort and its status.
+        """
+        return f"{self.course} {self.semester} {self.status}"
+
+    def eta_seconds(self):
+        """
+        Estimates the seconds left from the average time spent per student so far.
+        """
+        if self.status != self.RUNNING or not self.started_at or not self.done:
+            return None
+        elapsed = (timezone.now() - self.started_at).total_seconds()
+        return round(elapsed / self.done * (self.total - self.done))
+
+    def progress(self):
+        """
+        Returns the job's progress in the shape served by the progress endpoint.
+        """
+        return {
+            'job_id': str(self.id),
+            'course': self.course,
+            'semester': self.semester,
+            'status': self.status,
+            'done': self.done,
+            'total': self.total,
+            'errors': self.errors,
+            'error_log': self.error_log.splitlines(),
+            'rows_changed': self.rows_changed,
+            'eta_seconds': self.eta_seconds(),
+        }
+
+
+class CohortRefreshLease(models.Model):
+    """
+    A time-limited lock giving one `DataUpdateJob` the right to refresh a course and semester.
+
+    At most one lease exists per cohort. While it has not expired, every refresh request for the cohort is
+    coalesced onto the lease's job instead of starting another one; refreshes of other cohorts are not
+    affected. The worker running the job keeps renewing the lease, so a crashed worker only blocks its
+    cohort until the lease expires. Once the job finishes, the lease is kept for a short cooldown so that
+    follow-up clicks return the fresh result.
+
+    Fields:
+        course (CharField): The course the lease covers.
+        semester (CharField): The semester the lease covers.
+        job (ForeignKey): The job holding the lease.
+        expires_at (DateTimeField): The time after which the lease may be taken over by a new job.
+
+    Meta:
+        unique_together (tuple): Ensures that a course and semester have at most one lease.
+
+    Methods:
+        __str__: Returns a string displaying the cohort and the expiry of the lease.
+    """
+    course = models.CharField(max_length=15)
+    semester = models.CharField(max_length=15)
+    job = models.ForeignKey('DataUpdateJob', on_delete=models.CASCADE)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('course', 'semester')
+
+    def __str__(self):
+        """
+        Returns a string representation of the lease, displaying the cohort and the expiry time.
+        """
+        return f"{self.course} {self.semester} until {self.expires_at}"
@@ -464,104 +464,138 @@ $(document).ready(function () {
         var reportTitle = course + " Sem " + semester + " Report";
         $('#report-title').text(reportTitle);
 
-        $.ajax({
-            url: '/faculty/fetch-whole-class/',
-            data: { course: course, semester: semester },
-            success: function(data) {
-                classData = data;
-                var classReportHtml = '<table class="min-w-full divide-y divide-gray-200"><thead class="bg-gray-50"><tr>';
-
-                // Add main headers
-                classReportHtml += '<th scope="col" class="px-6 py-3 text-left text-xs font-medium text-[rgb(107,0,2)] uppercase tracking-wider">Enrollment Number</th>';
-                classReportHtml += '<th scope="col" class="px-6 py-3 text-left text-xs font-medium text-[rgb(107,0,2)] uppercase tracking-wider">Faculty Number</th>';
-                classReportHtml += '<th scope="col" class="px-6 py-3 text-left text-xs font-medium text-[rgb(107,0,2)] uppercase tracking-wider">Name</th>';
+        classData = [];
+        $('#student_table').html(
+            '<table class="min-w-full divide-y divide-gray-200"><thead class="bg-gray-50"></thead>' +
+            '<tbody class="bg-white divide-y divide-gray-200"></tbody></table>'
+        );
+
+        // Show the student details section and adjust container width
+        $('#main-container').addClass('max-w-[95%]');
+        $('#all-student-details').removeClass('hidden');
+
+        // The report is streamed one student per line, so rows are rendered as soon as they arrive
+        streamClassReport(function(student) {
+            if (classData.length === 0) {
+                $('#student_table thead').html(headerHtml(student.weeks_data));
+            }
+            classData.push(student);
+            $('#student_table tbody').append(rowHtml(student));
+        }).then(function() {
+            if (classData.length === 0) {
+                $('#student_table thead').html(headerHtml([]));
+            }
 
-                // Add week headers if data exists
-                if (classData.length > 0 && classData[0].weeks_data.length > 0) {
-                    classData[0].weeks_data.forEach(function(week) {
-                        classReportHtml += '<th scope="col" colspan="3" class="px-6 py-3 text-center text-xs font-medium text-[rgb(107,0,2)] uppercase tracking-wider">Week ' + week.week + '</th>';
-                    });
+            // Log activity
+            $.ajax({
+                url: '/faculty/log_activity/',
+                type: 'POST',
+                data: {
+                    action: 'Viewed Class Report',
+                    course: course,
+                    semester: semester,
+                    csrfmiddlewaretoken: '{{ csrf_token }}'
+                },
+                success: function(response) {
+                    console.log('Activity logged successfully');
+                },
+                error: function(xhr, status, error) {
+                    console.error('Error logging activity: ', error);
                 }
+            });
+        }).catch(function(error) {
+            console.error('Error fetching class data:', error);
+            alert('Error fetching class data. Please try again.');
+        });
+    });
 
-                classReportHtml += '</tr><tr>';
+    // Reads the NDJSON class report and calls onStudent with each student as its line arrives
+    async function streamClassReport(onStudent) {
+        const params = new URLSearchParams({ course: course, semester: semester });
+        const response = await fetch('/faculty/stream-whole-class/?' + params.toString());
+        if (!response.ok) {
+            throw new Error(response.status + ' ' + response.statusText);
+        }
 
-                // Add subheaders for each week
-                classReportHtml += '<th></th><th></th><th></th>';
-                if (classData.length > 0 && classData[0].weeks_data.length > 0) {
-                    classData[0].weeks_data.forEach(function(week) {
-                        classReportHtml += '<th class="px-6 py-3 text-left text-xs font-medium text-[rgb(107,0,2)] uppercase tracking-wider">Solved</th>';
-                        classReportHtml += '<th class="px-6 py-3 text-left text-xs font-medium text-[rgb(107,0,2)] uppercase tracking-wider">Commit Date</th>';
-                        classReportHtml += '<th class="px-6 py-3 text-left text-xs font-medium text-[rgb(107,0,2)] uppercase tracking-wider">Status</th>';
-                    });
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { done, value } = await reader.read();
+            buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+
+            // Keep the last, possibly incomplete, line for the next chunk
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            lines.filter(line => line.trim()).forEach(line => onStudent(JSON.parse(line)));
+
+            if (done) {
+                if (buffer.trim()) {
+                    onStudent(JSON.parse(buffer));
                 }
+                return;
+            }
+        }
+    }
 
-                classReportHtml += '</tr></thead><tbody class="bg-white divide-y divide-gray-200">';
-
-                // Add student data rows
-                data.forEach(function(student) {
-                    classReportHtml += '<tr class="hover:bg-gray-50">';
-                    classReportHtml += '<td class="px-6 py-4 whitespace-nowrap text-sm text-gray-900">' + student.enrollment_number + '</td>';
-                    classReportHtml += '<td class="px-6 py-4 whitespace-nowrap text-sm text-gray-900">' + student.faculty_number + '</td>';
-                    classReportHtml += '<td class="px-6 py-4 whitespace-nowrap text-sm text-gray-900">' + student.name + '</td>';
-
-                    student.weeks_data.forEach(function(week) {
-                        // Problems solved cell
-                        classReportHtml += '<td class="px-6 py-4 whitespace-nowrap text-sm text-gray-900">' +
-                            week.problems_solved + '/' + week.total_problems + '</td>';
+    function headerHtml(weeksData) {
+        var html = '<tr>';
 
-                        // Commit date cell
-                        var lastCommitDate = (week.last_commit_time !== 'No Commits')
-                            ? formatDate(week.last_commit_time.split('T')[0])
-                            : 'No Commits';
-                        classReportHtml += '<td class="px-6 py-4 whitespace-nowrap text-sm text-gray-900">' + lastCommitDate + '</td>';
+        // Add main headers
+        html += '<th scope="col" class="px-6 py-3 text-left text-xs font-medium text-[rgb(107,0,2)] uppercase tracking-wider">Enrollment Number</th>';
+        html += '<th scope="col" class="px-6 py-3 text-left text-xs font-medium text-[rgb(107,0,2)] uppercase tracking-wider">Faculty Number</th>';
+        html += '<th scope="col" class="px-6 py-3 text-left text-xs font-medium text-[rgb(107,0,2)] uppercase tracking-wider">Name</th>';
 
-                        // Status cell with conditional styling
-                        var statusClass = '';
-                        if (week.commit_status === 'On Time') {
-                            statusClass = 'text-green-600';
-                        } else if (week.commit_status === 'Late') {
-                            statusClass = 'text-red-600';
-                        } else {
-                            statusClass = 'text-gray-600';
-                        }
-                        classReportHtml += '<td class="px-6 py-4 whitespace-nowrap text-sm ' + statusClass + '">' +
-                            week.commit_status + '</td>';
-                    });
+        // Add week headers
+        weeksData.forEach(function(week) {
+            html += '<th scope="col" colspan="3" class="px-6 py-3 text-center text-xs font-medium text-[rgb(107,0,2)] uppercase tracking-wider">Week ' + week.week + '</th>';
+        });
 
-                    classReportHtml += '</tr>';
-                });
+        html += '</tr><tr>';
 
-                classReportHtml += '</tbody></table>';
-                $('#student_table').html(classReportHtml);
+        // Add subheaders for each week
+        html += '<th></th><th></th><th></th>';
+        weeksData.forEach(function(week) {
+            html += '<th class="px-6 py-3 text-left text-xs font-medium text-[rgb(107,0,2)] uppercase tracking-wider">Solved</th>';
+            html += '<th class="px-6 py-3 text-left text-xs font-medium text-[rgb(107,0,2)] uppercase tracking-wider">Commit Date</th>';
+            html += '<th class="px-6 py-3 text-left text-xs font-medium text-[rgb(107,0,2)] uppercase tracking-wider">Status</th>';
+        });
 
-                // Show the student details section and adjust container width
-                $('#main-container').addClass('max-w-[95%]');
-                $('#all-student-details').removeClass('hidden');
+        return html + '</tr>';
+    }
 
-                // Log activity
-                $.ajax({
-                    url: '/faculty/log_activity/',
-                    type: 'POST',
-                    data: {
-                        action: 'Viewed Class Report',
-                        course: course,
-                        semester: semester,
-                        csrfmiddlewaretoken: '{{ csrf_token }}'
-                    },
-                    success: function(response) {
-                        console.log('Activity logged successfully');
-                    },
-                    error: function(xhr, status, error) {
-                        console.error('Error logging activity: ', error);
-                    }
-                });
-            },
-            error: function(xhr, status, error) {
-                console.error('Error fetching class data:', error);
-                alert('Error fetching class data. Please try again.');
+    function rowHtml(student) {
+        var html = '<tr class="hover:bg-gray-50">';
+        html += '<td class="px-6 py-4 whitespace-nowrap text-sm text-gray-900">' + student.enrollment_number + '</td>';
+        html += '<td class="px-6 py-4 whitespace-nowrap text-sm text-gray-900">' + student.faculty_number + '</td>';
+        html += '<td class="px-6 py-4 whitespace-nowrap text-sm text-gray-900">' + student.name + '</td>';
+
+        student.weeks_data.forEach(function(week) {
+            // Problems solved cell
+            html += '<td class="px-6 py-4 whitespace-nowrap text-sm text-gray-900">' +
+                week.problems_solved + '/' + week.total_problems + '</td>';
+
+            // Commit date cell
+            var lastCommitDate = (week.last_commit_time !== 'No Commits')
+                ? formatDate(week.last_commit_time.split('T')[0])
+                : 'No Commits';
+            html += '<td class="px-6 py-4 whitespace-nowrap text-sm text-gray-900">' + lastCommitDate + '</td>';
+
+            // Status cell with conditional styling
+            var statusClass = '';
+            if (week.commit_status === 'On Time') {
+                statusClass = 'text-green-600';
+            } else if (week.commit_status === 'Late') {
+                statusClass = 'text-red-600';
+            } else {
+                statusClass = 'text-gray-600';
             }
+            html += '<td class="px-6 py-4 whitespace-nowrap text-sm ' + statusClass + '">' +
+                week.commit_status + '</td>';
         });
-    });
+
+        return html + '</tr>';
+    }
 
     $('#check_other').click(function() {
         $('#all-student-details').addClass('hidden');
@@ -573,92 +607,16 @@ $(document).ready(function () {
         $('#semester').empty().append('<option value="">Select Semester</option>');
     });
 
-    $('#download_excel').click(function() {
-        downloadExcel(classData);
-
-        $.ajax({
-            url: '/faculty/log_activity/',
-            type: 'POST',
-            data: {
-                action: 'Downloaded Class Report',
-                course: course,
-                semester: semester,
-                csrfmiddlewaretoken: '{{ csrf_token }}'
-            }
-        });
-    });
-
-    async function downloadExcel(classData) {
-        const ExcelJS = window.ExcelJS;
-        const workbook = new ExcelJS.Workbook();
-        const worksheet = workbook.addWorksheet('Class Report');
-
-        // Define columns
-        const columns = [
-            { header: 'Enroll no.', key: 'enrollment_number', width: 12 },
-            { header: 'Faculty no.', key: 'faculty_number', width: 14 },
-            { header: 'Name', key: 'name', width: 20 }
-        ];
-
-        if (classData.length > 0 && classData[0].weeks_data.length > 0) {
-            classData[0].weeks_data.forEach((weekData, index) => {
-                columns.push({ header: `Week ${weekData.week}`, key: `week_${weekData.week}_solved`, width: 7 });
-                columns.push({ header: `Week ${weekData.week} Commit Date`, key: `week_${weekData.week}_commit_date`, width: 12 });
-                columns.push({ header: `Week ${weekData.week} Status`, key: `week_${weekData.week}_status`, width: 7 });
-            });
-        }
-
-        worksheet.columns = columns;
-
-        // Add subheaders
-        worksheet.addRow(['', '', '', ...Array.from({ length: classData[0].weeks_data.length }, () => ['Solved', 'Commit Date', 'Status']).flat()]);
-
-        // Style headers
-        worksheet.getRow(1).font = { bold: true, size: 14 };
-        worksheet.getRow(1).alignment = { horizontal: 'center', vertical: 'middle' };
-        worksheet.getRow(1).height = 30;
-        worksheet.getRow(2).alignment = { horizontal: 'center' };
-
-        // Add data rows
-        classData.forEach(student => {
-            let row = {
-                enrollment_number: student.enrollment_number,
-                faculty_number: student.faculty_number,
-                name: student.name
-            };
-
-            student.weeks_data.forEach(week => {
-                row[`week_${week.week}_solved`] = `${week.problems_solved}/${week.total_problems}`;
-                row[`week_${week.week}_commit_date`] = week.last_commit_time !== 'No Commits'
-                    ? formatDate(week.last_commit_time.split('T')[0])
-                    : 'No Commits';
-                row[`week_${week.week}_status`] = week.commit_status;
-            });
-
-            const dataRow = worksheet.addRow(row);
-            dataRow.alignment = { horizontal: 'center' };
-        });
-
-        // Merge week header cells
-        let startColumn = 4;
-        classData[0].weeks_data.forEach(() => {
-            worksheet.mergeCells(1, startColumn, 1, startColumn + 2);
-            startColumn += 3;
-        });
-
-        // Write to file
-        workbook.xlsx.writeBuffer().then(buffer => {
-            const blob = new Blob([buffer], { type: 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet' });
-            const url = URL.createObjectURL(blob);
-            const a = document.createElement('a');
-            a.href = url;
-            a.download = `${course}Sem${semester}.xlsx`;
-            document.body.appendChild(a);
-            a.click();
-            document.body.removeChild(a);
-        });
+    // The report files are built and cached on the server, which also logs the download
+    function downloadReport(format) {
+        var params = new URLSearchParams({ course: course, semester: semester, format: format });
+        window.location.href = '/faculty/export-whole-class/?' + params.toString();
     }
 
+    $('#download_excel').click(function() { downloadReport('xlsx'); });
+    $('#download_csv').click(function() { downloadReport('csv'); });
+    $('#download_pdf').click(function() { downloadReport('pdf'); });
+
     function formatDate(dateString) {
         var parts = dateString.split('-');
         return parts[2] + '-' + parts[1] + '-' + parts[0];
@@ -428,9 +428,9 @@ $(document).ready(function() {
 
         $.ajax({
             url: '/faculty/fetch-whole-class-weekly/',
-            data: { course : course, semester: semester, week: week},
+            data: { course : course, semester: semester, week: week, format: 'columnar'},
             success: function(data) {
-                classData=data;
+                classData=fromColumnar(data);
                 let classReportHtml = `
                     <thead>
                         <tr>
@@ -449,7 +449,7 @@ $(document).ready(function() {
                     <tbody class="bg-white divide-y divide-gray-200">
                 `;
 
-                data.forEach(function(student) {
+                classData.forEach(function(student) {
                     const statusClass = student.status === 'Completed' ? 'bg-green-100 text-green-800' :
                                       student.status === 'In Progress' ? 'bg-yellow-100 text-yellow-800' :
                                       'bg-red-100 text-red-800';
@@ -503,21 +503,32 @@ $(document).ready(function() {
         });
     });
 
-    $('#download_excel').click(function() {
-        downloadExcel(classData);
+    // Rebuilds one object per student from the columnar report (one array per field, statuses as indexes)
+    function fromColumnar(data) {
+        const students = [];
+        for (let i = 0; i < data.length; i++) {
+            students.push({
+                enrollment_number: data.enrollment_number[i],
+                faculty_number: data.faculty_number[i],
+                full_name: data.full_name[i],
+                last_commit_time: data.last_commit_time[i] === null ? 'No Commits' : data.last_commit_time[i],
+                problems_solved: data.problems_solved[i],
+                total_problems: data.total_problems,
+                status: data.statuses[data.status[i]]
+            });
+        }
+        return students;
+    }
 
-        $.ajax({
-            url: '/faculty/log_activity/',
-            type: 'POST',
-            data: {
-                action: 'Downloaded Weekly Class Report',
-                course: course,
-                semester: semester,
-                week: week,
-                csrfmiddlewaretoken: '{{ csrf_token }}'
-            }
-        });
-    });
+    // The report files are built and cached on the server, which also logs the download
+    function downloadReport(format) {
+        var params = new URLSearchParams({ course: course, semester: semester, week: $('#week').val(), format: format });
+        window.location.href = '/faculty/export-whole-class-weekly/?' + params.toString();
+    }
+
+    $('#download_excel').click(function() { downloadReport('xlsx'); });
+    $('#download_csv').click(function() { downloadReport('csv'); });
+    $('#download_pdf').click(function() { downloadReport('pdf'); });
 
     $('#check_other').click(function () {
         // Hide student details
@@ -536,62 +547,6 @@ $(document).ready(function() {
         $('#week').empty().append('<option value="">Select Week</option>');
     });
 
-    async function downloadExcel(classData){
-        week=$('#week').val();
-        const ExcelJS=window.ExcelJS;
-
-        const workbook=new ExcelJS.Workbook();
-        const worksheet=workbook.addWorksheet('Class Report');
-
-        const columns= [
-            {header: 'Enrollment Number', key: 'enrollment_number',width: 25},
-            {header: 'Faculty Number', key: 'faculty_number',width: 24},
-            {header: 'Name', key:'name', width: 20},
-            {header: `Week ${week}`, key: 'week_number',width: 12},
-            {header: `Week ${week} Problems Solved`,key: 'problems',width: 10},
-            {header: 'Week ${week} status',key:'status',width: 8}
-        ];
-
-        worksheet.columns=columns;
-
-        worksheet.addRow(['','','','Commit Date','Solved','Status']);
-
-        worksheet.getRow(1).font={ bold: true, size:14};
-        worksheet.getRow(1).alignment={ horizontal: 'center', vertical: 'middle'};
-        worksheet.getRow(1).height=30;
-        worksheet.getRow(2).alignment={horizontal: 'center'};
-
-        classData.forEach(student => {
-
-            var lastCommitDate = (student.last_commit_time !== 'No Commits')
-                        ? formatDate(student.last_commit_time.split('T')[0])
-                        : 'No Commits';
-
-            let row = {
-                enrollment_number: student.enrollment_number,
-                faculty_number: student.faculty_number,
-                name: student.full_name,
-                week_number: lastCommitDate,
-                problems: `${student.problems_solved}/${student.total_problems}`,
-                status: student.status
-            };
-            const dataRow=worksheet.addRow(row);
-            dataRow.alignment={horizontal: 'center'};
-        });
-
-        worksheet.mergeCells(1,4,1,6);
-
-        workbook.xlsx.writeBuffer().then(buffer => {
-            const blob = new Blob([buffer], { type: 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet' });
-            const url = URL.createObjectURL(blob);
-            const a = document.createElement('a');
-            a.href = url;
-            a.download = `${course}Sem${semester}Week${week}.xlsx`;
-            document.body.appendChild(a);
-            a.click();
-            document.body.removeChild(a);
-        });
-    }
     function formatDate(dateString) {
         var parts=dateString.split('-');
         return parts[2]+'-'+parts[1]+'-'+parts[0];
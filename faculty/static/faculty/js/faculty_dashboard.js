@@ -233,22 +233,59 @@ $(document).ready(function() {
                 csrfmiddlewaretoken: '{{ csrf_token }}'
             },
             success: function(data) {
-                if(data.success) {
-                    alert('Data Updated Successfully');
-                } else if (data.error) {
+                if(data.job_id) {
+                    // The update runs in the background; follow its progress until it ends.
+                    pollUpdateStatus(data.job_id, submitButton);
+                    return;
+                }
+                if (data.error) {
                     alert(data.error);
                 }
+                resetUpdateButton(submitButton);
             },
             error: function() {
                 alert('Error updating data. Please try again.');
-            },
-            complete: function() {
-                submitButton.removeClass('loading');
-                submitButton.html('Update Data');
+                resetUpdateButton(submitButton);
             }
         });
     });
 
+    function resetUpdateButton(submitButton) {
+        submitButton.removeClass('loading');
+        submitButton.html('Update Data');
+    }
+
+    function pollUpdateStatus(jobId, submitButton) {
+        $.ajax({
+            url: `/faculty/update-status/${jobId}/`,
+            type: 'GET',
+            success: function(job) {
+                if(job.status === 'finished') {
+                    const errors = job.errors ? ` (${job.errors} repositories could not be read)` : '';
+                    alert(`Data Updated Successfully${errors}`);
+                    resetUpdateButton(submitButton);
+                    return;
+                }
+                if(job.status === 'failed') {
+                    alert('Error updating data. Please try again.');
+                    resetUpdateButton(submitButton);
+                    return;
+                }
+
+                let label = job.status === 'queued' ? 'Queued...' : `Updating... ${job.done}/${job.total}`;
+                if(job.eta_seconds !== null) {
+                    label += ` (about ${Math.ceil(job.eta_seconds / 60)} min left)`;
+                }
+                submitButton.html(`<span class="loading-icon">${label}</span>`);
+                setTimeout(function() { pollUpdateStatus(jobId, submitButton); }, 2000);
+            },
+            error: function() {
+                alert('Error updating data. Please try again.');
+                resetUpdateButton(submitButton);
+            }
+        });
+    }
+
     // Start new semester handler
     $('#start-new-semester-btn').click(function() {
         if (confirm('Are you sure you want to start a new semester? This will delete students who have been on the platform for more than or equal to 150 days.')) {
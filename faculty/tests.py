@@ -1,3 +1,410 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from faculty import exports
+from faculty.activity import activity_page, decode_cursor, encode_cursor
+from faculty.models import CohortRefreshLease, DataUpdateJob, Faculty, FacultyActivity, LastDateOfWeek
+from faculty.utils import (REPORT_STATUSES, claim_update_job, request_refresh, run_update_job, week_graph_data,
+                           whole_class_report)
+from problems.models import Problem, ProblemCompletion, WeekCommit
+from students.models import Student
+
+
+class CohortFixtureMixin:
+    """
+    Creates faculty members, and the students and week problems of a course and semester.
+    """
+
+    def create_faculty(self, name='Test Faculty'):
+        return Faculty.objects.create(name=name, username=name.lower().replace(' ', ''))
+
+    def create_student(self, number, course='BCA', semester='3', **fields):
+        return Student.objects.create(username=f'student{number}', first_name='Student', last_name=str(number),
+                                      enrollment_number=f'GK{number:04}', faculty_number=f'22{course}{number:03}',
+                                      course=course, semester=semester, **fields)
+
+    def create_problems(self, course='BCA', semester=3, week=1, count=2):
+        return [Problem.objects.create(course=course, semester=semester, week=week, problemNumber=f'P{number}',
+                                       description=f'Problem {number}')
+                for number in range(1, count + 1)]
+
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'faculty-tests'},
+    'reports': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'faculty-tests-reports'},
+}
+
+
+class ClassReportMixin(CohortFixtureMixin):
+    """
+    A BCA semester 3 class with two problems in week 1 (deadline today) and one in week 2 (no deadline).
+    Student 1 solved week 1 and committed on time; student 2 did nothing. A faculty member is logged in, and
+    reports are cached in memory and exported to a temporary folder.
+    """
+
+    def setUp(self):
+        super().setUp()
+        export_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(export_dir.cleanup)
+        settings_override = override_settings(CACHES=LOCMEM_CACHES, REPORT_EXPORT_DIR=export_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.week1 = self.create_problems()
+        self.create_problems(week=2, count=1)
+        LastDateOfWeek.objects.create(course='BCA', semester=3, week=1, last_date=timezone.localdate())
+        self.solver = self.create_student(1)
+        self.idle = self.create_student(2)
+        for problem in self.week1:
+            ProblemCompletion.objects.create(student=self.solver, problem=problem, is_completed=True)
+        WeekCommit.objects.create(student=self.solver, week_number=1, last_commit_hash='abc',
+                                  last_commit_time=timezone.now() - timedelta(days=1))
+
+        self.faculty = self.create_faculty()
+        self.client.force_login(self.faculty, backend='faculty.backends.FacultyBackend')
+
+
+class WholeClassReportTests(ClassReportMixin, TestCase):
+    """
+    The whole-class report is read from the progress table with a fixed number of queries.
+    """
+
+    def test_report_content(self):
+        report = whole_class_report('BCA', '3')
+
+        self.assertEqual([student['faculty_number'] for student in report], ['22BCA001', '22BCA002'])
+        solver_weeks, idle_weeks = report[0]['weeks_data'], report[1]['weeks_data']
+        self.assertEqual([(week['week'], week['problems_solved'], week['total_problems'], week['commit_status'])
+                          for week in solver_weeks], [(1, 2, 2, 'On Time'), (2, 0, 1, '-----')])
+        self.assertEqual([week['commit_status'] for week in idle_weeks], ['----', '-----'])
+        self.assertEqual(idle_weeks[0]['last_commit_time'], 'No Commits')
+
+    def test_query_count_does_not_grow_with_the_class(self):
+        with self.assertNumQueries(3):
+            whole_class_report('BCA', '3')
+
+        for number in range(3, 13):
+            self.create_student(number)
+        with self.assertNumQueries(3):
+            whole_class_report('BCA', '3')
+
+    def test_report_streams_as_ndjson(self):
+        response = self.client.get('/faculty/stream-whole-class/', {'course': 'BCA', 'semester': '3'})
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        expected = json.loads(json.dumps(whole_class_report('BCA', '3'), cls=DjangoJSONEncoder))
+        self.assertEqual([json.loads(line) for line in lines], expected)
+
+
+class ColumnarReportTests(ClassReportMixin, TestCase):
+    """
+    `format=columnar` sends the same reports as one array per field, with statuses as indexes.
+    """
+
+    def test_class_report_columns(self):
+        response = self.client.get('/faculty/fetch-whole-class/', {'course': 'BCA', 'semester': '3',
+                                                                   'format': 'columnar'})
+
+        data = response.json()
+        self.assertEqual((data['format'], data['length']), ('columnar', 2))
+        self.assertEqual(data['faculty_number'], ['22BCA001', '22BCA002'])
+        week1 = data['weeks'][0]
+        self.assertEqual((week1['week'], week1['total_problems'], week1['problems_solved']), (1, 2, [2, 0]))
+        self.assertEqual([data['statuses'][index] for index in week1['commit_status']], ['On Time', '----'])
+        self.assertIsNone(week1['last_commit_time'][1])
+
+    def test_weekly_report_columns_match_the_rows(self):
+        params = {'course': 'BCA', 'semester': '3', 'week': '1'}
+        rows = self.client.get('/faculty/fetch-whole-class-weekly/', params).json()
+
+        data = self.client.get('/faculty/fetch-whole-class-weekly/', dict(params, format='columnar')).json()
+
+        self.assertEqual(data['statuses'], REPORT_STATUSES)
+        self.assertEqual(data['full_name'], [row['full_name'] for row in rows])
+        self.assertEqual(data['problems_solved'], [row['problems_solved'] for row in rows])
+        self.assertEqual([REPORT_STATUSES[index] for index in data['status']], [row['status'] for row in rows])
+        self.assertEqual(data['total_problems'], 2)
+
+
+class ReportExportTests(ClassReportMixin, TestCase):
+    """
+    The class reports download as CSV, XLSX and PDF files, written once per data version.
+    """
+
+    def download(self, url, **params):
+        response = self.client.get(url, dict({'course': 'BCA', 'semester': '3'}, **params))
+        content = b''.join(response.streaming_content) if response.status_code == 200 else response.content
+        return response, content
+
+    def test_class_report_as_csv(self):
+        response, content = self.download('/faculty/export-whole-class/', format='csv')
+
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('BCASem3.csv', response['Content-Disposition'])
+        rows = list(csv.reader(io.StringIO(content.decode('utf-8-sig'))))
+        self.assertEqual(rows[0][:4], ['Enroll no.', 'Faculty no.', 'Name', 'Week 1'])
+        commit_date = exports.commit_date(WeekCommit.objects.get(student=self.solver).last_commit_time)
+        self.assertEqual(rows[2][3:6], ['2/2', commit_date, 'On Time'])
+        self.assertEqual(rows[3][3:6], ['0/2', 'No Commits', '----'])
+        self.assertTrue(FacultyActivity.objects.filter(action='Downloaded Class Report').exists())
+
+    def test_weekly_report_as_xlsx(self):
+        _, content = self.download('/faculty/export-whole-class-weekly/', week='1')
+
+        sheet = load_workbook(io.BytesIO(content)).active
+        self.assertEqual([cell.value for cell in sheet[2]][4:], ['2/2', 'On Time'])
+        self.assertEqual(sheet.max_row, 3)
+
+    def test_class_report_as_pdf(self):
+        response, content = self.download('/faculty/export-whole-class/', format='pdf')
+
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(content.startswith(b'%PDF'))
+
+    def test_unknown_format_is_rejected(self):
+        response, _ = self.download('/faculty/export-whole-class/', format='docx')
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_unknown_cohort_or_week_is_rejected(self):
+        for url, params in (('/faculty/export-whole-class/', {'course': 'XYZ'}),
+                            ('/faculty/export-whole-class/', {'semester': ''}),
+                            ('/faculty/export-whole-class-weekly/', {}),
+                            ('/faculty/export-whole-class-weekly/', {'week': 'last'})):
+            with self.subTest(url=url, **params):
+                response, _ = self.download(url, **params)
+
+                self.assertEqual(response.status_code, 400)
+
+        self.assertEqual(os.listdir(settings.REPORT_EXPORT_DIR), [])
+        self.assertFalse(FacultyActivity.objects.exists())
+
+    def test_repeated_download_is_served_from_disk(self):
+        with mock.patch('faculty.views.write_class_report', wraps=exports.write_class_report) as write:
+            first = self.download('/faculty/export-whole-class/', format='csv')[1]
+            second = self.download('/faculty/export-whole-class/', format='csv')[1]
+
+        self.assertEqual(first, second)
+        write.assert_called_once()
+
+
+class StudentDetailsConditionalTests(ClassReportMixin, TestCase):
+    """
+    Repeated student detail lookups are answered with 304 Not Modified until the student's progress changes.
+    """
+
+    def lookup(self, **headers):
+        return self.client.get('/faculty/fetch-student-details/', {'faculty_number': '22BCA001'}, **headers)
+
+    def test_matching_etag_gets_304(self):
+        first = self.lookup()
+        self.assertEqual(first.json()['problems_solved_weekly'], [2, 0])
+
+        with self.assertNumQueries(4):  # Session, faculty member, student and the progress aggregate
+            second = self.lookup(HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.content, b'')
+
+    def test_changed_progress_changes_the_etag(self):
+        etag = self.lookup()['ETag']
+
+        ProblemCompletion.objects.create(student=self.solver, problem=Problem.objects.get(week=2), is_completed=True)
+        response = self.lookup(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_unknown_student_is_404(self):
+        response = self.client.get('/faculty/fetch-student-details/', {'faculty_number': 'nobody'})
+
+        self.assertEqual(response.status_code, 404)
+
+
+class WeekGraphDataTests(CohortFixtureMixin, TestCase):
+    """
+    The dashboard graph keeps the original population: every student of a cohort with a regular student.
+    """
+
+    def test_counts_cover_every_student_of_cohorts_with_regular_students(self):
+        problems = self.create_problems()
+        regular = self.create_student(1)
+        self.create_student(2, is_staff=True)
+        for problem in problems:
+            ProblemCompletion.objects.create(student=regular, problem=problem, is_completed=True)
+        WeekCommit.objects.create(student=regular, week_number=1, last_commit_hash='abc')
+
+        self.create_problems(course='MCA')
+        self.create_student(3, course='MCA', is_superuser=True)
+
+        self.assertEqual(week_graph_data(1), [{
+            'course': 'BCA', 'semester': '3', 'late_solved': 0, 'late_unsolved': 0, 'on_time_solved': 1,
+            'on_time_unsolved': 0, 'not_committed': 1,
+        }])
+
+
+class DataUpdateJobTests(CohortFixtureMixin, TestCase):
+    """
+    Refreshes requested from the dashboard run as queued jobs, one per cohort at a time.
+    """
+
+    def setUp(self):
+        self.faculty = self.create_faculty()
+        self.client.force_login(self.faculty, backend='faculty.backends.FacultyBackend')
+
+    def test_job_is_enqueued_and_reports_its_progress(self):
+        response = self.client.post('/faculty/trigger-update/', {'course': 'BCA', 'semester': '3'})
+        job_id = response.json()['job_id']
+        self.assertEqual(self.client.get(f'/faculty/update-status/{job_id}/').json()['status'], DataUpdateJob.QUEUED)
+
+        def update(course, semester, progress):
+            progress(1, 2, None)
+            progress(2, 2, 'student2: timeout')
+            return 5
+
+        job = claim_update_job()
+        with mock.patch('faculty.utils.update_student_data', side_effect=update):
+            run_update_job(job)
+
+        status = self.client.get(f'/faculty/update-status/{job_id}/').json()
+        self.assertEqual((status['status'], status['done'], status['total']), (DataUpdateJob.FINISHED, 2, 2))
+        self.assertEqual((status['errors'], status['rows_changed']), (1, 5))
+        self.assertIsNone(claim_update_job())
+
+    def test_failed_job_releases_the_lease(self):
+        job, _ = request_refresh(self.faculty, 'BCA', '3')
+        claim_update_job()
+
+        with mock.patch('faculty.utils.update_student_data', side_effect=RuntimeError('GitHub is down')), \
+                self.assertRaises(RuntimeError):
+            run_update_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, DataUpdateJob.FAILED)
+        self.assertFalse(CohortRefreshLease.objects.exists())
+
+
+class CohortRefreshLeaseTests(CohortFixtureMixin, TestCase):
+    """
+    Refresh requests for a cohort join the job holding its lease until the lease expires.
+    """
+
+    def setUp(self):
+        self.faculty = self.create_faculty()
+        self.other_faculty = self.create_faculty('Other Faculty')
+
+    def test_concurrent_requests_share_one_job(self):
+        job, created = request_refresh(self.faculty, 'BCA', '3')
+        joined, joined_created = request_refresh(self.other_faculty, 'BCA', '3')
+
+        self.assertTrue(created)
+        self.assertFalse(joined_created)
+        self.assertEqual(joined.pk, job.pk)
+        self.assertEqual(DataUpdateJob.objects.count(), 1)
+
+    def test_other_cohorts_get_their_own_job(self):
+        job, _ = request_refresh(self.faculty, 'BCA', '3')
+        other, created = request_refresh(self.faculty, 'MCA', '1')
+
+        self.assertTrue(created)
+        self.assertNotEqual(other.pk, job.pk)
+
+    def test_expired_lease_is_taken_over(self):
+        stale, _ = request_refresh(self.faculty, 'BCA', '3')
+        claim_update_job()
+        CohortRefreshLease.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        job, created = request_refresh(self.other_faculty, 'BCA', '3')
+
+        self.assertTrue(created)
+        self.assertEqual(CohortRefreshLease.objects.get().job_id, job.pk)
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, DataUpdateJob.FAILED)
+
+
+class ActivityFeedTests(CohortFixtureMixin, TestCase):
+    """
+    The activity feeds are paged with (timestamp, id) cursors, newest first.
+    """
+
+    def setUp(self):
+        self.faculty = self.create_faculty()
+        self.other = self.create_faculty('Other Faculty')
+        now = timezone.now()
+        # Seven activities, the middle three sharing a timestamp so the id has to break the tie
+        self.activities = []
+        for minutes in (6, 5, 4, 4, 4, 1, 0):
+            activity = FacultyActivity.objects.create(faculty=self.other, action='Added Problem', course='BCA',
+                                                      semester='3', week='1', description='<b>Sort</b>')
+            FacultyActivity.objects.filter(pk=activity.pk).update(timestamp=now - timedelta(minutes=minutes))
+            activity.refresh_from_db()
+            self.activities.append(activity)
+        self.newest_first = [activity.pk for activity in reversed(self.activities)]
+        self.feed = FacultyActivity.objects.all()
+
+    def page_ids(self, page):
+        return [decode_cursor(cursor)[1] for cursor in (page.previous_cursor, page.next_cursor)]
+
+    def walk(self, **kwargs):
+        """
+        Returns the pages of the feed read by following `next_cursor` from the given page.
+        """
+        pages = []
+        page = activity_page(self.feed, self.faculty, per_page=3, **kwargs)
+        while True:
+            first, last = self.page_ids(page)
+            pages.append((first, last, len(page)))
+            if not page.has_next:
+                return pages
+            page = activity_page(self.feed, self.faculty, after=page.next_cursor, per_page=3)
+
+    def test_pages_cover_the_feed_once(self):
+        pages = self.walk()
+
+        ids = self.newest_first
+        self.assertEqual(pages, [(ids[0], ids[2], 3), (ids[3], ids[5], 3), (ids[6], ids[6], 1)])
+
+    def test_previous_page_returns_the_newer_rows(self):
+        second = activity_page(self.feed, self.faculty, after=encode_cursor(self.activities[-3]), per_page=3)
+        newer = activity_page(self.feed, self.faculty, before=second.previous_cursor, per_page=3)
+
+        self.assertEqual(self.page_ids(newer), [self.newest_first[0], self.newest_first[2]])
+        self.assertFalse(newer.has_previous)
+        self.assertTrue(newer.has_next)
+
+    def test_oldest_page_and_malformed_cursors(self):
+        oldest = activity_page(self.feed, self.faculty, oldest=True, per_page=3)
+        newest = activity_page(self.feed, self.faculty, after='not-a-cursor', per_page=3)
+
+        self.assertEqual(self.page_ids(oldest), [self.newest_first[4], self.newest_first[6]])
+        self.assertFalse(oldest.has_next)
+        self.assertEqual(self.page_ids(newest), [self.newest_first[0], self.newest_first[2]])
+
+    def test_messages_are_escaped_and_attributed(self):
+        FacultyActivity.objects.create(faculty=self.faculty, action='Viewed Class Report', course='BCA', semester='3')
+
+        page = activity_page(self.feed, self.faculty, per_page=2, with_timestamp=False)
+
+        self.assertEqual(page.activities[0], 'You viewed the class report of BCA, Sem 3')
+        self.assertIn('Other Faculty added a problem', page.activities[1])
+        self.assertIn('&lt;b&gt;Sort&lt;/b&gt;', page.activities[1])
+
+    def test_feed_view_renders_a_page(self):
+        self.client.force_login(self.faculty, backend='faculty.backends.FacultyBackend')
+
+        response = self.client.get('/faculty/other-activities/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page_obj']), 7)
@@ -13,10 +13,14 @@ urlpatterns = [
     path('check-student-details/',views.check_student_details_faculty,name='check_student_details_faculty'),
     path('log_activity/', views.log_activity_faculty, name='log_activity_faculty'),
     path('fetch-whole-class-weekly/', views.fetch_whole_class_weekly_faculty, name='fetch_whole_class_weekly_faculty'),
+    path('export-whole-class-weekly/', views.export_whole_class_weekly_faculty, name='export_whole_class_weekly_faculty'),
     path('check-whole-class-weekly/', views.check_whole_class_weekly_faculty, name='check_whole_class_weekly_faculty'),
     path('fetch-whole-class/', views.fetch_whole_class_faculty, name='fetch_whole_class_faculty'),
+    path('export-whole-class/', views.export_whole_class_faculty, name='export_whole_class_faculty'),
+    path('stream-whole-class/', views.stream_whole_class_faculty, name='stream_whole_class_faculty'),
     path('check-whole-class/', views.check_whole_class_faculty, name='check_whole_class_faculty'),
     path('trigger-update/', views.trigger_update_faculty, name='trigger_update_faculty'),
+    path('update-status/<uuid:job_id>/', views.update_status_faculty, name='update_status_faculty'),
     path('start-new/', views.delete_old_students_faculty, name='start_a_new_semester_faculty'),
     path('your-activities/', views.your_activity_faculty, name='your_activities_faculty'),
     path('other-activities/', views.other_activity_faculty, name='other_activities_faculty'),
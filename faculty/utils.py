@@ -1,10 +1,17 @@
+from datetime import timedelta
 from django.conf import settings
-from problems.models import ProblemCompletion, Problem, WeekCommit
-from django.utils.dateparse import parse_datetime
-import requests
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Exists, F, OuterRef, Q
+from django.utils import timezone
+from faculty.models import CohortRefreshLease, DataUpdateJob, LastDateOfWeek
+from problems.github import GitHubClient, ResponseCache
+from problems.models import Problem, StudentWeekProgress, SyncRun
+from problems.sync import (SyncBatch, fetch_with_telemetry, group_problems_by_week, record_student_results,
+                           snapshot_source)
+import time
 from students.models import Student
 
-def update_student_data(course, semester):
+def update_student_data(course, semester, progress=None):
     """
     Updates the progress of students for a given course and semester by checking their problem completions
     and GitHub commits. It connects to the students' GitHub repositories, checks the files for each week's
@@ -13,192 +20,436 @@ def update_student_data(course, semester):
     Parameters:
     - course (str): The course the students are enrolled in.
     - semester (str): The semester of the students.
+    - progress (callable, optional): Called after each student with the number of students done, the total
+      and an error message (None if the student's repository was read successfully).
 
-    This function uses the GitHub API to fetch repository contents and checks for specific files related
-    to problems in the course. It verifies whether each student has completed their problems and updates
-    the `ProblemCompletion` and `WeekCommit` models.
+    Repositories whose HEAD commit has not moved since the last complete sync are skipped after a single
+    request. Any other repository is read with a single Git Trees snapshot call (see `problems.sync.fetch_snapshot`);
+    the commit history of a week folder is only requested when its contents changed since the last sync.
+    Requests are sent conditionally through the shared response cache, so unchanged repositories are
+    answered with `304 Not Modified` and do not count against the rate limit.
+    The results are written to the `ProblemCompletion` and `WeekCommit` models in a single transaction
+    once every repository has been read. The cost of the refresh is recorded as a `SyncRun`.
+
+    Returns:
+    - int: The number of rows changed.
 
     External Dependencies:
-    - Uses the `GITHUB_TOKEN2` from Django settings for GitHub API authentication.
+    - Spreads its requests over every token in `GITHUB_TOKENS` from Django settings (which includes
+      `GITHUB_TOKEN` and `GITHUB_TOKEN2`) through a rate-limit-aware `TokenPool`.
 
     Example usage:
     ```
     update_student_data('CS101', 'Fall2024')
     ```
     """
-    problems = Problem.objects.filter(course=course, semester=semester)
-    students = Student.objects.filter(course=course, semester=semester)
-    token = settings.GITHUB_TOKEN2
+    started = time.monotonic()
+    run = SyncRun.objects.create(kind='faculty', course=course, semester=semester)
+    problems_by_week = group_problems_by_week(Problem.objects.filter(course=course, semester=semester))
+    students = list(Student.objects.filter(course=course, semester=semester, is_superuser=False))
+    client = GitHubClient(cache=ResponseCache(settings.GITHUB_CACHE_DIR))
+    source = snapshot_source(client)
+    writer = SyncBatch(students)
+    results = []
+
+    for done, student in enumerate(students, start=1):
+        snapshot, error, cost = fetch_with_telemetry(source, student, problems_by_week,
+                                                     writer.sync_state(student, problems_by_week))
+        results.append((student, snapshot, error, cost))
+        if error:
+            error = f"{student.username}: {error}"
+        else:
+            writer.add(student, problems_by_week, snapshot)
+
+        if progress:
+            progress(done, len(students), error)
+
+    rows_changed = writer.commit()
+    record_student_results(run.id, writer, results)
+    run.finish(time.monotonic() - started, client.pool.lowest_remaining())
+    return rows_changed
+
+
+def request_refresh(faculty, course, semester):
+    """
+    Starts a data refresh for a cohort, or joins the one already holding the cohort's lease.
 
-    headers = {"Authorization": f"token {token}"}
+    A new `DataUpdateJob` is only enqueued when the cohort has no `CohortRefreshLease` or its lease has
+    expired. Taking over an expired lease is a compare-and-swap on its expiry, and creating a new lease
+    relies on the unique (course, semester) constraint, so two requests racing for the same cohort always
+    end up on the same job. Refreshes of different cohorts never wait for each other.
 
-    for student in students:
-        if student.is_superuser:
-            continue
+    Parameters:
+    - faculty (Faculty): The faculty member requesting the refresh.
+    - course (str): The course to refresh.
+    - semester (str): The semester to refresh.
 
-        repo_name = student.repo_name
-        url = f"https://api.github.com/repos/{student.username}/{repo_name}/contents/"
-        print(student.repo_name)
-        try:
-            response = requests.get(url, headers=headers)
-            print(response.status_code)
-            if response.status_code == 404:
+    Returns:
+    - tuple: The job serving the request and a boolean that is True if the job was created by this call.
+    """
+    while True:
+        now = timezone.now()
+        expires_at = now + timedelta(seconds=settings.REFRESH_LEASE_SECONDS)
+        lease = CohortRefreshLease.objects.select_related('job').filter(course=course, semester=semester).first()
+
+        if lease and lease.expires_at > now:
+            return lease.job, False
+
+        with transaction.atomic():
+            job = DataUpdateJob.objects.create(faculty=faculty, course=course, semester=semester)
+            if lease:
+                taken = CohortRefreshLease.objects.filter(id=lease.id, expires_at=lease.expires_at).update(
+                    job=job, expires_at=expires_at
+                )
+            else:
+                try:
+                    with transaction.atomic():
+                        CohortRefreshLease.objects.create(course=course, semester=semester, job=job,
+                                                          expires_at=expires_at)
+                    taken = True
+                except IntegrityError:
+                    taken = False
+
+            if not taken:
+                # Another request won the race; drop our job and join theirs.
+                job.delete()
                 continue
 
-            response.raise_for_status()
-            repo_contents = response.json()
-            week_dirs = {content['name']: content['url'] for content in repo_contents
-                         if content['type'] == 'dir' and content['name'].startswith('Week')}
+            if lease:
+                # The previous holder stopped renewing its lease, so its worker is gone.
+                DataUpdateJob.objects.filter(
+                    id=lease.job_id, status__in=[DataUpdateJob.QUEUED, DataUpdateJob.RUNNING]
+                ).update(status=DataUpdateJob.FAILED, error_log='Lease expired before the update finished',
+                         finished_at=now)
+        return job, True
 
-            week_content_cache = {}
-            commit_cache = {}
 
-            problems_by_week = {}
+def claim_update_job():
+    """
+    Claims the oldest queued `DataUpdateJob` for the calling worker.
 
-            # Organize problems by week
-            for problem in problems:
-                week_number = problem.week
-                if week_number not in problems_by_week:
-                    problems_by_week[week_number] = []
-                problems_by_week[week_number].append(problem)
+    The claim is a conditional `UPDATE ... WHERE status = 'queued'`, so when several workers poll the queue
+    only one of them gets each job. Claiming a job renews its cohort's lease.
 
-            # Iterate over each week and check if the problem files exist in the repository
-            for week_number, week_problems in problems_by_week.items():
-                week_dir_name = f"Week{week_number}"
-                if week_dir_name not in week_dirs:
-                    continue
+    Returns:
+    - DataUpdateJob or None: The claimed job, now marked as running, or None if the queue is empty.
+    """
+    for job_id in DataUpdateJob.objects.filter(status=DataUpdateJob.QUEUED).values_list('id', flat=True):
+        claimed = DataUpdateJob.objects.filter(id=job_id, status=DataUpdateJob.QUEUED).update(
+            status=DataUpdateJob.RUNNING, started_at=timezone.now()
+        )
+        if claimed:
+            CohortRefreshLease.objects.filter(job_id=job_id).update(
+                expires_at=timezone.now() + timedelta(seconds=settings.REFRESH_LEASE_SECONDS)
+            )
+            return DataUpdateJob.objects.get(id=job_id)
+    return None
 
-                if week_dir_name not in week_content_cache:
-                    week_url = week_dirs[week_dir_name]
-                    week_response = requests.get(week_url, headers=headers)
-                    week_response.raise_for_status()
-                    week_content_cache[week_dir_name] = week_response.json()
 
-                week_contents = week_content_cache[week_dir_name]
+def run_update_job(job):
+    """
+    Runs a claimed `DataUpdateJob`, writing its progress to the job row after every student so the
+    dashboard can poll it.
+
+    The cohort's lease is renewed with every progress update. When the job finishes, the lease is kept for
+    `REFRESH_COOLDOWN_SECONDS` so that new requests reuse the fresh result; when it fails, the lease is
+    released so the refresh can be retried right away.
+
+    Parameters:
+    - job (DataUpdateJob): A job returned by `claim_update_job`.
+    """
+    error_log = []
+    lease = CohortRefreshLease.objects.filter(job=job)
+
+    def progress(done, total, error):
+        if error:
+            error_log.append(error)
+        DataUpdateJob.objects.filter(id=job.id).update(
+            done=done, total=total, errors=len(error_log), error_log="\n".join(error_log)
+        )
+        lease.update(expires_at=timezone.now() + timedelta(seconds=settings.REFRESH_LEASE_SECONDS))
 
-                for problem in week_problems:
-                    check_problem(student, problem, week_contents)
+    try:
+        rows_changed = update_student_data(job.course, job.semester, progress=progress)
+    except Exception as e:
+        error_log.append(f"Update failed: {e!r}")
+        DataUpdateJob.objects.filter(id=job.id).update(
+            status=DataUpdateJob.FAILED, error_log="\n".join(error_log), finished_at=timezone.now()
+        )
+        lease.delete()
+        raise
 
-                # Update commit information for the week
-                if week_dir_name not in commit_cache:
-                    commit_cache[week_dir_name] = update_week(
-                        student, week_number, repo_name, week_dir_name, headers
-                    )
+    DataUpdateJob.objects.filter(id=job.id).update(
+        status=DataUpdateJob.FINISHED, rows_changed=rows_changed, finished_at=timezone.now()
+    )
+    lease.update(expires_at=timezone.now() + timedelta(seconds=settings.REFRESH_COOLDOWN_SECONDS))
 
-        except requests.exceptions.RequestException as e:
-            continue
 
-def check_problem(student, problem, week_contents):
+def whole_class_report(course, semester):
     """
-    Checks whether a specific problem file exists in the student's repository for a given week.
+    Builds the weekly progress report of every student in a course and semester.
 
-    Parameters:
-    - student (Student): The student whose repository is being checked.
-    - problem (Problem): The problem being verified.
-    - week_contents (list): The list of files and directories in the student's repository for the specific week.
+    The report is read from the materialized `StudentWeekProgress` table by `iter_whole_class_report`, so the
+    number of queries depends on the number of chunks of students, not on the number of students or weeks.
 
-    This function checks if a problem file with one of the allowed extensions (like .cpp, .py, etc.)
-    exists in the student's GitHub repository for the specified week. It also checks for associated
-    output image files. The results are recorded in the `ProblemCompletion` model.
+    Parameters:
+    - course (str): The course of the class.
+    - semester (str): The semester of the class.
+
+    Returns:
+    - list: One dictionary per student, ordered by faculty number, with `enrollment_number`,
+      `faculty_number`, `name` and `weeks_data`, a list holding the `week`, `total_problems`,
+      `problems_solved`, `last_commit_time` ("No Commits" if none) and `commit_status` ("On Time", "Late",
+      "----" when nothing was committed before a set deadline, "-----" when the week has no deadline) of
+      every week that has problems.
+    """
+    return list(iter_whole_class_report(course, semester))
 
-    File extensions checked:
-    - Source code: ['.cpp', '.java', '.py', '.c', '.js', '.rb', '.go', '.swift']
-    - Image files: ['.jpg', '.jpeg', '.png']
 
-    Example usage:
-    ```
-    check_problem(student, problem, week_contents)
-    ```
+def iter_whole_class_report(course, semester, chunk_size=500):
     """
-    file_extensions = ['.cpp', '.java', '.py', '.c', '.js', '.rb', '.go', '.swift']
-    image_extensions = ['.jpg', '.jpeg', '.png']
-    formatted_problem_number = problem.problemNumber.replace(" ", "")
-
-    completion = ProblemCompletion.objects.filter(student=student, problem=problem).first()
-
-    problem_completed = False
-    solution_url = None
-    output_image_url = None
-
-    # Check for solution files
-    for extension in file_extensions:
-        problem_file_name = f"{formatted_problem_number}{extension}"
-        matching_file = next((file for file in week_contents if file['name'] == problem_file_name), None)
-        if matching_file:
-            problem_completed = True
-            solution_url = matching_file['download_url']
-
-    # Check for output image files
-    for extension in image_extensions:
-        image_file_name = f"{formatted_problem_number}{extension}"
-        matching_image = next((file for file in week_contents if file['name'] == image_file_name), None)
-        if matching_image:
-            output_image_url = matching_image['download_url']
-
-    # Update or create ProblemCompletion object
-    if not completion:
-        completion = ProblemCompletion.objects.create(
-            student=student,
-            problem=problem,
-            is_completed=problem_completed,
-            solution_url=solution_url,
-            output_image_url=output_image_url
-        )
-    else:
-        if (completion.is_completed != problem_completed or
-                completion.solution_url != solution_url or
-                completion.output_image_url != output_image_url):
-            completion.is_completed = problem_completed
-            completion.solution_url = solution_url
-            completion.output_image_url = output_image_url
-            completion.save()
+    Yields the entries of `whole_class_report` one student at a time.
+
+    Students are read in chunks of `chunk_size`, ordered by faculty number, and each chunk's progress rows
+    are read with one more query. At most one chunk is held in memory, so the report can be streamed for a
+    class of any size (see `stream_whole_class_faculty`).
 
-def update_week(student, week_number, repo_name, week_dir_name, headers):
+    Parameters:
+    - course (str): The course of the class.
+    - semester (str): The semester of the class.
+    - chunk_size (int): Number of students read per query.
+
+    Yields:
+    - dict: One entry of `whole_class_report`.
+    """
+    total_problems = dict(Problem.objects.filter(course=course, semester=semester).order_by()
+                          .values('week').annotate(total=Count('id')).values_list('week', 'total'))
+    available_weeks = sorted(total_problems)
+
+    students = (Student.objects.filter(course=course, semester=semester).order_by('faculty_number')
+                .only('id', 'enrollment_number', 'faculty_number', 'first_name', 'last_name'))
+    last_faculty_number = None
+    while True:
+        # Keyset pagination on the (unique) faculty number keeps every chunk query equally cheap
+        chunk = students.filter(faculty_number__gt=last_faculty_number) if last_faculty_number is not None else students
+        chunk = list(chunk[:chunk_size])
+        if not chunk:
+            return
+        last_faculty_number = chunk[-1].faculty_number
+
+        progress = {(row.student_id, row.week_number): row for row in
+                    StudentWeekProgress.objects.filter(student_id__in=[student.id for student in chunk])}
+
+        for student in chunk:
+            weeks_data = []
+            for week in available_weeks:
+                row = progress.get((student.id, week))
+                committed = row is not None and row.committed
+
+                if row is None or not row.last_date:
+                    commit_status = "-----"
+                elif not committed:
+                    commit_status = "----"
+                else:
+                    commit_status = "Late" if row.is_late else "On Time"
+
+                weeks_data.append({
+                    'week': week,
+                    'total_problems': total_problems[week],
+                    'problems_solved': row.problems_solved if row else 0,
+                    'last_commit_time': row.last_commit_time if committed else "No Commits",
+                    'commit_status': commit_status
+                })
+
+            yield {
+                'enrollment_number': student.enrollment_number,
+                'faculty_number': student.faculty_number,
+                'name': f"{student.first_name} {student.last_name}",
+                'weeks_data': weeks_data
+            }
+
+        if len(chunk) < chunk_size:
+            return
+
+
+def weekly_class_report(course, semester, week):
     """
-    Updates the commit information for a specific week by retrieving the latest commit from the student's
-    GitHub repository for that week's directory.
+    Builds the progress report of every student in a course and semester for one week.
 
     Parameters:
-    - student (Student): The student whose repository is being checked.
-    - week_number (int): The week number being checked.
-    - repo_name (str): The name of the student's GitHub repository.
-    - week_dir_name (str): The name of the directory for the specific week in the repository.
-    - headers (dict): The authorization headers for the GitHub API request.
+    - course (str): The course of the class.
+    - semester (str): The semester of the class.
+    - week (str): The week of the report.
+
+    Returns:
+    - list: One dictionary per student, ordered by faculty number, with `enrollment_number`,
+      `faculty_number`, `full_name`, `last_commit_time` ("No Commits" if none), `problems_solved`,
+      `total_problems` and `status` ("On Time", "Late", "----" when nothing was committed before a set
+      deadline, "-----" when the week has no deadline).
+    """
+    # Fetch all students for the course and semester, ordered by faculty number
+    all_student = Student.objects.filter(course=course, semester=semester).order_by('faculty_number')
 
-    This function queries the GitHub API for the commit history of a specific directory (representing a week).
-    It stores the latest commit's timestamp and hash in the `WeekCommit` model.
+    # Fetch the last date for the week, if it exists
+    week_last_date_2 = LastDateOfWeek.objects.filter(course=course, semester=semester, week=week).first()
+    last_date = week_last_date_2.last_date if week_last_date_2 else None
 
-    Example usage:
-    ```
-    update_week(student, 3, 'repo_name', 'Week3', headers)
-    ```
+    # Get the total number of problems for the week
+    total_problems_in_week = Problem.objects.filter(course=course, semester=semester, week=week).count()
+
+    # Read every student's precomputed progress for the week in one query
+    progress = {row.student_id: row for row in StudentWeekProgress.objects.filter(
+        student__course=course, student__semester=semester, week_number=week)}
+
+    report_data = []  # Initialize a list to hold the report data for each student
+
+    # Loop through each student to gather their weekly progress
+    for student in all_student:
+        row = progress.get(student.id)
+        committed = row is not None and row.committed
+
+        # Determine the submission status based on the last commit time and deadline
+        if not last_date:
+            commit_status = "-----"
+        elif not committed:
+            commit_status = "----"
+        else:
+            commit_status = "Late" if row.is_late else "On Time"
+
+        # Append the student's progress data to the report
+        report_data.append({
+            'enrollment_number': student.enrollment_number,
+            'faculty_number': student.faculty_number,
+            'full_name': f"{student.first_name} {student.last_name}",
+            'last_commit_time': row.last_commit_time if committed else "No Commits",
+            'problems_solved': row.problems_solved if row else 0,
+            'total_problems': total_problems_in_week,
+            'status': commit_status
+        })
+
+    return report_data
+
+
+# Dictionary of the submission statuses in the columnar reports, which send indexes into it
+REPORT_STATUSES = ["On Time", "Late", "----", "-----"]
+
+
+def columnar_class_report(report_data):
     """
-    url = f"https://api.github.com/repos/{student.username}/{repo_name}/commits?path={week_dir_name}"
+    Converts a `whole_class_report` to the compact columnar shape sent for `?format=columnar`.
 
-    try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
+    Instead of one dictionary per student holding one dictionary per week, every field becomes an array with
+    one entry per student, in the order of the report. Statuses are sent as indexes into `statuses`, and a
+    missing commit as null instead of "No Commits".
 
-        commits = response.json()
+    Parameters:
+    - report_data (list): The report, as returned by `whole_class_report`.
 
-        if commits:
-            last_commit = commits[0]
-            last_commit_time = parse_datetime(last_commit['commit']['committer']['date'])
-            last_commit_hash = last_commit['sha']
+    Returns:
+    - dict: `format` ("columnar"), `length` (number of students), `statuses`, `enrollment_number`,
+      `faculty_number` and `name` (arrays), and `weeks`, a list with per week the `week`, `total_problems`
+      and the `problems_solved`, `last_commit_time` and `commit_status` arrays.
+    """
+    weeks = [week['week'] for week in report_data[0]['weeks_data']] if report_data else []
+    status_index = {status: index for index, status in enumerate(REPORT_STATUSES)}
+
+    return {
+        'format': 'columnar',
+        'length': len(report_data),
+        'statuses': REPORT_STATUSES,
+        'enrollment_number': [student['enrollment_number'] for student in report_data],
+        'faculty_number': [student['faculty_number'] for student in report_data],
+        'name': [student['name'] for student in report_data],
+        'weeks': [
+            {
+                'week': week,
+                'total_problems': report_data[0]['weeks_data'][position]['total_problems'],
+                'problems_solved': [student['weeks_data'][position]['problems_solved'] for student in report_data],
+                'last_commit_time': [
+                    None if student['weeks_data'][position]['last_commit_time'] == "No Commits"
+                    else student['weeks_data'][position]['last_commit_time']
+                    for student in report_data
+                ],
+                'commit_status': [status_index[student['weeks_data'][position]['commit_status']]
+                                  for student in report_data],
+            }
+            for position, week in enumerate(weeks)
+        ],
+    }
+
+
+def columnar_weekly_report(report_data):
+    """
+    Converts a `weekly_class_report` to the compact columnar shape sent for `?format=columnar`.
 
-        week_commit, created = WeekCommit.objects.get_or_create(
-            student=student,
-            week_number=week_number,
-            defaults={'last_commit_time': last_commit_time, 'last_commit_hash': last_commit_hash}
-        )
+    Parameters:
+    - report_data (list): The report, as returned by `weekly_class_report`.
 
-        if not created:
-            if (week_commit.last_commit_time != last_commit_time or
-                    week_commit.last_commit_hash != last_commit_hash):
-                week_commit.last_commit_time = last_commit_time
-                week_commit.last_commit_hash = last_commit_hash
-                week_commit.save()
+    Returns:
+    - dict: `format` ("columnar"), `length` (number of students), `statuses`, `total_problems` (the same for
+      every student) and the `enrollment_number`, `faculty_number`, `full_name`, `last_commit_time` (null
+      when nothing was committed), `problems_solved` and `status` (indexes into `statuses`) arrays.
+    """
+    status_index = {status: index for index, status in enumerate(REPORT_STATUSES)}
+
+    return {
+        'format': 'columnar',
+        'length': len(report_data),
+        'statuses': REPORT_STATUSES,
+        'total_problems': report_data[0]['total_problems'] if report_data else 0,
+        'enrollment_number': [student['enrollment_number'] for student in report_data],
+        'faculty_number': [student['faculty_number'] for student in report_data],
+        'full_name': [student['full_name'] for student in report_data],
+        'last_commit_time': [None if student['last_commit_time'] == "No Commits" else student['last_commit_time']
+                             for student in report_data],
+        'problems_solved': [student['problems_solved'] for student in report_data],
+        'status': [status_index[student['status']] for student in report_data],
+    }
+
+
+def week_graph_data(week):
+    """
+    Classifies the submissions of every cohort for one week, for the faculty dashboard graph.
+
+    The classification runs as a single aggregate query over the materialized `StudentWeekProgress` table:
+    the rows of every cohort are grouped by (course, semester) and each category is a conditional count over
+    the group, so the database classifies all rows in one pass. The number of queries stays the same however
+    many cohorts and students there are (see the `benchmark_graph_data` command).
 
-        return True
-    except requests.exceptions.RequestException as e:
-        return False
+    Parameters:
+    - week (int): The week to classify.
+
+    Returns:
+    - list: One dictionary per course-semester pair with at least one student who is not a superuser or staff
+      and problems for the week, holding `course`, `semester`, `late_solved`, `late_unsolved`,
+      `on_time_solved`, `on_time_unsolved` and `not_committed`. As on the original dashboard, the counts cover
+      every student of such a pair, staff and superuser accounts included. A commit for a week without a
+      deadline counts as on time.
+    """
+    late = Q(committed=True, is_late=True)
+    on_time = Q(committed=True) & ~Q(is_late=True)
+    solved = Q(problems_solved=F('total_problems'))
+    regular_students = Student.objects.filter(course=OuterRef('student__course'), semester=OuterRef('student__semester'),
+                                              is_superuser=False, is_staff=False)
+
+    rows = (
+        StudentWeekProgress.objects
+        .filter(Exists(regular_students), week_number=week)
+        .values('student__course', 'student__semester')
+        .order_by('student__course', 'student__semester')
+        .annotate(
+            late_solved=Count('id', filter=late & solved),
+            late_unsolved=Count('id', filter=late & ~solved),
+            on_time_solved=Count('id', filter=on_time & solved),
+            on_time_unsolved=Count('id', filter=on_time & ~solved),
+            not_committed=Count('id', filter=Q(committed=False)),
+        )
+    )
+    return [
+        {
+            'course': row.pop('student__course'),
+            'semester': row.pop('student__semester'),
+            **row,
+        }
+        for row in rows
+    ]
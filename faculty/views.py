@@ -1,20 +1,28 @@
 from datetime import timedelta
 from django.contrib.auth import authenticate, login
-from django.core.paginator import Paginator
-from django.http import JsonResponse
+import hashlib
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Max
+from django.http import FileResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.shortcuts import redirect, render
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.gzip import gzip_page
 from django.views.decorators.http import require_GET, require_POST, require_http_methods
 from LabTrackerAMU.decorators import faculty_required
-from problems.models import Problem, ProblemCompletion, WeekCommit
+from problems.models import Problem, StudentWeekProgress
 from students.models import Student
 from .forms import FacultyLoginForm, ChangePasswordForm, LastDateOfWeekForm
-from .models import Faculty, FacultyActivity, LastDateOfWeek
+from .models import DataUpdateJob, Faculty, FacultyActivity, LastDateOfWeek
 from django.contrib.auth import logout
 from django.contrib import messages
-from .utils import update_student_data
-from django.utils.dateformat import format
+from .utils import columnar_class_report, columnar_weekly_report, iter_whole_class_report, request_refresh, week_graph_data, weekly_class_report, whole_class_report
+from problems.report_cache import cached_export, cached_report
+from .activity import activity_page
+from .exports import EXPORT_CONTENT_TYPES, write_class_report, write_weekly_report
 
 def faculty_login(request):
     """
@@ -550,10 +558,14 @@ def fetch_student_details_faculty(request):
     ```
 
     Notes:
-    - The `ProblemCompletion` model tracks problems solved by the student, and the `WeekCommit` model tracks the
-      commit history for each week.
+    - The details are read from the `StudentWeekProgress` table, which is precomputed from the `ProblemCompletion`,
+      `WeekCommit` and `LastDateOfWeek` models.
     - The `LastDateOfWeek` model is used to determine whether a submission was made on time or late, based on the last date for each week.
     - If no commit or last date exists for a particular week, the status is set to "-----".
+    - The details are cached by `problems.report_cache` until the data of the student's cohort changes.
+    - The response carries `ETag` and `Last-Modified` headers derived from the latest update of the student's
+      progress rows. A lookup sending them back (`If-None-Match` / `If-Modified-Since`) is answered with
+      `304 Not Modified` after two small queries, without building or reading the details.
     """
     faculty_number = request.GET.get('faculty_number')
     try:
@@ -561,49 +573,55 @@ def fetch_student_details_faculty(request):
     except Student.DoesNotExist:
         return JsonResponse({'error': 'Student not found'}, status=404)
 
-    # Fetch total problems solved by the student across all weeks
-    problem_solved_overall = ProblemCompletion.objects.filter(student=student, is_completed=True).count()
-
-    # Get all distinct weeks available for the student's course and semester
-    available_weeks = list(Problem.objects.filter(course=student.course, semester=student.semester)
-                           .values_list('week', flat=True).distinct())
-    available_weeks.sort()
-
-    # Initialize variables to hold weekly data
-    problems_solved_weekly = []
-    total_problems = []
-    last_commit_times = []
-    statuses = []
-
-    # Iterate over each available week to gather data
-    for week_number in available_weeks:
-        # Get total problems for the week
-        total_problems_count = Problem.objects.filter(course=student.course, semester=student.semester, week=week_number).count()
-        total_problems.append(total_problems_count)
-
-        # Count problems solved by the student in the week
-        week_solved = ProblemCompletion.objects.filter(student=student, problem__week=week_number, is_completed=True).count()
-        problems_solved_weekly.append(week_solved)
-
-        # Get the last commit for the week (if exists)
-        week_commit = WeekCommit.objects.filter(student=student, week_number=week_number).first()
-        if week_commit:
-            last_commit_times.append({
-                'last_commit_time': week_commit.last_commit_time,
-                'last_commit_hash': week_commit.last_commit_hash
-            })
-        else:
-            last_commit_times.append("Not Committed")
+    # The validators change whenever the student's progress rows are rewritten, i.e. after any change to
+    # their completions or commits, or to the problems and deadlines of their cohort
+    latest = StudentWeekProgress.objects.filter(student=student).aggregate(
+        updated_at=Max('updated_at'), weeks=Count('id'))
+    version = (f"{student.pk}:{student.first_name}:{student.last_name}:{student.enrollment_number}:"
+               f"{student.course}:{student.semester}:{latest['updated_at']}:{latest['weeks']}")
+    etag = quote_etag(hashlib.sha256(version.encode()).hexdigest()[:32])
+    last_modified = int(latest['updated_at'].timestamp()) if latest['updated_at'] else None
+
+    # Answer repeated lookups with 304 Not Modified before building the details
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    # The details are cached until the student's cohort data changes
+    student_details = cached_report('student-details', lambda: student_details_report(student),
+                                    student.course, student.semester, faculty_number=faculty_number)
+
+    response = JsonResponse(student_details)
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # Let the browser keep the response, but make it revalidate on every lookup
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def student_details_report(student):
+    """
+    Builds the details returned by `fetch_student_details_faculty` for one student.
+    """
+    # Read the student's precomputed progress, one row per week with problems
+    progress = list(StudentWeekProgress.objects.filter(student=student).order_by('week_number'))
+
+    available_weeks = [row.week_number for row in progress]
+    problem_solved_overall = sum(row.problems_solved for row in progress)
+    problems_solved_weekly = [row.problems_solved for row in progress]
+    total_problems = [row.total_problems for row in progress]
+    last_commit_times = [
+        {'last_commit_time': row.last_commit_time, 'last_commit_hash': row.last_commit_hash}
+        if row.committed else "Not Committed"
+        for row in progress
+    ]
 
-        # Determine whether the commit was on time or late
-        week_last = LastDateOfWeek.objects.filter(course=student.course, semester=student.semester, week=week_number).first()
-        if week_commit and week_last:
-            if week_commit.last_commit_time.date() > week_last.last_date:
-                statuses.append("Late")
-            else:
-                statuses.append("On Time")
-        else:
-            statuses.append("-----")
+    # Determine whether each week's commit was on time or late
+    statuses = [
+        ("Late" if row.is_late else "On Time") if row.committed and row.last_date else "-----"
+        for row in progress
+    ]
 
     # Prepare the student details to be returned in the response
     student_details = {
@@ -620,7 +638,7 @@ def fetch_student_details_faculty(request):
         'statuses': statuses
     }
 
-    return JsonResponse(student_details)
+    return student_details
 
 @faculty_required
 def check_student_details_faculty(request):
@@ -717,6 +735,7 @@ def log_activity_faculty(request):
 
 @faculty_required
 @require_GET
+@gzip_page
 def fetch_whole_class_weekly_faculty(request):
     """
     Fetches the weekly progress of all students in a particular course and semester.
@@ -783,66 +802,95 @@ def fetch_whole_class_weekly_faculty(request):
 
     Notes:
     - The `LastDateOfWeek` model is used to determine the last allowed submission date for the week.
-    - The `ProblemCompletion` model tracks the problems solved by the student.
-    - The `WeekCommit` model tracks the last commit time for each student and week.
+    - The problems solved and the last commit of each student are read from the precomputed
+      `StudentWeekProgress` table, with one query for the whole class.
     - If no commit or last date exists for a particular week, the status is marked as "-----".
+    - The report is cached by `problems.report_cache` until the data of the cohort changes.
+    - With `format=columnar` in the query, the same data is sent in the compact shape of
+      `faculty.utils.columnar_weekly_report`: one array per field and statuses as indexes. Responses are
+      gzip-compressed for clients accepting it.
     """
     course = request.GET.get('course')  # Get the course from the query parameters
     semester = request.GET.get('semester')  # Get the semester from the query parameters
     week = request.GET.get('week')  # Get the week number from the query parameters
 
-    # Fetch all students for the course and semester, ordered by faculty number
-    all_student = Student.objects.filter(course=course, semester=semester).order_by('faculty_number')
+    # The report is cached until the cohort's data changes
+    report_data = cached_report('whole-class-weekly', lambda: weekly_class_report(course, semester, week),
+                                course, semester, week=week)
 
-    # Fetch the last date for the week, if it exists
-    week_last_date_2 = LastDateOfWeek.objects.filter(course=course, semester=semester, week=week).first()
-    last_date = week_last_date_2.last_date if week_last_date_2 else None
+    if request.GET.get('format') == 'columnar':
+        return JsonResponse(columnar_weekly_report(report_data))
 
-    # Get the total number of problems for the week
-    total_problems_in_week = Problem.objects.filter(course=course, semester=semester, week=week).count()
+    # Return the report data as a JSON response
+    return JsonResponse(report_data, safe=False)
 
-    report_data = []  # Initialize a list to hold the report data for each student
 
-    # Loop through each student to gather their weekly progress
-    for student in all_student:
-        # Fetch the last commit for the student in the given week
-        week_commit = WeekCommit.objects.filter(student=student, week_number=week).first()
+def export_request_error(course, semester, file_format, week=None):
+    """
+    Checks the query parameters of a report export, so that no file is built or cached for a cohort that
+    does not exist.
 
-        # Count the problems solved by the student for the week
-        problems_solved = ProblemCompletion.objects.filter(student=student, problem__week=week, is_completed=True).count()
+    Returns:
+    - An `HttpResponseBadRequest` naming the first missing or unknown parameter, or None if they are valid.
+      `week` is only checked when not None, for the weekly export.
+    """
+    if course not in dict(Student.COURSE_CHOICES):
+        return HttpResponseBadRequest('Unknown or missing course')
+    if semester not in dict(Student.SEMESTER_CHOICES):
+        return HttpResponseBadRequest('Unknown or missing semester')
+    if week is not None and not (week.isdigit() and int(week) > 0):
+        return HttpResponseBadRequest('Unknown or missing week')
+    if file_format not in EXPORT_CONTENT_TYPES:
+        return HttpResponseBadRequest('Unsupported format')
+    return None
 
-        # Determine the submission status based on the last commit time and deadline
-        if last_date:
-            if week_commit:
-                last_commit_time = week_commit.last_commit_time
-                if last_commit_time.date() > last_date:
-                    commit_status = "Late"
-                else:
-                    commit_status = "On Time"
-            else:
-                last_commit_time = "No Commits"
-                commit_status = "----"
-        else:
-            if week_commit:
-                last_commit_time = week_commit.last_commit_time
-                commit_status = "-----"
-            else:
-                last_commit_time = "No Commits"
-                commit_status = "-----"
-
-        # Append the student's progress data to the report
-        report_data.append({
-            'enrollment_number': student.enrollment_number,
-            'faculty_number': student.faculty_number,
-            'full_name': f"{student.first_name} {student.last_name}",
-            'last_commit_time': last_commit_time,
-            'problems_solved': problems_solved,
-            'total_problems': total_problems_in_week,
-            'status': commit_status
-        })
 
-    # Return the report data as a JSON response
-    return JsonResponse(report_data, safe=False)
+@faculty_required
+@require_GET
+def export_whole_class_weekly_faculty(request):
+    """
+    Downloads the weekly report of `fetch_whole_class_weekly_faculty` as a CSV, XLSX or PDF file.
+
+    Decorators:
+    - `@faculty_required`: Ensures that only authenticated faculty members can access this view.
+    - `@require_GET`: Restricts this view to GET requests only.
+
+    Parameters:
+    - `request`: The HTTP request object, with the `course`, `semester` and `week` query parameters, and
+      `format` ('csv', 'xlsx' or 'pdf', default 'xlsx').
+
+    Returns:
+    - The file as an attachment named like `BCASem3Week2.xlsx`, sent in chunks, or a 400 Bad Request for a
+      missing or unknown course, semester, week or format.
+
+    Example usage:
+    ```
+    GET /faculty/export-whole-class-weekly/?course=BCA&semester=3&week=2&format=pdf
+    ```
+
+    Notes:
+    - The file is built row by row by `faculty.exports` and kept by `problems.report_cache.cached_export`
+      until the data of the cohort changes, so repeated downloads are served from disk. The first download
+      after a change builds the file within the request.
+    - Logs the "Downloaded Weekly Class Report" activity.
+    """
+    course = request.GET.get('course')
+    semester = request.GET.get('semester')
+    week = request.GET.get('week', '')
+    file_format = request.GET.get('format', 'xlsx')
+    error = export_request_error(course, semester, file_format, week)
+    if error:
+        return error
+
+    path = cached_export('whole-class-weekly', file_format,
+                         lambda file: write_weekly_report(file, file_format, course, semester, week),
+                         course, semester, week=week)
+
+    FacultyActivity.objects.create(faculty=request.user, action='Downloaded Weekly Class Report',
+                                   course=course, semester=semester, week=week)
+
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=f"{course}Sem{semester}Week{week}.{file_format}",
+                        content_type=EXPORT_CONTENT_TYPES[file_format])
 
 @faculty_required
 def check_whole_class_weekly_faculty(request):
@@ -850,6 +898,7 @@ def check_whole_class_weekly_faculty(request):
 
 @faculty_required
 @require_GET
+@gzip_page
 def fetch_whole_class_faculty(request):
     """
         Fetches a weekly progress report for all students in a specific course and semester.
@@ -875,6 +924,14 @@ def fetch_whole_class_faculty(request):
             - Iterates over each available week.
             - Gathers data on total problems assigned, problems solved, last commit time, and submission status.
             - Determines commit status based on comparison between the last commit time and the last allowed date for that week.
+        - The report is built by `whole_class_report` from the materialized `StudentWeekProgress` table, so the
+          number of queries does not grow with the size of the class.
+        - The report is cached by `problems.report_cache`: it is rebuilt only after the data of the cohort
+          changes (a sync, instructor feedback, a new problem or deadline).
+        - With `format=columnar` in the query, the same data is sent in the compact shape of
+          `faculty.utils.columnar_class_report`: one array per field, one entry per week holding arrays
+          over the students, and statuses as indexes into a dictionary. Responses are gzip-compressed for
+          clients accepting it.
 
         Returns:
         - A JSON response containing a list of student progress dictionaries.
@@ -943,57 +1000,106 @@ def fetch_whole_class_faculty(request):
     course = request.GET.get('course')
     semester = request.GET.get('semester')
 
-    all_student = Student.objects.filter(course=course, semester=semester).order_by('faculty_number')
-    available_weeks = list(Problem.objects.filter(course=course, semester=semester).values_list('week', flat=True).distinct())
-    available_weeks.sort()
-
-    report_data = []
-
-    for student in all_student:
-        weeks_data = []
-
-        for week in available_weeks:
-            week_commit = WeekCommit.objects.filter(student=student, week_number=week).first()
-            problems_solved = ProblemCompletion.objects.filter(student=student, problem__week=week, is_completed=True).count()
-            total_problems = Problem.objects.filter(course=course, semester=semester, week=week).count()
-            week_last = LastDateOfWeek.objects.filter(course=course, semester=semester, week=week).first()
-            last_date = week_last.last_date if week_last else None
-
-            if last_date:
-                if week_commit:
-                    last_commit_time = week_commit.last_commit_time
-                    if last_commit_time.date() > last_date:
-                        commit_status = "Late"
-                    else:
-                        commit_status = "On Time"
-                else:
-                    last_commit_time = "No Commits"
-                    commit_status = "----"
-            else:
-                if week_commit:
-                    last_commit_time = week_commit.last_commit_time
-                    commit_status = "-----"
-                else:
-                    last_commit_time = "No Commits"
-                    commit_status = "-----"
-
-            weeks_data.append({
-                'week': week,
-                'total_problems': total_problems,
-                'problems_solved': problems_solved,
-                'last_commit_time': last_commit_time,
-                'commit_status': commit_status
-            })
-
-        report_data.append({
-            'enrollment_number': student.enrollment_number,
-            'faculty_number': student.faculty_number,
-            'name': f"{student.first_name} {student.last_name}",
-            'weeks_data': weeks_data
-        })
+    report_data = cached_report('whole-class', lambda: whole_class_report(course, semester), course, semester)
+
+    if request.GET.get('format') == 'columnar':
+        return JsonResponse(columnar_class_report(report_data))
 
     return JsonResponse(report_data, safe=False)
 
+@faculty_required
+@require_GET
+def export_whole_class_faculty(request):
+    """
+    Downloads the report of `fetch_whole_class_faculty` as a CSV, XLSX or PDF file.
+
+    Decorators:
+    - `@faculty_required`: Ensures that only authenticated faculty members can access this view.
+    - `@require_GET`: Restricts this view to GET requests only.
+
+    Parameters:
+    - `request`: The HTTP request object, with the `course` and `semester` query parameters, and `format`
+      ('csv', 'xlsx' or 'pdf', default 'xlsx').
+
+    Returns:
+    - The file as an attachment named like `BCASem3.xlsx`, sent in chunks, or a 400 Bad Request for a
+      missing or unknown course, semester or format.
+
+    Example usage:
+    ```
+    GET /faculty/export-whole-class/?course=BCA&semester=3&format=csv
+    ```
+
+    Notes:
+    - The file is built row by row from `iter_whole_class_report` by `faculty.exports` and kept by
+      `problems.report_cache.cached_export` until the data of the cohort changes, so repeated downloads are
+      served from disk. The first download after a change builds the file within the request.
+    - Logs the "Downloaded Class Report" activity.
+    """
+    course = request.GET.get('course')
+    semester = request.GET.get('semester')
+    file_format = request.GET.get('format', 'xlsx')
+    error = export_request_error(course, semester, file_format)
+    if error:
+        return error
+
+    path = cached_export('whole-class', file_format,
+                         lambda file: write_class_report(file, file_format, course, semester), course, semester)
+
+    FacultyActivity.objects.create(faculty=request.user, action='Downloaded Class Report',
+                                   course=course, semester=semester)
+
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=f"{course}Sem{semester}.{file_format}",
+                        content_type=EXPORT_CONTENT_TYPES[file_format])
+
+@faculty_required
+@require_GET
+def stream_whole_class_faculty(request):
+    """
+    Streams the report of `fetch_whole_class_faculty` as NDJSON, one student per line.
+
+    The report is produced by `iter_whole_class_report`, which reads the class in chunks of students, and each
+    student is written to the response as soon as it is built. The page can render rows as they arrive, and
+    the memory used by the server stays the same whatever the size of the class.
+
+    Decorators:
+    - `@faculty_required`: Ensures that only authenticated faculty members can access this view.
+    - `@require_GET`: Restricts the view to GET requests only.
+
+    Parameters:
+    - `request`: The HTTP request object. Must include the `course` and `semester` query parameters.
+
+    Returns:
+    - A `StreamingHttpResponse` of type `application/x-ndjson`. Each line is one JSON object with the keys of
+      the entries of `fetch_whole_class_faculty` (`enrollment_number`, `faculty_number`, `name`, `weeks_data`).
+
+    Example usage:
+    ```
+    GET /faculty/stream-whole-class/?course=BCA&semester=3
+    ```
+
+    Example response:
+    ```
+    {"enrollment_number": "EN10001", "faculty_number": "FN10001", "name": "Alice Smith", "weeks_data": [...]}
+    {"enrollment_number": "EN10002", "faculty_number": "FN10002", "name": "Bob Johnson", "weeks_data": [...]}
+    ```
+
+    Notes:
+    - The streamed report is read from the database on every request rather than from the report cache,
+      which would have to hold the whole report in memory.
+    """
+    course = request.GET.get('course')
+    semester = request.GET.get('semester')
+
+    lines = (json.dumps(student, cls=DjangoJSONEncoder) + "\n"
+             for student in iter_whole_class_report(course, semester))
+
+    response = StreamingHttpResponse(lines, content_type='application/x-ndjson')
+    # Keep proxies from buffering the stream, which would defeat progressive rendering
+    response['X-Accel-Buffering'] = 'no'
+    response['Cache-Control'] = 'no-cache'
+    return response
+
 @faculty_required
 def check_whole_class_faculty(request):
     """
@@ -1035,8 +1141,13 @@ def trigger_update_faculty(request):
        Allows a faculty member to manually trigger an update for student data
        for a specific course and semester.
 
-       This view prevents excessive or repeated updates by enforcing a cooldown
-       of 1 hour between updates for all faculty members. Only POST requests are allowed.
+       The update itself is not run inside the request: the view enqueues a `DataUpdateJob` that the
+       `run_update_jobs` worker process picks up, and immediately returns the job id. The browser then polls
+       `update_status_faculty` for the job's progress.
+
+       Refreshes are coordinated per course and semester through `request_refresh`: while a cohort's
+       refresh lease is held, further requests for that cohort are attached to the running job instead of
+       starting a new one, and refreshes of other cohorts proceed in parallel. Only POST requests are allowed.
 
        Decorators:
        - `@faculty_required`: Restricts access to authenticated faculty users only.
@@ -1049,15 +1160,15 @@ def trigger_update_faculty(request):
            - `semester`: The semester number (e.g., '3').
 
        Behavior:
-       - Checks whether any faculty has triggered a data update in the last hour.
-       - If an update was made within the past hour, returns a JSON error response indicating who triggered it and for which course and semester.
-       - If allowed, invokes the `update_student_data(course, semester)` function to refresh data (such as pulling latest submissions, syncing repositories, etc.).
-       - Records the activity using the `FacultyActivity` model for audit and cooldown purposes.
+       - Enqueues a `DataUpdateJob` for the course and semester, unless the cohort's lease is held by a job
+         that is still queued, running or just finished, in which case that job is returned.
+       - Records the activity using the `FacultyActivity` model when a new job is started.
 
        Returns:
        - `JsonResponse`:
-           - On success: `{ "success": "Data updated successfully" }`
-           - On cooldown error: `{ "error": "Button is disabled for 1 hour because ..." }`
+           - On a new job: `{ "success": "Data update started", "job_id": "<uuid>" }`
+           - On a coalesced request: `{ "success": "<name> already updated/is updating ...", "job_id": "<uuid>" }`
+           - On a missing course or semester: `{ "error": "Course and semester are required" }`
 
        Example request:
        ```http
@@ -1068,24 +1179,26 @@ def trigger_update_faculty(request):
        ```
 
        Notes:
-       - The cooldown is global across faculty. If *any* faculty triggers an update, the button is disabled for all for the next hour.
-       - Consider enhancing with per-course-per-semester cooldown or scoped permissions depending on future needs.
+       - The lease expires when the worker stops renewing it, so a crashed worker blocks its cohort for at
+         most `REFRESH_LEASE_SECONDS`. A finished job is reused for `REFRESH_COOLDOWN_SECONDS`.
        - The update logic itself is encapsulated in the `update_student_data()` function, which should be idempotent and safely re-runnable.
     """
-    last_update = FacultyActivity.objects.filter(action='Updated the data').order_by('-timestamp').first()
-
-    # Check if the last update was within the past hour
-    if last_update and (timezone.now() - last_update.timestamp) < timedelta(hours=1):
-        return JsonResponse({
-            'error': f'Button is disabled for 1 hour because {last_update.faculty.name} updated for {last_update.course}, Semester {last_update.semester}'
-        })
-
     faculty=request.user
     course = request.POST.get('course')
     semester = request.POST.get('semester')
 
-    # Call the function to update student data based on the selected course and semester
-    update_student_data(course, semester)
+    if not course or not semester:
+        return JsonResponse({'error': 'Course and semester are required'})
+
+    # Enqueue the update, or join the one already running for this cohort
+    job, created = request_refresh(faculty, course, semester)
+
+    if not created:
+        state = 'updated' if job.status == DataUpdateJob.FINISHED else 'is updating'
+        return JsonResponse({
+            'success': f'{job.faculty.name} {state} {course}, Semester {semester}',
+            'job_id': str(job.id),
+        })
 
     # Log the teacher's activity
     FacultyActivity.objects.create(
@@ -1095,7 +1208,34 @@ def trigger_update_faculty(request):
         semester=semester,
     )
 
-    return JsonResponse({'success': 'Data updated successfully'})
+    return JsonResponse({'success': 'Data update started', 'job_id': str(job.id)})
+
+@faculty_required
+@require_GET
+def update_status_faculty(request, job_id):
+    """
+       Reports the progress of a data update enqueued by `trigger_update_faculty`.
+
+       Decorators:
+       - `@faculty_required`: Restricts access to authenticated faculty users only.
+       - `@require_GET`: Ensures that only GET requests are accepted.
+
+       Parameters:
+       - `request`: The HTTP GET request object.
+       - `job_id`: The id returned by `trigger_update_faculty`.
+
+       Returns:
+       - `JsonResponse`:
+           - The job's `status` ('queued', 'running', 'finished' or 'failed'), the students `done` out of
+             `total`, the number of `errors` and their `error_log`, the `rows_changed` and the estimated
+             seconds left (`eta_seconds`, null until it can be estimated).
+           - `{ "error": "Update job not found" }` with status 404 for an unknown id.
+    """
+    job = DataUpdateJob.objects.filter(id=job_id).first()
+    if job is None:
+        return JsonResponse({'error': 'Update job not found'}, status=404)
+
+    return JsonResponse(job.progress())
 
 @faculty_required
 @require_GET
@@ -1185,22 +1325,25 @@ def your_activity_faculty(request):
 
        Workflow:
        1. Retrieves the current faculty user from the session (`request.user`).
-       2. Fetches all `FacultyActivity` records associated with that faculty member, ordered by timestamp descending.
-       3. Formats each activity into a human-readable HTML string using a helper function `format_activity2()`.
+       2. Reads one page of 15 `FacultyActivity` records of that faculty member, newest first, with
+          `faculty.activity.activity_page`. Pages are selected with keyset pagination on (timestamp, id), so
+          only the rows on the page are loaded.
+       3. Formats each activity of the page into a human-readable HTML string with `faculty.activity.format_activity`.
           - The function converts timestamps to the local timezone and returns descriptive text depending on the action type.
           - Handles actions like "Added Problem", "Viewed Report", "Started a New Semester", etc.
-       4. Paginates the formatted activity list, 15 entries per page using Django's `Paginator`.
-       5. Passes the paginated activity log and faculty object into the context for rendering.
+       4. Passes the page and faculty object into the context for rendering.
 
        Parameters:
-       - `request`: The HTTP GET request object.
+       - `request`: The HTTP GET request object. The page is selected by the `after` (older page), `before`
+         (newer page) or `oldest` query parameters; without any of them the newest page is shown.
 
        Returns:
        - `HttpResponse`: Renders the `faculty/your_activity.html` template with paginated activity data.
 
        Template Context:
        - `faculty`: The current faculty user.
-       - `page_obj`: The paginated page of formatted activity strings.
+       - `page_obj`: The `ActivityPage` of formatted activity strings, with `has_next`, `has_previous` and
+         the `next_cursor` and `previous_cursor` of the neighbouring pages.
 
        Notes:
        - This log helps faculty members keep track of their administrative actions within the system.
@@ -1208,41 +1351,10 @@ def your_activity_faculty(request):
     """
     faculty=request.user
 
-    # Retrieve all activities of the teacher, sorted by timestamp (most recent first)
-    all_activity = FacultyActivity.objects.filter(faculty=faculty).order_by('-timestamp')
-
-    def format_activity2(activity):
-        timestamp = format(timezone.localtime(activity.timestamp), 'd F Y, H:i')
-
-        # Check the action type and format accordingly
-        if activity.action == 'Added Problem':
-            return f"{timestamp} : You added a problem in {activity.course}, Sem {activity.semester} in Week {activity.week} <br> Problem Description : {activity.description}"
-        elif activity.action == 'Edited Problem':
-            return f"{timestamp} : You edited a problem in {activity.course}, Sem {activity.semester} in Week {activity.week} <br> Problem Description : {activity.description}"
-        elif activity.action == 'Viewed Class Report':
-            return f"{timestamp} : You viewed the class report of {activity.course}, Sem {activity.semester}"
-        elif activity.action == 'Downloaded Class Report':
-            return f"{timestamp} : You downloaded the class report of {activity.course}, Sem {activity.semester}"
-        elif activity.action == 'Started a New Semester':
-            return f"{timestamp} : You started a new Semester"
-        elif activity.action == 'Updated the data':
-            return f"{timestamp} : You updated the data for {activity.course}, Sem {activity.semester}"
-        elif activity.action == 'Viewed Weekly Class Report':
-            return f"{timestamp} : You viewed the weekly report of {activity.course}, Sem {activity.semester}, Week {activity.week}"
-        elif activity.action == 'Downloaded Weekly Class Report':
-            return f"{timestamp} : You downloaded the weekly report of {activity.course}, Sem {activity.semester}, Week {activity.week}"
-        elif activity.action == 'Set Last Date':
-            return f"{timestamp} : You have set the last date for {activity.course}, Sem {activity.semester}, Week {activity.week} as {activity.description}"
-        else:
-            return "Unknown activity"
-
-    # Format each activity into a readable string
-    format_activity = [format_activity2(activity) for activity in all_activity]
-
-    # Paginate the activity list, with 15 activities per page
-    paginator = Paginator(format_activity, 15)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Read and format only the activities of the requested page
+    page_obj = activity_page(FacultyActivity.objects.filter(faculty=faculty), faculty,
+                             after=request.GET.get('after'), before=request.GET.get('before'),
+                             oldest='oldest' in request.GET)
 
     # Prepare the context for the template
     context = {
@@ -1266,66 +1378,35 @@ def other_activity_faculty(request):
 
         Workflow:
         1. Retrieves the currently logged-in faculty user from the request.
-        2. Queries the `FacultyActivity` model for all activity logs **not** performed by the current faculty.
-           Activities are ordered in reverse chronological order (most recent first).
-        3. Each activity is formatted into a readable string via the `format_activity()` helper function.
+        2. Reads one page of 15 `FacultyActivity` logs **not** performed by the current faculty, most recent
+           first, with `faculty.activity.activity_page` (keyset pagination on (timestamp, id), with the faculty
+           members joined in the same query).
+        3. Each activity of the page is formatted into a readable string via `faculty.activity.format_activity`.
            This function includes the timestamp, action, course/semester/week, and a description,
            and attributes the activity to the correct faculty name.
-        4. Paginate the list of formatted activities with 15 entries per page using Django’s `Paginator`.
-        5. Renders the results using the `faculty/other_activity.html` template.
+        4. Renders the results using the `faculty/other_activity.html` template.
 
         Parameters:
-        - `request`: The HTTP GET request object.
+        - `request`: The HTTP GET request object, with the same `after`, `before` and `oldest` page parameters
+          as `your_activity_faculty`.
 
         Returns:
         - `HttpResponse`: Renders a template with a paginated list of faculty activities not performed
           by the current user.
 
         Template Context:
-        - `page_obj`: A paginated list of formatted activity descriptions from other faculty.
+        - `page_obj`: The `ActivityPage` of formatted activity descriptions from other faculty.
 
         Notes:
         - Useful for maintaining transparency and collaboration across teaching staff.
         - Activities include HTML formatting such as `<br>` for better display in templates.
     """
     faculty=request.user
-    # Retrieve all activities performed by other teachers, ordered by timestamp (most recent first)
-    other_teacher_activities = FacultyActivity.objects.exclude(faculty=faculty).order_by('-timestamp')
-
-    def format_activity(activity):
-
-        # Format the timestamp in a readable format
-        timestamp = format(timezone.localtime(activity.timestamp), 'd F Y, H:i')
-
-        # Check the action type and format accordingly with the teacher's name
-        if activity.action == 'Added Problem':
-            return f"{timestamp} : {activity.faculty.name} added a problem in {activity.course}, Sem {activity.semester} in Week {activity.week} <br> Problem Description : {activity.description}"
-        elif activity.action == 'Edited Problem':
-            return f"{timestamp} : {activity.faculty.name} edited a problem in {activity.course}, Sem {activity.semester} in Week {activity.week} <br> Problem Description : {activity.description}"
-        elif activity.action == 'Viewed Class Report':
-            return f"{timestamp} : {activity.faculty.name} viewed the class report of {activity.course}, Sem {activity.semester}"
-        elif activity.action == 'Downloaded Class Report':
-            return f"{timestamp} : {activity.faculty.name} downloaded the class report of {activity.course}, Sem {activity.semester}"
-        elif activity.action == 'Started a New Semester':
-            return f"{timestamp} : {activity.faculty.name} started a new Semester"
-        elif activity.action == 'Updated the data':
-            return f"{timestamp} : {activity.faculty.name} updated the data for {activity.course}, Sem {activity.semester}"
-        elif activity.action == 'Viewed Weekly Class Report':
-            return f"{timestamp} : {activity.faculty.name} viewed the weekly report of {activity.course}, Sem {activity.semester}, Week {activity.week}"
-        elif activity.action == 'Downloaded Weekly Class Report':
-            return f"{timestamp} : {activity.faculty.name} downloaded the weekly report of {activity.course}, Sem {activity.semester}, Week {activity.week}"
-        elif activity.action == 'Set Last Date':
-            return f"{timestamp} : {activity.faculty.name} have set the last date for {activity.course}, Sem {activity.semester}, Week {activity.week} as {activity.description}"
-        else:
-            return "Unknown activity"
-
-    # Format the activities into readable strings
-    formatted_other_teacher_activities = [format_activity(activity) for activity in other_teacher_activities]
 
-    # Paginate the activity list, with 15 activities per page
-    paginator = Paginator(formatted_other_teacher_activities, 15)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Read and format only the activities of other teachers on the requested page
+    page_obj = activity_page(FacultyActivity.objects.exclude(faculty=faculty), faculty,
+                             after=request.GET.get('after'), before=request.GET.get('before'),
+                             oldest='oldest' in request.GET)
 
     # Prepare the context for the template
     context = {
@@ -1348,17 +1429,18 @@ def fetch_graph_data_faculty(request):
         - `week` (GET): The week number to fetch data for. Defaults to 1 if not provided.
 
         Workflow:
-        1. Retrieves all distinct course-semester pairs where students are not superusers or staff.
-        2. Iterates through each course-semester pair to:
-           - Check if problems exist for the selected week.
-           - Count how students are categorized into five groups:
+        1. Reads the selected week's `StudentWeekProgress` rows of every student of the course-semester pairs that
+           have at least one student who is not a superuser or staff. Pairs without problems for the week have no
+           rows and are skipped.
+        2. Groups the rows by course-semester pair and counts how students are categorized into five groups,
+           in a single aggregate query (see `faculty.utils.week_graph_data`):
              a. `late_solved`: Solved all problems but after the deadline.
              b. `late_unsolved`: Submitted late and did not solve all problems.
              c. `on_time_solved`: Solved all problems on time.
              d. `on_time_unsolved`: Submitted on time but didn't solve all.
              e. `not_committed`: Didn't submit any code at all.
-        3. Uses `WeekCommit` and `LastDateOfWeek` models to determine submission timeliness.
-        4. Returns the compiled statistics as a JSON array for chart rendering.
+        3. Returns the compiled statistics as a JSON array for chart rendering. The statistics are cached
+           under the global data version of `problems.report_cache`, which changes with any cohort's data.
 
         Returns:
         - `JsonResponse`: A list of dictionaries, each containing:
@@ -1390,86 +1472,8 @@ def fetch_graph_data_faculty(request):
     """
     selected_week = int(request.GET.get('week', 1))
 
-    # Get distinct course-semester combinations of non-superuser, non-staff students
-    course_semester_combinations = Student.objects.filter(is_superuser=False, is_staff=False).values('course',
-                                                                                                     'semester').distinct()
-
-    # Initialize an empty list to hold the graph data
-    graph_data = []
-
-    # Loop over each course-semester combination to collect data
-    for combination in course_semester_combinations:
-        course = combination['course']
-        semester = combination['semester']
-
-        # Check if problems exist for the selected week for this course and semester
-        if not Problem.objects.filter(course=course, semester=semester, week=selected_week).exists():
-            continue  # Skip this combination if no problems are found
-
-        # Retrieve all students for the current course and semester
-        students = Student.objects.filter(course=course, semester=semester)
-
-        # Count the total number of problems for the current course, semester, and week
-        total_problems = Problem.objects.filter(course=course, semester=semester, week=selected_week).count()
-
-        # Initialize counters for different categories
-        late_solved = 0
-        late_unsolved = 0
-        on_time_solved = 0
-        on_time_unsolved = 0
-        not_committed = 0
-
-        # Iterate through each student to classify their activity
-        for student in students:
-            # Count the number of solved problems for the student in the selected week
-            solved_problems = ProblemCompletion.objects.filter(
-                student=student,
-                problem__course=course,
-                problem__semester=semester,
-                problem__week=selected_week,
-                is_completed=True
-            ).count()
-
-            # Retrieve the student's last commit for the selected week
-            last_commit = WeekCommit.objects.filter(student=student, week_number=selected_week).first()
-
-            # Retrieve the last date allowed for the selected week
-            week_last = LastDateOfWeek.objects.filter(course=course, semester=semester, week=selected_week).first()
-
-            if last_commit:
-                if week_last:
-                    # Compare the commit date with the last allowed date
-                    if last_commit.last_commit_time.date() > week_last.last_date:
-                        # Classify the student based on whether they solved all problems or not
-                        if solved_problems == total_problems:
-                            late_solved += 1
-                        else:
-                            late_unsolved += 1
-                    else:
-                        if solved_problems == total_problems:
-                            on_time_solved += 1
-                        else:
-                            on_time_unsolved += 1
-                else:
-                    # If no last date is available, assume it's on time
-                    if solved_problems == total_problems:
-                        on_time_solved += 1
-                    else:
-                        on_time_unsolved += 1
-            else:
-                # If no commit is made, classify the student as not committed
-                not_committed += 1
-
-        # Append the collected data for this course-semester combination to the graph data list
-        graph_data.append({
-            'course': course,
-            'semester': semester,
-            'late_solved': late_solved,
-            'late_unsolved': late_unsolved,
-            'on_time_solved': on_time_solved,
-            'on_time_unsolved': on_time_unsolved,
-            'not_committed': not_committed
-        })
+    # Classify every cohort's submissions with one aggregate query, cached until any cohort's data changes
+    graph_data = cached_report('graph', lambda: week_graph_data(selected_week), week=selected_week)
 
     # Return the graph data as a JSON response
     return JsonResponse(graph_data, safe=False)
@@ -1498,9 +1502,9 @@ def faculty_dashboard(request):
        Returns:
        - `HttpResponse`: Renders the `faculty_dashboard.html` template with the context.
 
-       Helper function `format_activity`:
-       - Formats activity details based on the action type (e.g., "Added Problem", "Edited Problem").
-       - Takes into account whether the activity is performed by the logged-in faculty or other teachers.
+       The previews are read and formatted by `faculty.activity.activity_page`, like the activity pages:
+       - Activity details are formatted based on the action type (e.g., "Added Problem", "Edited Problem").
+       - Activities performed by the logged-in faculty are attributed to "You".
 
        Example of formatted activity messages:
        - "You added a problem in B.C.A, Sem 2 in Week 4 <br> Problem Description: Problem description here"
@@ -1510,37 +1514,16 @@ def faculty_dashboard(request):
     """
     faculty=request.user
 
-    # Fetch the latest 4 activities of the logged-in teacher and other teachers
-    your_activities = FacultyActivity.objects.filter(faculty=faculty).order_by('-timestamp')[:4]
-    other_teacher_activities = FacultyActivity.objects.exclude(faculty=faculty).order_by('-timestamp')[:4]
-
-    # Helper function to format activities for display
-    def format_activity(activity, is_your_activity=False):
-        timestamp = format(timezone.localtime(activity.timestamp), 'd F Y, H:i')
-        teacher_name = "You" if is_your_activity else activity.faculty.name
-
-        action_messages = {
-            'Added Problem': f"{teacher_name} added a problem in {activity.course}, Sem {activity.semester} in Week {activity.week} <br> Problem Description: {activity.description}",
-            'Edited Problem': f"{teacher_name} edited a problem in {activity.course}, Sem {activity.semester} in Week {activity.week} <br> Problem Description: {activity.description}",
-            'Viewed Class Report': f"{teacher_name} viewed the class report of {activity.course}, Sem {activity.semester}",
-            'Downloaded Class Report': f"{teacher_name} downloaded the class report of {activity.course}, Sem {activity.semester}",
-            'Started a New Semester': f"{teacher_name} started a new Semester",
-            'Updated the data': f"{teacher_name} updated the data for {activity.course}, Sem {activity.semester}",
-            'Viewed Weekly Class Report': f"{teacher_name} viewed the weekly report of {activity.course}, Sem {activity.semester}, Week {activity.week}",
-            'Downloaded Weekly Class Report': f"{teacher_name} downloaded the weekly report of {activity.course}, Sem {activity.semester}, Week {activity.week}",
-            'Set Last Date': f"{teacher_name} set the last date for {activity.course}, Sem {activity.semester}, Week {activity.week} as {activity.description}"
-        }
-
-        return action_messages.get(activity.action, "Unknown activity")
-
-    # Format activities for display
-    formatted_your_activities = [format_activity(activity, is_your_activity=True) for activity in your_activities]
-    formatted_other_teacher_activities = [format_activity(activity) for activity in other_teacher_activities]
+    # The latest 4 activities of the logged-in teacher and of other teachers, read like the activity pages
+    your_activities = activity_page(FacultyActivity.objects.filter(faculty=faculty), faculty,
+                                    per_page=4, with_timestamp=False)
+    other_teacher_activities = activity_page(FacultyActivity.objects.exclude(faculty=faculty), faculty,
+                                             per_page=4, with_timestamp=False)
 
     context = {
         'faculty':faculty,
-        'your_activities': formatted_your_activities,
-        'other_teacher_activities': formatted_other_teacher_activities
+        'your_activities': your_activities.activities,
+        'other_teacher_activities': other_teacher_activities.activities
     }
 
     return render(request, 'faculty/faculty_dashboard.html', context)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from problems.models import Problem, WeekCommit, ProblemCompletion
+from problems.models import Problem, WeekCommit, ProblemCompletion, SyncRun, SyncStudentResult
 
 
 @admin.register(Problem)
@@ -116,3 +116,62 @@ class WeekCommitAdmin(admin.ModelAdmin):
     # Fields that can be searched in the admin interface
     search_fields = ('student', 'week_number')
 
+
+
+class SyncStudentResultInline(admin.TabularInline):
+    """
+    Read-only list of the per-student results of a sync run, most expensive first.
+    """
+    model = SyncStudentResult
+    fields = ('student', 'duration', 'http_calls', 'bytes', 'cache_hits', 'unchanged', 'rows_changed', 'error')
+    readonly_fields = fields
+    ordering = ('-http_calls',)
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(SyncRun)
+class SyncRunAdmin(admin.ModelAdmin):
+    """
+    Admin interface for the telemetry of GitHub sync runs.
+
+    The list view shows the cost of each run and, above the table, a chart of the duration and API calls of
+    the most recent runs so that a night costing noticeably more than the previous ones stands out. A run's
+    detail page lists the result of every student, most expensive first.
+
+    Attributes:
+        list_display (tuple): The cost figures of each run.
+        list_filter (tuple): Filter by the kind of run and by cohort.
+        trend_runs (int): Number of recent runs drawn in the trend chart.
+    """
+
+    list_display = ('started_at', 'kind', 'course', 'semester', 'duration', 'students', 'failed', 'unchanged',
+                    'http_calls', 'bytes', 'cache_hits', 'rate_limit_remaining', 'rows_changed')
+    list_filter = ('kind', 'course', 'semester')
+    readonly_fields = list_display + ('finished_at',)
+    inlines = (SyncStudentResultInline,)
+    trend_runs = 30
+
+    def has_add_permission(self, request):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        """
+        Adds the trend of the most recent finished runs to the list view.
+        """
+        runs = list(SyncRun.objects.filter(finished_at__isnull=False, kind=request.GET.get('kind__exact', 'nightly'))
+                    [:self.trend_runs])[::-1]
+        longest = max((run.duration for run in runs), default=0) or 1
+        busiest = max((run.http_calls for run in runs), default=0) or 1
+        trend = [{
+            'run': run,
+            'duration_width': round(run.duration / longest * 100),
+            'calls_width': round(run.http_calls / busiest * 100),
+        } for run in runs]
+
+        extra_context = extra_context or {}
+        extra_context['trend'] = trend
+        return super().changelist_view(request, extra_context=extra_context)
@@ -6,6 +6,8 @@ class ProblemsConfig(AppConfig):
     name = 'problems'
 
     def ready(self):
+        # Connects the handlers keeping `StudentWeekProgress` up to date.
+        from . import signals
         from . import scheduler
         scheduler.start()
 
@@ -0,0 +1,645 @@
+import hashlib
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from urllib.parse import quote, urlsplit
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+
+API_ROOT = "https://api.github.com"
+RAW_ROOT = "https://raw.githubusercontent.com"
+
+# Seconds allowed to open a connection to GitHub; the read timeout is `GITHUB_TIMEOUT`.
+CONNECT_TIMEOUT = 3.05
+
+# Status codes worth retrying after a backoff: GitHub's transient server errors.
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+class GitHubUnavailable(requests.exceptions.ConnectionError):
+    """
+    Raised without contacting GitHub while the circuit breaker of its host is open.
+    """
+
+
+class TokensExhausted(requests.exceptions.RequestException):
+    """
+    Raised when the `TokenPool` cannot hand out a token within the time the caller is willing to wait.
+    """
+
+
+def endpoint_of(url):
+    """
+    Returns the endpoint a URL belongs to, with owners, repositories and paths left out, e.g.
+    `api.github.com/repos/:owner/:repo/git/trees`. Used to group latency counters.
+    """
+    parts = urlsplit(url)
+    segments = [segment for segment in parts.path.split('/') if segment]
+    if parts.netloc != urlsplit(API_ROOT).netloc:
+        return parts.netloc
+    if segments[:1] == ['repos']:
+        rest = segments[3:5] if segments[3:4] == ['git'] else segments[3:4]
+        segments = ['repos', ':owner', ':repo'] + rest
+    elif segments[:1] == ['users']:
+        segments = ['users', ':user'] + segments[2:3]
+    return '/'.join([parts.netloc] + segments)
+
+
+def raw_url(owner, repo_name, path):
+    """
+    Returns the URL serving the current version of a file on the repository's default branch.
+    """
+    return f"{RAW_ROOT}/{owner}/{repo_name}/HEAD/{quote(path)}"
+
+
+class RequestStats:
+    """
+    Thread-safe collector for the latency of every GitHub API call made during a sync run.
+
+    Worker threads call `record` after each request; the management command reads `summary`
+    once all workers have finished to print the per-request latency figures. A thread can also open a
+    `tally` to count the calls, bytes and cache hits of its own requests, which is how the sync attributes
+    its cost to individual students. Calls are also counted per endpoint (see `endpoint_of`), with their
+    total duration and how many failed.
+    """
+
+    def __init__(self, max_samples=None):
+        """
+        :param max_samples: Number of most recent latencies kept for the percentiles, or None to keep every
+                            one. Long-lived clients should set it so their memory use stays bounded.
+        """
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.latencies = deque(maxlen=max_samples)
+        self.bytes = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.endpoints = {}
+
+    @contextmanager
+    def tally(self):
+        """
+        Counts the requests made by the current thread while the context is open.
+
+        :return: A dictionary with `http_calls`, `bytes` and `cache_hits`, updated in place.
+        """
+        counters = {'http_calls': 0, 'bytes': 0, 'cache_hits': 0}
+        self._local.tally = counters
+        try:
+            yield counters
+        finally:
+            self._local.tally = None
+
+    def record(self, seconds, size=0, endpoint=None, error=False):
+        """
+        Stores the duration of a single request.
+
+        :param seconds: Wall-clock time the request took, in seconds.
+        :param size: Size of the response body in bytes.
+        :param endpoint: The endpoint the request went to, for the per-endpoint counters.
+        :param error: Whether the request failed (network error, timeout or server error).
+        """
+        with self._lock:
+            self.latencies.append(seconds)
+            self.bytes += size
+            if endpoint:
+                counters = self.endpoints.setdefault(endpoint, {'count': 0, 'errors': 0, 'seconds': 0.0})
+                counters['count'] += 1
+                counters['errors'] += int(error)
+                counters['seconds'] += seconds
+
+        counters = getattr(self._local, 'tally', None)
+        if counters is not None:
+            counters['http_calls'] += 1
+            counters['bytes'] += size
+
+    def record_cache(self, hit):
+        """
+        Counts a conditional request as a cache hit (GitHub answered 304) or a miss.
+
+        :param hit: True if the cached body could be reused.
+        """
+        with self._lock:
+            if hit:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+
+        counters = getattr(self._local, 'tally', None)
+        if counters is not None and hit:
+            counters['cache_hits'] += 1
+
+    def summary(self):
+        """
+        Returns the request count together with mean, median, 95th percentile and maximum latency
+        (all in milliseconds), the bytes received, the response cache hit and miss counters and the
+        `endpoints` counters (count, errors and mean latency in milliseconds per endpoint).
+        Every latency value is 0 when no request has been recorded.
+        """
+        with self._lock:
+            latencies = sorted(self.latencies)
+            cache = {'bytes': self.bytes, 'cache_hits': self.cache_hits, 'cache_misses': self.cache_misses,
+                     'endpoints': endpoint_summary(self.endpoints)}
+
+        if not latencies:
+            return {'count': 0, 'mean_ms': 0, 'p50_ms': 0, 'p95_ms': 0, 'max_ms': 0, **cache}
+
+        def percentile(fraction):
+            index = min(len(latencies) - 1, int(round(fraction * (len(latencies) - 1))))
+            return latencies[index] * 1000
+
+        return {
+            'count': len(latencies),
+            'mean_ms': sum(latencies) / len(latencies) * 1000,
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+            'max_ms': latencies[-1] * 1000,
+            **cache,
+        }
+
+
+def endpoint_summary(endpoints):
+    """
+    Turns per-endpoint counters, as collected by `RequestStats`, into a dictionary mapping each endpoint to
+    its `count`, `errors` and `mean_ms`, busiest endpoint first.
+    """
+    return {
+        endpoint: {'count': counters['count'], 'errors': counters['errors'],
+                   'mean_ms': counters['seconds'] / counters['count'] * 1000 if counters['count'] else 0}
+        for endpoint, counters in sorted(endpoints.items(), key=lambda item: -item[1]['count'])
+    }
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to a host that keeps failing, so an outage fails fast instead of tying up every
+    worker thread until its timeout.
+
+    After `threshold` consecutive failures (network errors, timeouts, server errors) the circuit opens and
+    `check` raises `GitHubUnavailable` for `cooldown` seconds. Then a single trial request is let through:
+    its success closes the circuit, its failure opens it again.
+    """
+
+    def __init__(self, host, threshold=None, cooldown=None):
+        """
+        :param host: The host guarded by the breaker, used in error messages.
+        :param threshold: Consecutive failures opening the circuit. Defaults to `GITHUB_BREAKER_THRESHOLD`.
+        :param cooldown: Seconds the circuit stays open. Defaults to `GITHUB_BREAKER_COOLDOWN`.
+        """
+        self.host = host
+        self.threshold = threshold or settings.GITHUB_BREAKER_THRESHOLD
+        self.cooldown = cooldown or settings.GITHUB_BREAKER_COOLDOWN
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def check(self):
+        """
+        Raises `GitHubUnavailable` if a request to the host must not be sent right now.
+        """
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at >= self.cooldown and not self._probing:
+                self._probing = True
+                return
+        raise GitHubUnavailable(f"{self.host} is failing, requests are suspended for up to {self.cooldown}s")
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+_session = None
+_breakers = {}
+_shared_client = None
+_shared_lock = threading.RLock()
+
+
+def get_session():
+    """
+    Returns the process-wide `requests.Session`, whose connection pool is reused by every GitHub call.
+    """
+    global _session
+    with _shared_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(10, settings.GITHUB_SYNC_CONCURRENCY * 2))
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+        return _session
+
+
+def get_breaker(url):
+    """
+    Returns the process-wide `CircuitBreaker` of a URL's host.
+    """
+    host = urlsplit(url).netloc
+    with _shared_lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker(host)
+        return _breakers[host]
+
+
+def shared_client():
+    """
+    Returns the process-wide `GitHubClient` used outside the sync (signup checks, downloads of solution files
+    and images). It draws from every configured token, waits at most `GITHUB_WEB_TOKEN_WAIT` seconds for one so
+    that a web request is never held until a rate limit resets, and keeps the latencies of its last 10000 requests.
+    """
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = GitHubClient(max_samples=10000, token_wait=settings.GITHUB_WEB_TOKEN_WAIT)
+        return _shared_client
+
+
+class ResponseCache:
+    """
+    On-disk store of GitHub response bodies and their validators (`ETag` / `Last-Modified`), one JSON
+    file per URL and token.
+
+    GitHub does not count `304 Not Modified` answers against the rate limit, so replaying a stored
+    validator makes a request for unchanged data nearly free. Entries are keyed by a fingerprint of the
+    token the response was fetched with as well as the URL: GitHub varies its answers on the token, and a body
+    one token was allowed to read must not be replayed for another. Entries are written through a temporary
+    file and renamed into place, which keeps the cache consistent when several sync threads share it.
+    Reading an entry refreshes its modification time, so `prune` can drop the entries no sync uses anymore.
+    """
+
+    def __init__(self, directory):
+        """
+        :param directory: Folder holding the cache files. It is created on first use.
+        """
+        self.directory = directory
+
+    def _path(self, url, token=None):
+        key = url if token is None else f"{hashlib.sha256(token.encode()).hexdigest()[:16]} {url}"
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest() + '.json')
+
+    def load(self, url, token=None):
+        """
+        Returns the cached entry for a URL fetched with a token (None for an unauthenticated request) as a
+        dictionary with `etag`, `last_modified` and `body`, or None if nothing usable is stored.
+        """
+        path = self._path(url, token)
+        try:
+            with open(path, encoding='utf-8') as cache_file:
+                entry = json.load(cache_file)
+            os.utime(path)
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    def store(self, url, etag, last_modified, body, token=None):
+        """
+        Saves the validators and body of a successful response for a URL fetched with a token.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as cache_file:
+            json.dump({'url': url, 'etag': etag, 'last_modified': last_modified, 'body': body}, cache_file)
+        os.replace(temp_path, self._path(url, token))
+
+    def prune(self, max_age=None, max_bytes=None):
+        """
+        Deletes the entries not used for `max_age` seconds, then the least recently used ones until the cache
+        holds at most `max_bytes`. Temporary files left behind by an interrupted write are deleted once they are
+        `max_age` seconds old.
+
+        :param max_age: Age in seconds, or None to keep entries whatever their age.
+        :param max_bytes: Total size in bytes, or None for no size limit.
+        :return: Tuple of the number of files deleted and the bytes they held.
+        """
+        try:
+            with os.scandir(self.directory) as entries:
+                files = [(stat.st_mtime, stat.st_size, entry.path)
+                         for entry in entries if entry.is_file() for stat in (entry.stat(),)]
+        except OSError:
+            return 0, 0
+
+        now = time.time()
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        deleted = freed = 0
+        for modified, size, path in files:
+            expired = max_age is not None and now - modified > max_age
+            # A recent temporary file may still be being written by another process
+            oversized = max_bytes is not None and total > max_bytes and path.endswith('.json')
+            if not (expired or oversized):
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            deleted += 1
+            freed += size
+        return deleted, freed
+
+
+class _TokenState:
+    """
+    Rate limit bookkeeping for a single token of a `TokenPool`.
+    """
+
+    def __init__(self, token):
+        self.token = token
+        self.remaining = None  # Unknown until the first response carrying rate limit headers.
+        self.reset = 0  # UNIX timestamp at which GitHub restores the token's quota.
+
+
+class TokenPool:
+    """
+    Schedules GitHub requests over every configured token while respecting their rate limits.
+
+    Each response updates the pool with its `X-RateLimit-Remaining` and `X-RateLimit-Reset` headers.
+    `acquire` hands out the token with the most quota left, paces callers with a token bucket of
+    `rate` requests per second, and only blocks when every token is exhausted, in which case it sleeps
+    until the earliest reset instead of a fixed interval. The pool is shared by all sync threads.
+    """
+
+    def __init__(self, tokens, rate=None, burst=None):
+        """
+        :param tokens: GitHub tokens to spread requests over. An empty list means unauthenticated requests.
+        :param rate: Sustained requests per second. Defaults to `settings.GITHUB_REQUESTS_PER_SECOND`.
+        :param burst: Bucket capacity, i.e. how many requests may be sent back to back. Defaults to `rate`.
+        """
+        self._states = [_TokenState(token) for token in tokens] or [_TokenState(None)]
+        self.rate = rate or settings.GITHUB_REQUESTS_PER_SECOND
+        self.capacity = max(1.0, burst or self.rate)
+        self._allowance = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited = 0.0
+
+    @classmethod
+    def from_settings(cls):
+        """
+        Builds a pool holding every token listed in `settings.GITHUB_TOKENS`.
+        """
+        return cls(settings.GITHUB_TOKENS)
+
+    def __len__(self):
+        return len(self._states)
+
+    def acquire(self, timeout=None):
+        """
+        Blocks until a request may be sent and returns the token it should use.
+
+        :param timeout: Longest time to wait, in seconds, or None to wait as long as it takes.
+        :raises TokensExhausted: If no request may be sent within `timeout` seconds; nothing is consumed then.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._allowance = min(self.capacity, self._allowance + (now - self._last_refill) * self.rate)
+                self._last_refill = now
+
+                wall_clock = time.time()
+                available = [state for state in self._states
+                             if state.remaining is None or state.remaining > 0 or state.reset <= wall_clock]
+
+                if available and self._allowance >= 1:
+                    state = max(available, key=lambda state: float('inf')
+                                if state.remaining is None or state.reset <= wall_clock else state.remaining)
+                    self._allowance -= 1
+                    if state.remaining is not None and state.reset > wall_clock:
+                        state.remaining -= 1
+                    return state.token
+
+                if available:
+                    delay = (1 - self._allowance) / self.rate
+                else:
+                    # Every token is exhausted: wait for the earliest reset (plus a second of slack).
+                    delay = max(0.0, min(state.reset for state in self._states) - wall_clock) + 1
+                if deadline is not None and now + delay > deadline:
+                    raise TokensExhausted(f"No GitHub token available within {timeout} seconds")
+                self.waited += delay
+
+            time.sleep(delay)
+
+    def update(self, token, headers):
+        """
+        Records the rate limit headers GitHub returned for a request made with `token`.
+        """
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset = headers.get('X-RateLimit-Reset')
+        if remaining is None or reset is None:
+            return
+
+        with self._lock:
+            for state in self._states:
+                if state.token == token:
+                    # Responses of concurrent requests can arrive out of order; keep the lowest count seen
+                    # within the same rate limit window.
+                    if state.reset == int(reset) and state.remaining is not None:
+                        state.remaining = min(state.remaining, int(remaining))
+                    else:
+                        state.remaining = int(remaining)
+                    state.reset = int(reset)
+
+    def lowest_remaining(self):
+        """
+        Returns the smallest remaining quota known for any token, or None if no response reported one yet.
+        """
+        with self._lock:
+            known = [state.remaining for state in self._states if state.remaining is not None]
+        return min(known) if known else None
+
+    def summary(self):
+        """
+        Returns the remaining quota and reset time of each token (identified by its last four characters)
+        and the total time callers spent waiting for the pool.
+        """
+        with self._lock:
+            return {
+                'tokens': [{'token': f"...{state.token[-4:]}" if state.token else 'anonymous',
+                            'remaining': state.remaining, 'reset': state.reset} for state in self._states],
+                'waited': self.waited,
+            }
+
+
+class GitHubClient:
+    """
+    The single entry point for HTTP calls to GitHub (API and raw file downloads).
+
+    Every API call draws a token from a `TokenPool`, which paces requests and rotates between tokens
+    based on the rate limit headers of earlier responses. Raw file downloads do not count against the API
+    rate limit, so they are sent without a token and leave the pool alone. Requests go through a pooled `requests.Session`
+    with a timeout, transient failures (network errors, timeouts, server errors, secondary rate limits)
+    are retried with exponential backoff honouring `Retry-After`, and a per-host `CircuitBreaker` makes
+    calls fail fast while GitHub is down. The client times every call it makes, per endpoint, so the
+    caller can report latency statistics. When a `ResponseCache` is attached, requests are sent
+    conditionally and a `304 Not Modified` answer is served from the cache.
+    The client performs no database access, which makes it safe to share between the threads
+    of a sync worker pool.
+    """
+
+    def __init__(self, pool=None, cache=None, max_samples=None, token_wait=None):
+        """
+        :param pool: `TokenPool` to draw tokens from. Defaults to a pool of every configured token.
+        :param cache: Optional `ResponseCache` used for conditional requests.
+        :param max_samples: Passed on to the client's `RequestStats`.
+        :param token_wait: Longest time to wait for a token, in seconds, or None to wait as long as it takes.
+        """
+        self.pool = pool or TokenPool.from_settings()
+        self.cache = cache
+        self.token_wait = token_wait
+        self.stats = RequestStats(max_samples)
+        self.session = get_session()
+
+    def get(self, url, headers=None, **kwargs):
+        """
+        Performs a GET request against GitHub and records how long it took.
+
+        If the URL has an entry cached for the token used, its `ETag` / `Last-Modified` validators are sent
+        along. A `304` answer is turned into a regular `200` response carrying the cached body, so callers never
+        need to know whether the data came from the cache. A request rejected because its token ran out of
+        quota is retried with the next token the pool hands out; other transient failures are retried up to
+        `GITHUB_MAX_RETRIES` times (see `_retry_delay`).
+
+        :param url: Absolute URL to fetch.
+        :param headers: Optional extra request headers, e.g. a custom `Accept` media type.
+        :param kwargs: Passed on to `requests`; `timeout` defaults to `GITHUB_TIMEOUT` seconds.
+        :return: The `requests.Response` object.
+        :raises GitHubUnavailable: If the host's circuit breaker is open.
+        :raises TokensExhausted: If no token became available within `token_wait` seconds.
+        :raises requests.exceptions.RequestException: If the request failed after every retry.
+        """
+        headers = dict(headers or {})
+        kwargs.setdefault('timeout', (CONNECT_TIMEOUT, settings.GITHUB_TIMEOUT))
+
+        breaker = get_breaker(url)
+        endpoint = endpoint_of(url)
+        api_call = urlsplit(url).netloc == urlsplit(API_ROOT).netloc
+        token_switches = retries = 0
+        while True:
+            breaker.check()
+            token = self.pool.acquire(self.token_wait) if api_call else None
+            if token:
+                headers['Authorization'] = f"token {token}"
+            # The validators of the entry cached for this token, which changes when a token runs out of quota
+            entry = self.cache.load(url, token) if self.cache else None
+            headers.pop('If-None-Match', None)
+            headers.pop('If-Modified-Since', None)
+            if entry:
+                if entry.get('etag'):
+                    headers['If-None-Match'] = entry['etag']
+                if entry.get('last_modified'):
+                    headers['If-Modified-Since'] = entry['last_modified']
+
+            start = time.monotonic()
+            try:
+                response = self.session.get(url, headers=headers, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                self.stats.record(time.monotonic() - start, endpoint=endpoint, error=True)
+                breaker.record_failure()
+                if retries >= settings.GITHUB_MAX_RETRIES:
+                    raise
+                time.sleep(self._backoff(retries))
+                retries += 1
+                continue
+            except requests.exceptions.RequestException:
+                self.stats.record(time.monotonic() - start, endpoint=endpoint, error=True)
+                raise
+
+            server_error = response.status_code in RETRY_STATUSES
+            self.stats.record(time.monotonic() - start, len(response.content), endpoint=endpoint, error=server_error)
+            if server_error:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+
+            if api_call:
+                self.pool.update(token, response.headers)
+            if (api_call and response.status_code in (403, 429) and response.headers.get('X-RateLimit-Remaining') == '0'
+                    and token_switches < len(self.pool)):
+                token_switches += 1
+                continue
+
+            delay = self._retry_delay(response, retries)
+            if delay is None or retries >= settings.GITHUB_MAX_RETRIES:
+                break
+            time.sleep(delay)
+            retries += 1
+
+        if self.cache is None:
+            return response
+
+        if response.status_code == 304 and entry:
+            self.stats.record_cache(hit=True)
+            return self._cached_response(url, response, entry)
+
+        self.stats.record_cache(hit=False)
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if response.status_code == 200 and (etag or last_modified):
+            self.cache.store(url, etag, last_modified, response.text, token)
+        return response
+
+    @staticmethod
+    def _backoff(attempt):
+        """
+        Returns the seconds to wait before retry number `attempt` (0-based): exponential with full jitter.
+        """
+        return random.uniform(0, min(settings.GITHUB_MAX_RETRY_WAIT, 2 ** attempt))
+
+    def _retry_delay(self, response, attempt):
+        """
+        Decides whether a response is worth retrying.
+
+        Server errors are retried after `_backoff`. Secondary rate limits (a `403`/`429` carrying
+        `Retry-After` or mentioning the secondary limit) are retried after `Retry-After` seconds, or a
+        minute when GitHub gives no hint, as its documentation asks. A wait longer than
+        `GITHUB_MAX_RETRY_WAIT` is not worth blocking a worker for, so the response is returned instead.
+
+        :return: Seconds to wait before retrying, or None if the response must be returned as is.
+        """
+        if response.status_code in RETRY_STATUSES:
+            return self._backoff(attempt)
+        if response.status_code not in (403, 429) or response.headers.get('X-RateLimit-Remaining') == '0':
+            return None
+
+        retry_after = response.headers.get('Retry-After')
+        if retry_after is not None:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                return None
+        elif 'secondary rate limit' in response.text.lower():
+            delay = 60.0
+        else:
+            return None
+        return delay if delay <= settings.GITHUB_MAX_RETRY_WAIT else None
+
+    @staticmethod
+    def _cached_response(url, not_modified, entry):
+        """
+        Builds a `200` response holding the cached body for a request GitHub answered with `304`.
+        """
+        response = requests.models.Response()
+        response.status_code = 200
+        response.url = url
+        response.headers = not_modified.headers
+        response.encoding = 'utf-8'
+        response._content = entry['body'].encode('utf-8')
+        return response
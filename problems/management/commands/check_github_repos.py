@@ -1,202 +1,231 @@
-import requests
+import multiprocessing
 import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import django
 from django.core.management.base import BaseCommand
 from django.conf import settings
-from django.contrib.auth import get_user_model
-from problems.models import ProblemCompletion, Problem, WeekCommit
-from django.utils.dateparse import parse_datetime
+from django.db import connections
+from django.utils import timezone
+from problems.github import RequestStats, ResponseCache
+from problems.models import SyncRun
+from problems.scheduler import NIGHTLY_RUN_MAX_AGE, NIGHTLY_RUN_RESUME_MAX_AGE, sync_in_progress
+from problems.sync import list_shards, sync_shard
 
 
 class Command(BaseCommand):
     """
     Custom management command to check students' GitHub repositories for problem completion statuses,
     update their completion information, and track the last commit for each week.
+
+    The run is split into shards, one per cohort (course and semester), spread over a pool of worker
+    processes. Within a shard, repository snapshots are fetched concurrently by a bounded pool of worker
+    threads, while every database write happens on the shard's main thread in student order. The changes of
+    a batch are collected by a `SyncBatch` and written in a single transaction, after which the shard's
+    `SyncCheckpoint` records how far it got and for which `SyncRun`: if a run is interrupted, the next run
+    continues that `SyncRun`, only resuming the shards that did not finish in it and skipping the students
+    already written. A nightly run started less than `NIGHTLY_RUN_MAX_AGE` ago is taken to be still running,
+    as the scheduler does, and no second one is started; one older than `NIGHTLY_RUN_RESUME_MAX_AGE` is
+    not resumed.
+    Cohorts with the closest deadline are synced first, and within a cohort students are drawn from a
+    priority queue weighing recent pushes, staleness and earlier failures, so a run cut short by the rate
+    limit has already refreshed the most valuable students.
+    Every run is recorded as a `SyncRun` with one `SyncStudentResult` per student, so its cost can be compared
+    across nights with `sync_report` or in the admin.
+    Requests are spread over every configured GitHub token by a rate-limit-aware `TokenPool`.
+    Repositories whose HEAD commit has not moved since the last complete sync are skipped after a
+    single request. After the run, cached responses unused for `GITHUB_CACHE_MAX_AGE` seconds or beyond
+    `GITHUB_CACHE_MAX_BYTES` are pruned.
     """
 
     help = 'Check GitHub repositories for problem completion status'
 
-    def handle(self, *args, **kwargs):
+    def add_arguments(self, parser):
         """
-        Main method that processes all student records in batches, fetches repository content,
-        and updates the problem completion and commit statuses.
-
-        It processes students in batches to prevent exceeding API rate limits, sleeping for
-        an hour between each batch if necessary.
+        Adds the `--concurrency`, `--processes` and `--cohort` options and the `--restart` flag.
         """
-        User = get_user_model()
-        token = settings.GITHUB_TOKEN
-        headers = {"Authorization": f"token {token}"}
-
-        students = list(User.objects.filter(is_superuser=False, is_staff=False))
-        batch_size = 150  # Defines how many students are processed in a batch.
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=settings.GITHUB_SYNC_CONCURRENCY,
+            help='Number of student repositories fetched from GitHub in parallel by each process.',
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=settings.GITHUB_SYNC_PROCESSES,
+            help='Number of shards synced in parallel, each in its own process.',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore the checkpoints of an interrupted run and sync every shard from the start.',
+        )
+        parser.add_argument(
+            '--cohort',
+            action='append',
+            metavar='COURSE:SEMESTER',
+            help='Only sync this cohort (e.g. BCA:3). May be given several times. Such runs never resume '
+                 'an interrupted nightly run and leave its checkpoints untouched.',
+        )
 
-        # Process students in batches to avoid hitting API limits.
-        for i in range(0, len(students), batch_size):
-            batch = students[i:i+batch_size]
-
-            for student in batch:
-                self.process_students(student, headers)
+    def handle(self, *args, **kwargs):
+        """
+        Main method that syncs every shard, resuming the last nightly `SyncRun` if it died, and prints a
+        summary per shard followed by the wall-clock time, per-request latency statistics, response
+        cache hit/miss counters and the remaining quota of each token.
 
-            self.stdout.write(self.style.SUCCESS(f"Processed batch {i}, students : {len(batch)}"))
+        The configured request rate is divided between the processes, so running more of them never
+        sends requests faster than `GITHUB_REQUESTS_PER_SECOND` overall.
+        """
+        concurrency = max(1, kwargs.get('concurrency') or 1)
+        started = time.monotonic()
+
+        shards = list_shards()
+        cohorts = {tuple(cohort.split(':', 1)) for cohort in kwargs.get('cohort') or []}
+        if cohorts:
+            shards = [(course, semester) for course, semester in shards if (course, str(semester)) in cohorts]
+        processes = max(1, min(kwargs.get('processes') or 1, len(shards) or 1))
+        rate = settings.GITHUB_REQUESTS_PER_SECOND / processes
+        if not cohorts and sync_in_progress('nightly', NIGHTLY_RUN_MAX_AGE):
+            self.stdout.write(self.style.WARNING("A nightly sync run is still in progress, not starting another"))
+            return
+
+        # Only the latest nightly run is resumed, if it died recently; partial runs keep no checkpoints.
+        run = None
+        if not cohorts and not kwargs['restart']:
+            run = SyncRun.objects.filter(kind='nightly').first()
+            resumable = timezone.now() - NIGHTLY_RUN_RESUME_MAX_AGE
+            run = run if run is not None and run.finished_at is None and run.started_at >= resumable else None
+        resume = run is not None
+        if resume:
+            self.stdout.write(self.style.WARNING(f"Resuming the interrupted sync run {run.id}"))
+        else:
+            run = SyncRun.objects.create(kind='deadline' if cohorts else 'nightly',
+                                         course=','.join(sorted(f"{c}:{s}" for c, s in cohorts))[:50])
+        record_checkpoint = not cohorts
+
+        summaries = []
+        if processes == 1:
+            for course, semester in shards:
+                summaries.append(self.report_shard(sync_shard(course, semester, resume, concurrency, rate,
+                                                              run_id=run.id, record_checkpoint=record_checkpoint)))
+        else:
+            # Worker processes open their own database connections; none may be inherited from this one.
+            connections.close_all()
+            with self.worker_pool(processes) as executor:
+                futures = [executor.submit(sync_shard, course, semester, resume, concurrency, rate, run_id=run.id,
+                                           record_checkpoint=record_checkpoint)
+                           for course, semester in shards]
+                for future in as_completed(futures):
+                    summaries.append(self.report_shard(future.result()))
+
+        stats = RequestStats()
+        for summary in summaries:
+            stats.latencies.extend(summary['latencies'])
+            stats.bytes += summary['bytes']
+            stats.cache_hits += summary['cache_hits']
+            stats.cache_misses += summary['cache_misses']
+            for endpoint, counters in summary['endpoints'].items():
+                merged = stats.endpoints.setdefault(endpoint, {'count': 0, 'errors': 0, 'seconds': 0.0})
+                for key, value in counters.items():
+                    merged[key] += value
+
+        rate_limits = [summary['rate_limits'] for summary in summaries if summary['rate_limits']]
+        remaining = [token['remaining'] for shard_limits in rate_limits for token in shard_limits['tokens']
+                     if token['remaining'] is not None]
+        # A resumed run records the duration of the attempt that finished it; its checkpoints sum every attempt.
+        run.finish(time.monotonic() - started, min(remaining) if remaining else None)
+
+        students = sum(summary['students'] for summary in summaries)
+        self.report_stats(time.monotonic() - started, stats.summary(), concurrency, processes)
+        self.stdout.write(f"Skipped {sum(summary['unchanged'] for summary in summaries)} of {students} "
+                          f"repositories whose HEAD had not moved")
+        self.stdout.write(f"Rows changed: {sum(summary['rows_changed'] for summary in summaries)}")
+        self.report_rate_limits(rate_limits)
+        self.stdout.write(f"Telemetry recorded as sync run {run.id} (see `manage.py sync_report`)")
+
+        deleted, freed = ResponseCache(settings.GITHUB_CACHE_DIR).prune(settings.GITHUB_CACHE_MAX_AGE,
+                                                                        settings.GITHUB_CACHE_MAX_BYTES)
+        if deleted:
+            self.stdout.write(f"Pruned {deleted} cached GitHub responses ({freed / 1024:.0f} KiB)")
+
+    def worker_pool(self, processes):
+        """
+        Returns a pool of freshly spawned worker processes, each with Django set up. Being children of this
+        process, they never start the scheduler, even when the sync was launched by the development server.
 
-            # Sleep for an hour between batches to respect API rate limits.
-            if i + batch_size < len(students):
-                self.stdout.write(self.style.WARNING("Sleeping for 1 hour..."))
-                time.sleep(3600)
+        :param processes: Number of worker processes.
+        """
+        return ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=django.setup)
 
-    def process_students(self, student, headers):
+    def report_shard(self, summary):
         """
-        Processes individual student records by fetching their repository contents from GitHub,
-        filtering the problems for their course and semester, and updating their problem completion status.
+        Prints the errors and timing of a finished shard.
 
-        :param student: Student object containing the student's details (e.g., username, course, etc.)
-        :param headers: GitHub API headers including the authorization token.
+        :param summary: The dictionary returned by `sync_shard`.
+        :return: The same summary, for collection by the caller.
         """
-        repo_name = student.repo_name
-        url = f"https://api.github.com/repos/{student.username}/{repo_name}/contents/"
-        problems = Problem.objects.filter(course=student.course, semester=student.semester)
-
-        try:
-            # Fetch repository contents from GitHub API.
-            response = requests.get(url, headers=headers)
-            if response.status_code == 404:
-                return
-
-            response.raise_for_status()
-            repo_contents = response.json()
-
-            # Filter out directories for weeks in the repository.
-            week_dirs = {content['name']: content['url'] for content in repo_contents if
-                         content['type'] == 'dir' and content['name'].startswith('Week')}
-
-            # Cache to avoid redundant API calls for week contents and commit statuses.
-            week_content_cache = {}
-            commit_cache = {}
-
-            # Group problems by their week.
-            problems_by_week = {}
-            for problem in problems:
-                week_number = problem.week
-                if week_number not in problems_by_week:
-                    problems_by_week[week_number] = []
-                problems_by_week[week_number].append(problem)
-
-            # Process each week's problems and update their statuses.
-            for week_number, week_problems in problems_by_week.items():
-                week_dir_name = f"Week{week_number}"
-                if week_dir_name not in week_dirs:
-                    continue
-
-                # Fetch week directory contents from GitHub if not already cached.
-                if week_dir_name not in week_content_cache:
-                    week_url = week_dirs[week_dir_name]
-                    week_response = requests.get(week_url, headers=headers)
-                    week_response.raise_for_status()
-                    week_content_cache[week_dir_name] = week_response.json()
-
-                week_contents = week_content_cache[week_dir_name]
-
-                for problem in week_problems:
-                    self.check_problem_status(student, problem, week_contents)
-
-                # Update or create the commit record for the week.
-                if week_dir_name not in commit_cache:
-                    commit_cache[week_dir_name] = self.update_or_create_week_commit(
-                        student, week_number, repo_name, week_dir_name, headers)
-
-        except requests.exceptions.RequestException as e:
-            self.stdout.write(f"Error checking repository for {student.username}: {e}")
-
-    def check_problem_status(self, student, problem, week_contents):
+        if summary['skipped']:
+            self.stdout.write(f"Shard {summary['shard']}: already finished in the interrupted run, skipped")
+            return summary
+
+        for error in summary['errors']:
+            self.stdout.write(error)
+
+        resumed = f", resumed after {summary['resumed_from']} students" if summary['resumed_from'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"Shard {summary['shard']}: {summary['students']} students in {summary['elapsed']:.1f}s, "
+            f"{summary['unchanged']} unchanged, {len(summary['errors'])} error(s), "
+            f"{summary['rows_changed']} rows changed, {len(summary['latencies'])} GitHub requests{resumed}"
+        ))
+        return summary
+
+    def report_stats(self, elapsed, latency, concurrency, processes):
         """
-        Checks if a student's solution or output image for a problem is present in their GitHub repository.
-        Updates the problem completion status accordingly.
+        Prints the wall-clock duration of the run, the latency statistics of its GitHub requests,
+        overall and per endpoint, and how many of them were answered from the response cache.
 
-        :param student: Student object containing the student's details.
-        :param problem: Problem object representing the specific problem to check.
-        :param week_contents: The contents of the GitHub repository's week directory.
+        :param elapsed: Total run time in seconds.
+        :param latency: The dictionary returned by `RequestStats.summary`.
+        :param concurrency: Number of worker threads used by each process.
+        :param processes: Number of worker processes used for the run.
         """
-        file_extensions = ['.cpp', '.java', '.py', '.c', '.js', '.rb', '.go', '.swift']
-        image_extensions = ['.jpg', '.jpeg', '.png']
-        formatted_problem_number = problem.problemNumber.replace(" ", "")
-
-        completion = ProblemCompletion.objects.filter(student=student, problem=problem).first()
-
-        problem_completed = False
-        solution_url = None
-        output_image_url = None
-
-        # Check if the solution file exists in the repository.
-        for extension in file_extensions:
-            problem_file_name = f"{formatted_problem_number}{extension}"
-            matching_file = next((file for file in week_contents if file['name'] == problem_file_name), None)
-            if matching_file:
-                problem_completed = True
-                solution_url = matching_file['download_url']
-
-        # Check if the output image exists in the repository.
-        for extension in image_extensions:
-            image_file_name = f"{formatted_problem_number}{extension}"
-            matching_image = next((file for file in week_contents if file['name'] == image_file_name), None)
-            if matching_image:
-                output_image_url = matching_image['download_url']
-
-        # Create or update the problem completion record.
-        if not completion:
-            ProblemCompletion.objects.create(
-                student=student,
-                problem=problem,
-                is_completed=problem_completed,
-                solution_url=solution_url,
-                output_image_url=output_image_url
+        self.stdout.write(self.style.SUCCESS(
+            f"Sync finished in {elapsed:.1f}s with {processes} process(es) of {concurrency} worker(s), "
+            f"{latency['count']} GitHub requests"
+        ))
+        self.stdout.write(
+            f"Request latency: mean {latency['mean_ms']:.0f}ms, p50 {latency['p50_ms']:.0f}ms, "
+            f"p95 {latency['p95_ms']:.0f}ms, max {latency['max_ms']:.0f}ms"
+        )
+        self.stdout.write(
+            f"Response cache: {latency['cache_hits']} hits (304), {latency['cache_misses']} misses, "
+            f"{latency['bytes'] / 1024:.0f} KiB received"
+        )
+        for endpoint, counters in latency['endpoints'].items():
+            self.stdout.write(
+                f"  {endpoint}: {counters['count']} requests, mean {counters['mean_ms']:.0f}ms, "
+                f"{counters['errors']} failed"
             )
-        else:
-            if (completion.is_completed != problem_completed or
-                completion.solution_url != solution_url or
-                completion.output_image_url != output_image_url):
-                completion.is_completed = problem_completed
-                completion.solution_url = solution_url
-                completion.output_image_url = output_image_url
-                completion.save()
-
-    def update_or_create_week_commit(self, student, week_number, repo_name, week_dir_name, headers):
+
+    def report_rate_limits(self, rate_limits):
         """
-        Fetches the latest commit for a specific week's directory in the student's GitHub repository
-        and updates the `WeekCommit` record with the last commit time and hash.
-
-        :param student: Student object.
-        :param week_number: The number of the week to fetch the commit for.
-        :param repo_name: The GitHub repository name.
-        :param week_dir_name: The name of the week directory.
-        :param headers: The GitHub API request headers.
-        :return: Boolean indicating whether the operation succeeded or failed.
+        Prints the remaining quota of each pooled token and how long the run waited on rate limits.
+        Every shard has its own token pool, so the lowest remaining quota seen for a token is reported.
+
+        :param rate_limits: The dictionaries returned by `TokenPool.summary` for each shard.
         """
-        url = f"https://api.github.com/repos/{student.username}/{repo_name}/commits?path={week_dir_name}"
-
-        try:
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-
-            commits = response.json()
-            if commits:
-                last_commit = commits[0]
-                last_commit_time = parse_datetime(last_commit['commit']['committer']['date'])
-                last_commit_hash = last_commit['sha']
-
-                week_commit, created = WeekCommit.objects.get_or_create(
-                    student=student,
-                    week_number=week_number,
-                    defaults={'last_commit_time': last_commit_time, 'last_commit_hash': last_commit_hash}
-                )
-
-                if not created:
-                    if (week_commit.last_commit_time != last_commit_time or
-                            week_commit.last_commit_hash != last_commit_hash):
-                        week_commit.last_commit_time = last_commit_time
-                        week_commit.last_commit_hash = last_commit_hash
-                        week_commit.save()
-
-            return True
-
-        except requests.exceptions.RequestException as e:
-            return False
+        tokens = {}
+        for shard_limits in rate_limits:
+            for token in shard_limits['tokens']:
+                known = tokens.get(token['token'])
+                if known is None or (token['remaining'] is not None and
+                                     (known['remaining'] is None or token['remaining'] < known['remaining'])):
+                    tokens[token['token']] = token
+
+        for token in tokens.values():
+            self.stdout.write(f"Token {token['token']}: {token['remaining']} requests remaining, resets at {token['reset']}")
+        waited = sum(shard_limits['waited'] for shard_limits in rate_limits)
+        if waited:
+            self.stdout.write(self.style.WARNING(f"Waited {waited:.1f}s on GitHub rate limits"))
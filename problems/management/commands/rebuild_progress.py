@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from problems.progress import refresh_cohort
+from students.models import Student
+
+
+class Command(BaseCommand):
+    """
+    Recomputes the materialized `StudentWeekProgress` table from the problems, completions, commits and
+    deadlines, one cohort (course and semester) per transaction.
+
+    The table is normally kept up to date by the sync and by signal handlers; this command fills it after the
+    migration creating it, and repairs it after data was changed by bulk operations outside the sync.
+
+    Example usage:
+    ```
+    python manage.py rebuild_progress
+    python manage.py rebuild_progress --course BCA --semester 3
+    ```
+    """
+
+    help = 'Rebuild the per-student, per-week progress table used by the reports'
+
+    def add_arguments(self, parser):
+        """
+        Adds the `--course` and `--semester` options restricting the rebuild.
+        """
+        parser.add_argument('--course', help='Only rebuild the cohorts of this course.')
+        parser.add_argument('--semester', help='Only rebuild the cohorts of this semester.')
+
+    def handle(self, *args, **kwargs):
+        """
+        Rebuilds every matching cohort and prints the number of rows written for each.
+        """
+        cohorts = Student.objects.exclude(course='').exclude(semester='')
+        if kwargs.get('course'):
+            cohorts = cohorts.filter(course=kwargs['course'])
+        if kwargs.get('semester'):
+            cohorts = cohorts.filter(semester=kwargs['semester'])
+
+        total = 0
+        for course, semester in cohorts.values_list('course', 'semester').distinct().order_by('course', 'semester'):
+            rows = refresh_cohort(course, semester)
+            total += rows
+            self.stdout.write(f"{course}-{semester}: {rows} rows")
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {total} progress rows"))
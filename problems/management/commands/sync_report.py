@@ -0,0 +1,83 @@
+import statistics
+from django.core.management.base import BaseCommand
+from problems.models import SyncRun
+
+
+class Command(BaseCommand):
+    """
+    Management command printing the telemetry of recent GitHub sync runs, so that regressions in the cost
+    of the sync (duration, API calls, bytes) are visible from one night to the next.
+
+    Each run is compared with the median of the runs listed before it; a run costing more than
+    `--threshold` times that median is flagged.
+    """
+
+    help = 'Show the cost of recent GitHub sync runs and flag regressions'
+
+    def add_arguments(self, parser):
+        """
+        Adds the `--kind`, `--runs`, `--threshold` and `--students` options.
+        """
+        parser.add_argument('--kind', default='nightly', choices=[kind for kind, _ in SyncRun.KIND_CHOICES],
+                            help='Which runs to report.')
+        parser.add_argument('--runs', type=int, default=14, help='Number of recent runs to list.')
+        parser.add_argument('--threshold', type=float, default=1.5,
+                            help='Flag a run costing more than this multiple of the median of earlier runs.')
+        parser.add_argument('--students', type=int, default=10,
+                            help='Number of failed and most expensive students of the latest run to list.')
+
+    def handle(self, *args, **kwargs):
+        """
+        Prints one line per run, oldest first, followed by the failures and the most expensive students
+        of the latest run.
+        """
+        runs = list(SyncRun.objects.filter(kind=kwargs['kind'])[:kwargs['runs']])[::-1]
+        if not runs:
+            self.stdout.write('No sync runs recorded yet')
+            return
+
+        self.stdout.write(f"{'Started':<17} {'Time':>7} {'Students':>8} {'Failed':>6} {'Skipped':>7} "
+                          f"{'Calls':>6} {'KiB':>7} {'304':>6} {'Quota':>6} {'Rows':>6}")
+        for index, run in enumerate(runs):
+            line = (f"{run.started_at:%Y-%m-%d %H:%M} {run.duration:>6.0f}s {run.students:>8} {run.failed:>6} "
+                    f"{run.unchanged:>7} {run.http_calls:>6} {run.bytes / 1024:>7.0f} {run.cache_hits:>6} "
+                    f"{'-' if run.rate_limit_remaining is None else run.rate_limit_remaining:>6} {run.rows_changed:>6}")
+            if run.finished_at is None:
+                self.stdout.write(self.style.WARNING(f"{line}  interrupted"))
+                continue
+
+            regressions = self.regressions(run, [earlier for earlier in runs[:index] if earlier.finished_at],
+                                           kwargs['threshold'])
+            if regressions:
+                self.stdout.write(self.style.ERROR(f"{line}  {', '.join(regressions)}"))
+            else:
+                self.stdout.write(line)
+
+        latest = runs[-1]
+        failures = latest.results.filter(error__isnull=False).select_related('student')[:kwargs['students']]
+        if failures:
+            self.stdout.write("\nFailed students in the latest run:")
+            for result in failures:
+                self.stdout.write(f"  {result.student.username}: {result.error}")
+
+        expensive = latest.results.select_related('student').order_by('-http_calls', '-duration')[:kwargs['students']]
+        if expensive:
+            self.stdout.write("\nMost expensive students in the latest run:")
+            for result in expensive:
+                self.stdout.write(f"  {result.student.username}: {result.http_calls} calls, "
+                                  f"{result.bytes / 1024:.0f} KiB, {result.duration:.1f}s")
+
+    def regressions(self, run, earlier_runs, threshold):
+        """
+        Returns a description of every metric of `run` exceeding `threshold` times its median over
+        `earlier_runs`.
+        """
+        regressions = []
+        for field, label in (('duration', 'time'), ('http_calls', 'calls'), ('bytes', 'bytes')):
+            history = [getattr(earlier, field) for earlier in earlier_runs]
+            if not history:
+                continue
+            median = statistics.median(history)
+            if median and getattr(run, field) > threshold * median:
+                regressions.append(f"{label} x{getattr(run, field) / median:.1f}")
+        return regressions
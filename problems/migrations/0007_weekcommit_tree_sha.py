@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0006_problemcompletion_instructor_comment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='weekcommit',
+            name='tree_sha',
+            field=models.CharField(blank=True, max_length=40, null=True),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.1 on 2026-10-18 10:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0007_weekcommit_tree_sha'),
+        ('students', '0004_alter_student_groups_alter_student_user_permissions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RepositorySyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('head_sha', models.CharField(blank=True, max_length=40, null=True)),
+                ('problem_signature', models.CharField(blank=True, max_length=64, null=True)),
+                ('last_checked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_synced_at', models.DateTimeField(blank=True, null=True)),
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='sync_state', to='students.student')),
+            ],
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.1 on 2026-10-18 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0008_repositorysyncstate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('course', models.CharField(max_length=50)),
+                ('semester', models.CharField(max_length=15)),
+                ('last_student_id', models.BigIntegerField(default=0)),
+                ('students_done', models.IntegerField(default=0)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('elapsed', models.FloatField(default=0)),
+            ],
+            options={
+                'unique_together': {('course', 'semester')},
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.1.1 on 2026-10-18 14:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0009_synccheckpoint'),
+        ('students', '0004_alter_student_groups_alter_student_user_permissions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('nightly', 'Nightly sync'), ('faculty', 'Faculty refresh')], max_length=10)),
+                ('course', models.CharField(blank=True, default='', max_length=50)),
+                ('semester', models.CharField(blank=True, default='', max_length=15)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('duration', models.FloatField(default=0)),
+                ('students', models.IntegerField(default=0)),
+                ('failed', models.IntegerField(default=0)),
+                ('unchanged', models.IntegerField(default=0)),
+                ('http_calls', models.IntegerField(default=0)),
+                ('bytes', models.BigIntegerField(default=0)),
+                ('cache_hits', models.IntegerField(default=0)),
+                ('rate_limit_remaining', models.IntegerField(blank=True, null=True)),
+                ('rows_changed', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ('-started_at',),
+            },
+        ),
+        migrations.CreateModel(
+            name='SyncStudentResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('duration', models.FloatField(default=0)),
+                ('http_calls', models.IntegerField(default=0)),
+                ('bytes', models.IntegerField(default=0)),
+                ('cache_hits', models.IntegerField(default=0)),
+                ('unchanged', models.BooleanField(default=False)),
+                ('rows_changed', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='results', to='problems.syncrun')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='students.student')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='synccheckpoint',
+            name='run',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='checkpoints', to='problems.syncrun'),
+        ),
+    ]
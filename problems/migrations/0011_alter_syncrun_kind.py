@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 15:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0010_syncrun_syncstudentresult'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='syncrun',
+            name='kind',
+            field=models.CharField(choices=[('nightly', 'Nightly sync'), ('deadline', 'Deadline sync'), ('faculty', 'Faculty refresh')], max_length=10),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0011_alter_syncrun_kind'),
+        ('students', '0005_student_github_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentWeekProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week_number', models.IntegerField()),
+                ('total_problems', models.IntegerField(default=0)),
+                ('problems_solved', models.IntegerField(default=0)),
+                ('committed', models.BooleanField(default=False)),
+                ('last_commit_time', models.DateTimeField(blank=True, null=True)),
+                ('last_commit_hash', models.CharField(blank=True, max_length=40, null=True)),
+                ('last_date', models.DateField(blank=True, null=True)),
+                ('is_late', models.BooleanField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='week_progress', to='students.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['week_number'], name='progress_week_idx')],
+                'unique_together': {('student', 'week_number')},
+            },
+        ),
+    ]
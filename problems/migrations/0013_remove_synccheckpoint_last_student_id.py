@@ -0,0 +1,17 @@
+# Generated by Django 5.1.1 on 2026-10-18 18:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0012_studentweekprogress'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='synccheckpoint',
+            name='last_student_id',
+        ),
+    ]
@@ -0,0 +1,188 @@
+"""
+Git mirror backend for the repository sync.
+
+Instead of reading repositories through the REST API, this backend keeps a bare clone of every student
+repository on local disk. The first sync clones the repository; later syncs run a single incremental
+`git fetch`, after which the week folders and the last commit touching each of them are read from the
+local git objects. The snapshots it returns have the same shape as `problems.sync.fetch_snapshot`, so
+`SyncBatch` writes them unchanged.
+
+The backend is selected with `GITHUB_SYNC_BACKEND = 'mirror'`. Remote URLs are built from
+`GITHUB_MIRROR_URL`, which may point at `file://` repositories for local testing.
+"""
+import os
+import subprocess
+import time
+
+from django.conf import settings
+
+from problems.github import RequestStats, raw_url
+
+
+# Fragments of `git clone` errors meaning the repository does not exist. GitHub asks for credentials
+# instead of answering 404 over HTTPS, which fails because terminal prompts are disabled.
+MISSING_REPOSITORY_MARKERS = (
+    'repository not found',
+    'does not appear to be a git repository',
+    'could not read username',
+)
+
+
+class MirrorError(Exception):
+    """
+    Raised when a git command against a mirror fails or times out.
+    """
+
+
+class GitMirror:
+    """
+    Manages the bare mirrors of student repositories kept under a local directory.
+
+    Each clone or fetch is recorded in `stats` like an API request, so the sync telemetry covers
+    this backend too. Different repositories live in different folders, which makes a mirror safe to
+    share between the threads of a sync worker pool.
+    """
+
+    def __init__(self, directory, url_template, timeout=120):
+        """
+        :param directory: Folder holding the mirrors, one `<owner>/<repo>.git` folder per repository.
+        :param url_template: Remote URL with `{owner}` and `{repo}` placeholders.
+        :param timeout: Seconds after which a git command is aborted.
+        """
+        self.directory = directory
+        self.url_template = url_template
+        self.timeout = timeout
+        self.stats = RequestStats()
+
+    @classmethod
+    def from_settings(cls):
+        """
+        Builds a mirror manager from `GITHUB_MIRROR_DIR` and `GITHUB_MIRROR_URL`.
+        """
+        return cls(settings.GITHUB_MIRROR_DIR, settings.GITHUB_MIRROR_URL)
+
+    def path(self, owner, repo_name):
+        """
+        Returns the folder of a repository's mirror.
+        """
+        return os.path.join(self.directory, owner, f"{repo_name}.git")
+
+    def _git(self, *args, git_dir=None, network=False):
+        """
+        Runs a git command and returns the completed process, whatever its exit status.
+
+        :param git_dir: The mirror to run the command in, if any.
+        :param network: Whether the command talks to the remote, in which case it is recorded in `stats`.
+        :raises MirrorError: If the command could not be run or timed out.
+        """
+        command = ['git'] + (['--git-dir', git_dir] if git_dir else []) + list(args)
+        # Never prompt for credentials: a missing or private repository must fail instead of hanging.
+        env = dict(os.environ, GIT_TERMINAL_PROMPT='0')
+        start = time.monotonic()
+        result = None
+        try:
+            result = subprocess.run(command, capture_output=True, text=True, timeout=self.timeout, env=env)
+            return result
+        except (OSError, subprocess.TimeoutExpired) as e:
+            raise MirrorError(f"git {args[0]} failed: {e}") from e
+        finally:
+            if network:
+                self.stats.record(time.monotonic() - start, endpoint=f"git {args[0]}",
+                                  error=result is None or result.returncode != 0)
+
+    def update(self, owner, repo_name):
+        """
+        Clones the repository if it has no mirror yet, otherwise fetches its new commits.
+
+        :return: The hash of the default branch's HEAD, or None if the repository does not exist or is empty.
+        :raises MirrorError: If the remote could not be reached.
+        """
+        git_dir = self.path(owner, repo_name)
+        url = self.url_template.format(owner=owner, repo=repo_name)
+
+        if not os.path.isdir(git_dir):
+            os.makedirs(os.path.dirname(git_dir), exist_ok=True)
+            result = self._git('clone', '--bare', '--quiet', url, git_dir, network=True)
+            if result.returncode != 0:
+                if any(marker in result.stderr.lower() for marker in MISSING_REPOSITORY_MARKERS):
+                    return None
+                raise MirrorError(f"git clone of {owner}/{repo_name} failed: {result.stderr.strip()}")
+        else:
+            result = self._git('fetch', '--quiet', '--prune', url, '+refs/heads/*:refs/heads/*',
+                               git_dir=git_dir, network=True)
+            if result.returncode != 0:
+                raise MirrorError(f"git fetch of {owner}/{repo_name} failed: {result.stderr.strip()}")
+
+        head = self._git('rev-parse', '--verify', '--quiet', 'HEAD^{commit}', git_dir=git_dir)
+        return head.stdout.strip() if head.returncode == 0 else None
+
+    def ls_tree(self, git_dir, tree_ish):
+        """
+        Lists the entries of a tree.
+
+        :return: List of (type, sha, name) tuples, e.g. ('tree', '<sha>', 'Week1').
+        """
+        result = self._git('ls-tree', '-z', tree_ish, git_dir=git_dir)
+        if result.returncode != 0:
+            raise MirrorError(f"git ls-tree {tree_ish} failed: {result.stderr.strip()}")
+
+        entries = []
+        for line in filter(None, result.stdout.split('\0')):
+            info, name = line.split('\t', 1)
+            _, object_type, sha = info.split()
+            entries.append((object_type, sha, name))
+        return entries
+
+    def last_commit(self, git_dir, head_sha, path):
+        """
+        Returns the last commit touching a path, in the shape of the GitHub commits API
+        (a list with at most one entry holding `sha` and `commit.committer.date`).
+        """
+        result = self._git('log', '-1', '--format=%H%x00%cI', head_sha, '--', path, git_dir=git_dir)
+        if result.returncode != 0:
+            raise MirrorError(f"git log {path} failed: {result.stderr.strip()}")
+        if not result.stdout.strip():
+            return []
+        sha, date = result.stdout.strip().split('\0')
+        return [{'sha': sha, 'commit': {'committer': {'date': date}}}]
+
+    def fetch_snapshot(self, student, week_numbers, sync_state):
+        """
+        Updates a student's mirror and reads a snapshot of their repository from it.
+
+        Works like `problems.sync.fetch_snapshot`: the snapshot is reported as unchanged when HEAD did not
+        move since the last complete sync, and the last commit of a week folder is only looked up when the
+        folder's tree changed. Files keep their raw GitHub URLs, since those are what the site links to.
+
+        :param student: Student object.
+        :param week_numbers: Week numbers that have problems for the student's cohort.
+        :param sync_state: The dictionary returned by `SyncBatch.sync_state` for the student.
+        :return: The same structure as `problems.sync.fetch_snapshot`.
+        :raises MirrorError: If the repository could not be fetched or read.
+        """
+        owner, repo_name = student.username, student.repo_name
+        head_sha = self.update(owner, repo_name)
+        if head_sha is None:
+            return None
+        if head_sha == sync_state['head_sha']:
+            return {'head_sha': head_sha, 'unchanged': True}
+
+        git_dir = self.path(owner, repo_name)
+        week_dirs = {name: sha for object_type, sha, name in self.ls_tree(git_dir, head_sha)
+                     if object_type == 'tree' and name.startswith('Week')}
+
+        weeks = {}
+        for week_number in week_numbers:
+            week_dir_name = f"Week{week_number}"
+            if week_dir_name not in week_dirs:
+                continue
+
+            files = [{'name': name, 'download_url': raw_url(owner, repo_name, f"{week_dir_name}/{name}")}
+                     for object_type, _, name in self.ls_tree(git_dir, week_dirs[week_dir_name])
+                     if object_type == 'blob']
+            week = {'files': files, 'tree_sha': week_dirs[week_dir_name]}
+            if sync_state['tree_shas'].get(week_number) != week['tree_sha']:
+                week['commits'] = self.last_commit(git_dir, head_sha, week_dir_name)
+            weeks[week_number] = week
+
+        return {'head_sha': head_sha, 'weeks': weeks}
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from students.models import Student
 
 class Problem(models.Model):
@@ -109,6 +110,8 @@ class WeekCommit(models.Model):
         week_number (IntegerField): Indicates the week for which the commit is being tracked.
         last_commit_time (DateTimeField): The timestamp of the student's most recent commit for the given week.
         last_commit_hash (CharField): Stores the SHA-1 hash of the last commit, allowing up to 40 characters. This field is optional.
+        tree_sha (CharField): The Git tree hash of the week's folder when the last commit was recorded. The sync
+            skips the commit lookup for the week while the folder's tree hash is unchanged. This field is optional.
 
     Meta:
         unique_together (tuple): Ensures that each student can only have one commit entry per week.
@@ -120,6 +123,7 @@ class WeekCommit(models.Model):
     week_number = models.IntegerField()
     last_commit_time = models.DateTimeField(null=True, blank=True)
     last_commit_hash = models.CharField(max_length=40, null=True, blank=True)  # Assuming SHA-1 hash
+    tree_sha = models.CharField(max_length=40, null=True, blank=True)
 
     class Meta:
         unique_together = ('student', 'week_number')
@@ -130,3 +134,243 @@ class WeekCommit(models.Model):
         displaying the student's username and the week number.
         """
         return f"{self.student.username} - Week {self.week_number}"
+
+
+class RepositorySyncState(models.Model):
+    """
+    Remembers what the GitHub sync last saw in a student's repository, so unchanged repositories can be
+    skipped after a single cheap API call.
+
+    Fields:
+        student (OneToOneField): The student owning the repository.
+        head_sha (CharField): The HEAD commit hash of the default branch at the last complete sync.
+        problem_signature (CharField): A fingerprint of the cohort's problem set at the last complete sync.
+            A repository is synced again when problems are added or renamed, even if its HEAD did not move.
+        last_checked_at (DateTimeField): The timestamp of the last time the repository was looked at.
+        last_synced_at (DateTimeField): The timestamp of the last successful sync.
+
+    Methods:
+        __str__: Returns a string displaying the student's username and the recorded HEAD hash.
+    """
+    student = models.OneToOneField(Student, on_delete=models.CASCADE, related_name='sync_state')
+    head_sha = models.CharField(max_length=40, null=True, blank=True)
+    problem_signature = models.CharField(max_length=64, null=True, blank=True)
+    last_checked_at = models.DateTimeField(null=True, blank=True)
+    last_synced_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        """
+        Returns a string representation of the sync state, displaying the student's username and HEAD hash.
+        """
+        return f"{self.student.username} - {self.head_sha}"
+
+
+class SyncCheckpoint(models.Model):
+    """
+    Tracks the progress of one shard of the nightly GitHub sync, so an interrupted run can resume where it
+    stopped instead of starting again from the first student.
+
+    The nightly sync is sharded by cohort (course and semester). Students of a shard are processed in priority
+    order, and the checkpoint is moved forward after every batch has been written; a resumed run skips the
+    students whose repository was checked since `started_at`. The checkpoint records the `SyncRun` that wrote
+    it, and only a resumed run of that same `SyncRun` may skip or continue the shard: a checkpoint left by an
+    earlier night is started over.
+
+    Fields:
+        course (CharField): The course of the shard.
+        semester (CharField): The semester of the shard.
+        students_done (IntegerField): Number of students processed in the current run of the shard.
+        started_at (DateTimeField): When the current run of the shard started.
+        finished_at (DateTimeField): When the current run of the shard finished; empty while it is unfinished.
+        elapsed (FloatField): Seconds spent on the current run of the shard, summed over resumed attempts.
+        run (ForeignKey): The `SyncRun` the current run of the shard belongs to.
+
+    Meta:
+        unique_together (tuple): Ensures that each cohort has a single checkpoint.
+
+    Methods:
+        __str__: Returns a string displaying the shard and the number of students done.
+    """
+    course = models.CharField(max_length=50)
+    semester = models.CharField(max_length=15)
+    students_done = models.IntegerField(default=0)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    elapsed = models.FloatField(default=0)
+    run = models.ForeignKey('SyncRun', on_delete=models.SET_NULL, null=True, blank=True, related_name='checkpoints')
+
+    class Meta:
+        unique_together = ('course', 'semester')
+
+    def __str__(self):
+        """
+        Returns a string representation of the checkpoint, displaying the shard and the number of students done.
+        """
+        return f"{self.course}-{self.semester} - {self.students_done} students done"
+
+
+class SyncRun(models.Model):
+    """
+    Telemetry of one GitHub sync run, kept so that changes in the cost of the sync are visible over time.
+
+    Fields:
+        kind (CharField): What started the run: 'nightly' for `check_github_repos`, 'deadline' for the extra
+            syncs of cohorts close to a deadline, 'faculty' for a refresh requested from the faculty dashboard.
+        course (CharField): The course of a faculty refresh, or the `COURSE:SEMESTER` list of a deadline sync;
+            empty for a nightly run, which covers every cohort.
+        semester (CharField): The semester of a faculty refresh; empty for a nightly run.
+        started_at (DateTimeField): When the run started.
+        finished_at (DateTimeField): When the run finished; empty while it is running or if it was interrupted.
+        duration (FloatField): Wall-clock seconds the run took; for a resumed run, those of the attempt that
+            finished it.
+        students (IntegerField): Number of students whose repository was looked at.
+        failed (IntegerField): Number of students whose repository could not be read.
+        unchanged (IntegerField): Number of repositories skipped because their HEAD had not moved.
+        http_calls (IntegerField): Number of GitHub API requests made.
+        bytes (BigIntegerField): Total size of the response bodies received.
+        cache_hits (IntegerField): Number of requests GitHub answered with `304 Not Modified`.
+        rate_limit_remaining (IntegerField): The lowest remaining quota of any token at the end of the run.
+        rows_changed (IntegerField): Number of `ProblemCompletion` and `WeekCommit` rows created or updated.
+
+    Methods:
+        __str__: Returns a string displaying the kind and start time of the run.
+    """
+
+    KIND_CHOICES = [
+        ('nightly', 'Nightly sync'),
+        ('deadline', 'Deadline sync'),
+        ('faculty', 'Faculty refresh'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    course = models.CharField(max_length=50, blank=True, default='')
+    semester = models.CharField(max_length=15, blank=True, default='')
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration = models.FloatField(default=0)
+    students = models.IntegerField(default=0)
+    failed = models.IntegerField(default=0)
+    unchanged = models.IntegerField(default=0)
+    http_calls = models.IntegerField(default=0)
+    bytes = models.BigIntegerField(default=0)
+    cache_hits = models.IntegerField(default=0)
+    rate_limit_remaining = models.IntegerField(null=True, blank=True)
+    rows_changed = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ('-started_at',)
+
+    def __str__(self):
+        """
+        Returns a string representation of the run, displaying its kind and start time.
+        """
+        return f"{self.get_kind_display()} {self.started_at:%Y-%m-%d %H:%M}"
+
+    def finish(self, duration, rate_limit_remaining=None):
+        """
+        Totals the run's per-student results onto the run and marks it as finished.
+
+        :param duration: Wall-clock seconds the run took.
+        :param rate_limit_remaining: The lowest remaining token quota at the end of the run.
+        """
+        totals = self.results.aggregate(
+            students=models.Count('id'),
+            failed=models.Count('id', filter=models.Q(error__isnull=False)),
+            unchanged=models.Count('id', filter=models.Q(unchanged=True)),
+            http_calls=models.Sum('http_calls'),
+            bytes=models.Sum('bytes'),
+            cache_hits=models.Sum('cache_hits'),
+            rows_changed=models.Sum('rows_changed'),
+        )
+        for field, value in totals.items():
+            setattr(self, field, value or 0)
+        self.duration = duration
+        self.rate_limit_remaining = rate_limit_remaining
+        self.finished_at = timezone.now()
+        self.save()
+
+
+class SyncStudentResult(models.Model):
+    """
+    The cost and outcome of syncing one student's repository during a `SyncRun`.
+
+    Fields:
+        run (ForeignKey): The run the result belongs to.
+        student (ForeignKey): The student whose repository was synced.
+        duration (FloatField): Seconds spent fetching the repository.
+        http_calls (IntegerField): Number of GitHub API requests made for the student.
+        bytes (IntegerField): Total size of the response bodies received for the student.
+        cache_hits (IntegerField): Number of the student's requests answered with `304 Not Modified`.
+        unchanged (BooleanField): Whether the repository was skipped because its HEAD had not moved.
+        rows_changed (IntegerField): Number of the student's rows created or updated.
+        error (TextField): Why the repository could not be read; empty on success.
+
+    Methods:
+        __str__: Returns a string displaying the student and the run.
+    """
+    run = models.ForeignKey('SyncRun', on_delete=models.CASCADE, related_name='results')
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    duration = models.FloatField(default=0)
+    http_calls = models.IntegerField(default=0)
+    bytes = models.IntegerField(default=0)
+    cache_hits = models.IntegerField(default=0)
+    unchanged = models.BooleanField(default=False)
+    rows_changed = models.IntegerField(default=0)
+    error = models.TextField(null=True, blank=True)
+
+    def __str__(self):
+        """
+        Returns a string representation of the result, displaying the student's username and the run.
+        """
+        return f"{self.student.username} - {self.run}"
+
+
+class StudentWeekProgress(models.Model):
+    """
+    A student's progress in one week, precomputed from `Problem`, `ProblemCompletion`, `WeekCommit` and
+    `LastDateOfWeek` so that reports read it with a single indexed query.
+
+    Rows are kept up to date by `problems.progress`: the sync refreshes the students whose rows it wrote,
+    and signals refresh them when a completion, commit, problem, deadline or student is saved or deleted
+    one by one. The `rebuild_progress` command recomputes every row.
+
+    Fields:
+        student (ForeignKey): The student the row belongs to.
+        week_number (IntegerField): A week that has problems for the student's course and semester.
+        total_problems (IntegerField): Number of problems assigned for the week.
+        problems_solved (IntegerField): Number of the week's problems the student completed.
+        committed (BooleanField): Whether a `WeekCommit` exists for the student and week.
+        last_commit_time (DateTimeField): The time of the student's last commit for the week.
+        last_commit_hash (CharField): The hash of that commit.
+        last_date (DateField): The deadline of the week, if one is set.
+        is_late (BooleanField): Whether the last commit came after the deadline; empty when nothing was
+            committed or the week has no deadline.
+        updated_at (DateTimeField): When the row was last recomputed.
+
+    Meta:
+        unique_together (tuple): Ensures that each student has a single row per week.
+        indexes (list): Lets the per-week reports read every cohort's row for a week.
+
+    Methods:
+        __str__: Returns a string displaying the student's username, the week and the solved count.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='week_progress')
+    week_number = models.IntegerField()
+    total_problems = models.IntegerField(default=0)
+    problems_solved = models.IntegerField(default=0)
+    committed = models.BooleanField(default=False)
+    last_commit_time = models.DateTimeField(null=True, blank=True)
+    last_commit_hash = models.CharField(max_length=40, null=True, blank=True)
+    last_date = models.DateField(null=True, blank=True)
+    is_late = models.BooleanField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('student', 'week_number')
+        indexes = [models.Index(fields=['week_number'], name='progress_week_idx')]
+
+    def __str__(self):
+        """
+        Returns a string representation of the row, displaying the student's username, the week and the solved count.
+        """
+        return f"{self.student.username} - Week {self.week_number} - {self.problems_solved}/{self.total_problems}"
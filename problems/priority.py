@@ -0,0 +1,129 @@
+"""
+Priority ordering of the repository sync.
+
+A sync cut short by the rate limit should already have refreshed the students whose data matters most.
+Instead of visiting students in id order, `sync_shard` draws them from a priority queue built by
+`prioritize`, and `check_github_repos` starts with the cohorts whose deadline is closest. A student's
+score adds up four terms, each between 0 and 1 before weighting:
+
+- push activity: 1 when a push recorded by the webhook is newer than the last successful sync, otherwise
+  a value fading out over a week since the last commit the sync saw;
+- deadline proximity: how close the cohort's next week deadline is, fading out over `DEADLINE_HORIZON`;
+- staleness: time since the last successful sync, saturating after `STALENESS_HORIZON`;
+- failures: failed syncs of the student's repository over the last week, saturating after `FAILURE_CAP`.
+"""
+import heapq
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from faculty.models import LastDateOfWeek
+from problems.models import RepositorySyncState, SyncStudentResult, WeekCommit
+
+
+PUSH_WEIGHT = 3.0
+DEADLINE_WEIGHT = 2.0
+STALENESS_WEIGHT = 2.0
+FAILURE_WEIGHT = 1.0
+
+PUSH_HORIZON = timedelta(days=7)
+DEADLINE_HORIZON = timedelta(days=7)
+STALENESS_HORIZON = timedelta(hours=48)
+FAILURE_WINDOW = timedelta(days=7)
+FAILURE_CAP = 3
+
+
+def deadline_time(last_date):
+    """
+    Returns the moment a week closes: submissions are accepted until the end of its `last_date`.
+    """
+    return timezone.make_aware(datetime.combine(last_date, time.max))
+
+
+def next_deadline(course, semester, now=None):
+    """
+    Returns the time of a cohort's next week deadline, or None if no deadline is ahead.
+    """
+    now = now or timezone.now()
+    entry = (LastDateOfWeek.objects.filter(course=course, semester=semester, last_date__gte=timezone.localdate(now))
+             .order_by('last_date').first())
+    return deadline_time(entry.last_date) if entry else None
+
+
+def fading(age, horizon):
+    """
+    Returns 1 for an age of zero, decreasing linearly to 0 once the age reaches the horizon.
+    """
+    return max(0.0, 1 - age / horizon)
+
+
+def deadline_urgency(course, semester, now=None):
+    """
+    Returns the deadline proximity term of a cohort, between 0 (no deadline within `DEADLINE_HORIZON`) and 1.
+    """
+    now = now or timezone.now()
+    deadline = next_deadline(course, semester, now)
+    return fading(deadline - now, DEADLINE_HORIZON) if deadline else 0.0
+
+
+def student_priorities(students, course, semester, now=None):
+    """
+    Scores the students of a cohort for the sync, with one aggregate query per term.
+
+    :param students: The students to score, all from the given cohort.
+    :param course: The course of the cohort.
+    :param semester: The semester of the cohort.
+    :param now: The reference time, defaults to the current time.
+    :return: Dictionary mapping student ids to their score; higher scores are synced first.
+    """
+    now = now or timezone.now()
+    student_ids = [student.pk for student in students]
+
+    last_synced = dict(RepositorySyncState.objects.filter(student_id__in=student_ids)
+                       .values_list('student_id', 'last_synced_at'))
+    last_commits = dict(WeekCommit.objects.filter(student_id__in=student_ids).values('student_id')
+                        .annotate(latest=Max('last_commit_time')).values_list('student_id', 'latest'))
+    failures = dict(SyncStudentResult.objects.filter(student_id__in=student_ids, error__isnull=False,
+                                                     run__started_at__gte=now - FAILURE_WINDOW)
+                    .values('student_id').annotate(count=Count('id')).values_list('student_id', 'count'))
+    deadline = deadline_urgency(course, semester, now)
+
+    scores = {}
+    for student_id in student_ids:
+        synced_at = last_synced.get(student_id)
+        last_commit = last_commits.get(student_id)
+
+        if last_commit is None:
+            push = 0.0
+        elif synced_at is None or last_commit > synced_at:
+            push = 1.0
+        else:
+            push = fading(now - last_commit, PUSH_HORIZON)
+        staleness = 1.0 if synced_at is None else 1 - fading(now - synced_at, STALENESS_HORIZON)
+        failure = min(failures.get(student_id, 0), FAILURE_CAP) / FAILURE_CAP
+
+        scores[student_id] = (PUSH_WEIGHT * push + DEADLINE_WEIGHT * deadline +
+                              STALENESS_WEIGHT * staleness + FAILURE_WEIGHT * failure)
+    return scores
+
+
+def prioritize(students, course, semester, now=None):
+    """
+    Returns the students of a cohort in the order the sync should visit them: highest score first, ties
+    broken by id so the order is stable.
+    """
+    scores = student_priorities(students, course, semester, now)
+    queue = [(-scores[student.pk], student.pk, student) for student in students]
+    heapq.heapify(queue)
+    return [heapq.heappop(queue)[2] for _ in range(len(queue))]
+
+
+def order_shards(shards, now=None):
+    """
+    Sorts the (course, semester) shards of a sync so the cohorts with the closest deadline come first.
+    Shards without an upcoming deadline keep their original order at the end.
+    """
+    now = now or timezone.now()
+    urgency = {shard: deadline_urgency(*shard, now) for shard in shards}
+    return sorted(shards, key=lambda shard: -urgency[shard])
@@ -0,0 +1,118 @@
+"""
+Maintenance of the materialized `StudentWeekProgress` table.
+
+Every report used to recompute, per (student, week), the solved and total problem counts, the last commit
+and whether it was late. `refresh_progress` computes those rows for a group of students from one
+aggregate query per input table and writes them with a single upsert, so keeping the table current costs
+about as much as one report used to.
+
+Rows are refreshed:
+- by `SyncBatch.commit`, for the students whose completions or commits it wrote (bulk writes send no signals);
+- by the signal handlers of `problems.signals`, when a completion, commit, problem, deadline or student
+  is saved or deleted one at a time (instructor feedback, deadline changes, the admin, signups);
+- by the `rebuild_progress` management command, which recomputes everything.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count
+
+from faculty.models import LastDateOfWeek
+from problems.models import Problem, ProblemCompletion, StudentWeekProgress, WeekCommit
+from problems.report_cache import bump_versions
+from students.models import Student
+
+
+PROGRESS_FIELDS = ['total_problems', 'problems_solved', 'committed', 'last_commit_time', 'last_commit_hash',
+                   'last_date', 'is_late', 'updated_at']
+
+
+def cohort_rows(course, semester, student_ids):
+    """
+    Computes the `StudentWeekProgress` rows of some students of a cohort, without saving them.
+
+    :param course: The course of the cohort.
+    :param semester: The semester of the cohort.
+    :param student_ids: Ids of the students to compute rows for.
+    :return: List of unsaved `StudentWeekProgress` instances, one per student and week with problems.
+    """
+    total_problems = dict(Problem.objects.filter(course=course, semester=semester).order_by()
+                          .values('week').annotate(total=Count('id')).values_list('week', 'total'))
+    last_dates = dict(LastDateOfWeek.objects.filter(course=course, semester=semester)
+                      .values_list('week', 'last_date'))
+    solved = {
+        (student_id, week): count
+        for student_id, week, count in ProblemCompletion.objects.filter(
+            student_id__in=student_ids, is_completed=True, problem__course=course, problem__semester=semester
+        ).order_by().values('student_id', 'problem__week').annotate(count=Count('id'))
+        .values_list('student_id', 'problem__week', 'count')
+    }
+    commits = {
+        (student_id, week): (last_commit_time, last_commit_hash)
+        for student_id, week, last_commit_time, last_commit_hash in WeekCommit.objects.filter(
+            student_id__in=student_ids, week_number__in=list(total_problems)
+        ).values_list('student_id', 'week_number', 'last_commit_time', 'last_commit_hash')
+    }
+
+    rows = []
+    for student_id in student_ids:
+        for week, total in total_problems.items():
+            committed = (student_id, week) in commits
+            last_commit_time, last_commit_hash = commits.get((student_id, week), (None, None))
+            last_date = last_dates.get(week)
+
+            is_late = None
+            if committed and last_date:
+                is_late = bool(last_commit_time and last_commit_time.date() > last_date)
+
+            rows.append(StudentWeekProgress(
+                student_id=student_id, week_number=week, total_problems=total,
+                problems_solved=solved.get((student_id, week), 0), committed=committed,
+                last_commit_time=last_commit_time, last_commit_hash=last_commit_hash,
+                last_date=last_date, is_late=is_late,
+            ))
+    return rows
+
+
+def refresh_progress(students):
+    """
+    Recomputes the `StudentWeekProgress` rows of the given students inside one transaction, and drops their
+    rows for weeks that no longer have problems. The cached reports of their cohorts are invalidated once the
+    transaction commits (see `problems.report_cache`).
+
+    :param students: Student objects (only `pk`, `course` and `semester` are used).
+    :return: The number of rows written.
+    """
+    by_cohort = defaultdict(list)
+    for student in students:
+        by_cohort[(student.course, student.semester)].append(student.pk)
+
+    written = 0
+    with transaction.atomic():
+        for (course, semester), student_ids in by_cohort.items():
+            # Accounts without a course (administrators) have no progress.
+            rows = cohort_rows(course, semester, student_ids) if course and semester else []
+            if rows:
+                StudentWeekProgress.objects.bulk_create(
+                    rows, batch_size=500, update_conflicts=True, unique_fields=['student', 'week_number'],
+                    update_fields=PROGRESS_FIELDS,
+                )
+            StudentWeekProgress.objects.filter(student_id__in=student_ids).exclude(
+                week_number__in={row.week_number for row in rows}
+            ).delete()
+            written += len(rows)
+        bump_versions(by_cohort)
+    return written
+
+
+def refresh_cohort(course, semester):
+    """
+    Recomputes the `StudentWeekProgress` rows of every student of a course and semester. The cached reports of
+    the cohort are invalidated even when it has no students, since they still list its problems and deadlines.
+
+    :return: The number of rows written.
+    """
+    students = list(Student.objects.filter(course=course, semester=semester).only('id', 'course', 'semester'))
+    if not students:
+        bump_versions([(course, semester)])
+    return refresh_progress(students)
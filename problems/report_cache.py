@@ -0,0 +1,138 @@
+"""
+Versioned cache of the faculty reports.
+
+Each cohort (course and semester) has a data version, and a global version covers reports spanning every
+cohort. Reports are cached under (endpoint, cohort, week, parameters, version), so a report is built once
+per version and every later view or download of it is served from the cache.
+
+Versions are bumped by `problems.progress.refresh_progress`, which runs whenever a `ProblemCompletion`,
+`WeekCommit`, `LastDateOfWeek` or `Problem` is written, whether by the signal handlers of
+`problems.signals` or by the sync's bulk writes. A version is a random token rather than a counter, so two
+processes bumping it at once can never both land on the same value, and it is only replaced once the
+transaction that changed the data has committed: a report built from the old data is never cached under
+the new version.
+
+Entries live in the `reports` cache, a file-based backend shared by the web server and the workers
+running the sync, so a bump made by a worker is seen by every web process. Downloadable exports are kept
+as files in `REPORT_EXPORT_DIR` under the same keys (see `cached_export`), so they can be sent in chunks
+without being read into memory.
+"""
+import hashlib
+import os
+import tempfile
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+REPORTS_CACHE = 'reports'
+GLOBAL = ('*', '*')
+
+
+def _version_key(cohort):
+    return f"report-version:{cohort[0]}:{cohort[1]}"
+
+
+def data_version(course=None, semester=None):
+    """
+    Returns the current data version of a cohort, or the global version when no cohort is given.
+    """
+    cohort = (course, str(semester)) if course else GLOBAL
+    cache = caches[REPORTS_CACHE]
+    version = cache.get(_version_key(cohort))
+    if version is None:
+        version = uuid.uuid4().hex
+        # Another process may have set it meanwhile; keep theirs.
+        if not cache.add(_version_key(cohort), version, None):
+            version = cache.get(_version_key(cohort), version)
+    return version
+
+
+def bump_versions(cohorts):
+    """
+    Replaces the data versions of the given cohorts and the global version once the current transaction
+    commits, making every report cached for them unreachable.
+
+    :param cohorts: Iterable of (course, semester) pairs whose data changed.
+    """
+    keys = [_version_key((course, str(semester))) for course, semester in set(cohorts)] + [_version_key(GLOBAL)]
+
+    def bump():
+        caches[REPORTS_CACHE].set_many({key: uuid.uuid4().hex for key in keys}, None)
+
+    transaction.on_commit(bump)
+
+
+def _report_key(endpoint, course, semester, week, params):
+    version = data_version(course, semester)
+    extra = ':'.join(f"{name}={value}" for name, value in sorted(params.items()))
+    return f"report:{endpoint}:{course}:{semester}:{week}:{extra}:{version}"
+
+
+def cached_report(endpoint, build, course=None, semester=None, week=None, **params):
+    """
+    Returns a report from the cache, building and storing it on a miss.
+
+    :param endpoint: Name of the report, part of the cache key.
+    :param build: Function without arguments returning the report data (anything picklable).
+    :param course: The cohort's course, or None for a report spanning every cohort (keyed by the global version).
+    :param semester: The cohort's semester.
+    :param week: The week the report covers, if any.
+    :param params: Any other parameters the report depends on, e.g. a student's faculty number.
+    :return: The report data.
+    """
+    key = _report_key(endpoint, course, semester, week, params)
+
+    cache = caches[REPORTS_CACHE]
+    report = cache.get(key)
+    if report is None:
+        report = build()
+        cache.set(key, report, settings.REPORT_CACHE_TIMEOUT)
+    return report
+
+
+def cached_export(endpoint, extension, write, course=None, semester=None, week=None, **params):
+    """
+    Returns the path of an export file, writing it on a miss.
+
+    The file is written to a temporary name and renamed once complete, so a concurrent request never sees a
+    partial export. Files older than `REPORT_CACHE_TIMEOUT` are rewritten, and removed when another export
+    is written.
+
+    :param endpoint: Name of the export, part of the cache key.
+    :param extension: File extension of the export, part of the cache key.
+    :param write: Function writing the export to the binary file object it is given.
+    :param course: The cohort's course, or None for an export spanning every cohort.
+    :param semester: The cohort's semester.
+    :param week: The week the export covers, if any.
+    :param params: Any other parameters the export depends on.
+    :return: Path of the export file.
+    """
+    key = _report_key(endpoint, course, semester, week, params)
+    directory = settings.REPORT_EXPORT_DIR
+    path = os.path.join(directory, f"{hashlib.sha256(key.encode()).hexdigest()}.{extension}")
+    expired_before = time.time() - settings.REPORT_CACHE_TIMEOUT
+
+    if os.path.exists(path) and os.path.getmtime(path) >= expired_before:
+        return path
+
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=directory, suffix='.part')
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            write(file)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+    # Exports of older versions are unreachable; remove them once they expire
+    for entry in os.scandir(directory):
+        try:
+            if entry.path != path and entry.stat().st_mtime < expired_before:
+                os.unlink(entry.path)
+        except FileNotFoundError:
+            pass
+    return path
@@ -1,18 +1,131 @@
+import multiprocessing
 import os
+import time
+from datetime import timedelta
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from django.core.management import call_command
 from django.conf import settings
+from django.db.models import Avg
+from django.utils import timezone
+from faculty.models import LastDateOfWeek
+from problems.models import SyncRun, SyncStudentResult
+from problems.priority import deadline_time
+from students.models import Student
+
+# API requests assumed per student for a cohort without recent telemetry.
+DEFAULT_CALLS_PER_STUDENT = 3
+
+# Runs still unfinished after this long are taken to have crashed, and no longer hold back other runs.
+NIGHTLY_RUN_MAX_AGE = timedelta(hours=6)
+DEADLINE_RUN_MAX_AGE = timedelta(hours=2)
+
+# An interrupted nightly run is resumed by the next nightly sync; one older than this is started over.
+NIGHTLY_RUN_RESUME_MAX_AGE = timedelta(days=2)
+
+# Seconds between two checks while the nightly sync waits for a deadline sync to finish.
+WAIT_INTERVAL = 60
+
+
+def sync_in_progress(kind, max_age):
+    """
+    Tells whether a sync run of the given kind started less than `max_age` ago and has not finished.
+    """
+    return SyncRun.objects.filter(kind=kind, finished_at__isnull=True,
+                                  started_at__gte=timezone.now() - max_age).exists()
+
 
 def run_management_command():
+    """
+    Nightly job syncing every cohort. A deadline sync still in progress is waited for first, so the two
+    runs never sync the same cohort at the same time; the wait ends after `DEADLINE_RUN_MAX_AGE` at most.
+    """
+    while sync_in_progress('deadline', DEADLINE_RUN_MAX_AGE):
+        time.sleep(WAIT_INTERVAL)
     call_command('check_github_repos')
 
+
+def upcoming_deadlines(now=None):
+    """
+    Returns the cohorts whose next week deadline falls within `SYNC_DEADLINE_WINDOW_HOURS`.
+
+    A `LastDateOfWeek.last_date` is a date; submissions are accepted until the end of that day.
+
+    :param now: The reference time, defaults to the current time.
+    :return: Dictionary mapping (course, semester) pairs to the time of their nearest deadline.
+    """
+    now = now or timezone.now()
+    window_end = now + timedelta(hours=settings.SYNC_DEADLINE_WINDOW_HOURS)
+    deadlines = {}
+    for entry in LastDateOfWeek.objects.filter(last_date__gte=timezone.localdate(now),
+                                               last_date__lte=timezone.localdate(window_end)):
+        deadline = deadline_time(entry.last_date)
+        key = (entry.course, str(entry.semester))
+        if now <= deadline and (key not in deadlines or deadline < deadlines[key]):
+            deadlines[key] = deadline
+    return deadlines
+
+
+def estimated_cost(course, semester):
+    """
+    Estimates how many API requests a sync of a cohort will make, from the average cost per student
+    recorded over the last week of sync runs.
+    """
+    students = Student.objects.filter(course=course, semester=semester, is_superuser=False, is_staff=False).count()
+    calls_per_student = SyncStudentResult.objects.filter(
+        student__course=course, student__semester=semester,
+        run__started_at__gte=timezone.now() - timedelta(days=7),
+    ).aggregate(calls=Avg('http_calls'))['calls']
+    return students * (calls_per_student if calls_per_student is not None else DEFAULT_CALLS_PER_STUDENT)
+
+
+def plan_deadline_sync(now=None):
+    """
+    Chooses the cohorts the hourly deadline sync should refresh.
+
+    Cohorts with a deadline inside the window are taken nearest deadline first, as long as their estimated
+    cost fits in `SYNC_DEADLINE_BUDGET` requests per hour; cohorts that do not fit wait for a later hour
+    or for the nightly sync.
+
+    :return: List of (course, semester) pairs.
+    """
+    budget = settings.SYNC_DEADLINE_BUDGET
+    planned = []
+    for cohort, _ in sorted(upcoming_deadlines(now).items(), key=lambda item: item[1]):
+        cost = estimated_cost(*cohort)
+        if cost <= budget:
+            planned.append(cohort)
+            budget -= cost
+    return planned
+
+
+def run_deadline_sync():
+    """
+    Hourly job syncing the cohorts chosen by `plan_deadline_sync`, unless a nightly sync or the previous
+    deadline sync is still running.
+    """
+    if sync_in_progress('nightly', NIGHTLY_RUN_MAX_AGE) or sync_in_progress('deadline', DEADLINE_RUN_MAX_AGE):
+        return
+
+    cohorts = plan_deadline_sync()
+    if cohorts:
+        call_command('check_github_repos', cohort=[f"{course}:{semester}" for course, semester in cohorts])
+
+
 def start():
-    if os.environ.get('RUN_MAIN',None) == 'true':
+    # Worker processes spawned by a sync inherit RUN_MAIN from the server, but must not schedule jobs themselves.
+    if os.environ.get('RUN_MAIN',None) == 'true' and multiprocessing.parent_process() is None:
         scheduler = BackgroundScheduler()
 
+        # Every cohort is synced nightly.
         trigger=CronTrigger(hour="03",minute="05")
-
         scheduler.add_job(run_management_command,trigger)
+
+        # Cohorts close to a deadline are also synced every hour, within the API budget.
+        scheduler.add_job(run_deadline_sync, CronTrigger(minute="35"))
+
+        # Students signed up while GitHub was slow are verified in the background.
+        scheduler.add_job(call_command, CronTrigger(minute="*/10"), args=['verify_github_accounts'])
+
         scheduler.start()
         print('Scheduler started')
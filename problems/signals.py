@@ -0,0 +1,118 @@
+"""
+Signal handlers keeping `StudentWeekProgress` and the cached reports current when their inputs change one
+row at a time.
+
+Bulk writes (`bulk_create`, `bulk_update`, `QuerySet.update`) send no signals; code using them, like
+`SyncBatch.commit`, refreshes the affected rows itself through `problems.progress`.
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from faculty.models import LastDateOfWeek
+from problems.models import Problem, ProblemCompletion, WeekCommit
+from problems.progress import refresh_cohort, refresh_progress
+from problems.report_cache import bump_versions
+from students.models import Student
+
+
+def deleted_directly(origin, model):
+    """
+    Tells whether a deletion started from `model` itself rather than cascading from another model.
+    When a student or a problem is deleted, the rows removed along with it must not be recomputed.
+    """
+    return isinstance(origin, model) or getattr(origin, 'model', None) is model
+
+
+def cohort_moved(instance):
+    """
+    Returns the cohort a problem, deadline or student belonged to before it was saved into another one,
+    as recorded by `remember_previous_cohort`, or None if its cohort did not change.
+    """
+    previous = getattr(instance, '_previous_cohort', None)
+    if previous and previous != (instance.course, str(instance.semester)):
+        return previous
+    return None
+
+
+@receiver(pre_save, sender=Problem)
+@receiver(pre_save, sender=LastDateOfWeek)
+@receiver(pre_save, sender=Student)
+def remember_previous_cohort(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Records the course and semester an existing row had before the save, so that the cohort it leaves is
+    refreshed as well as the one it joins.
+    """
+    instance._previous_cohort = None
+    if raw or instance.pk is None or (update_fields is not None and not {'course', 'semester'} & set(update_fields)):
+        return
+    previous = sender.objects.filter(pk=instance.pk).values_list('course', 'semester').first()
+    if previous:
+        instance._previous_cohort = (previous[0], str(previous[1]))
+
+
+@receiver(post_save, sender=ProblemCompletion)
+@receiver(post_save, sender=WeekCommit)
+def refresh_student_progress(sender, instance, raw=False, **kwargs):
+    """
+    Recomputes the progress of the student whose completion or commit was saved, e.g. by instructor feedback.
+    """
+    if not raw:
+        refresh_progress([instance.student])
+
+
+@receiver(post_delete, sender=ProblemCompletion)
+@receiver(post_delete, sender=WeekCommit)
+def refresh_student_progress_on_delete(sender, instance, origin=None, **kwargs):
+    """
+    Recomputes the progress of the student whose completion or commit was deleted.
+    """
+    if deleted_directly(origin, sender):
+        refresh_progress([instance.student])
+
+
+@receiver(post_save, sender=Problem)
+@receiver(post_save, sender=LastDateOfWeek)
+def refresh_cohort_progress(sender, instance, raw=False, **kwargs):
+    """
+    Recomputes the progress of a whole cohort when one of its problems or deadlines is saved, and that of
+    the cohort it was moved from.
+    """
+    if not raw:
+        refresh_cohort(instance.course, instance.semester)
+        previous = cohort_moved(instance)
+        if previous:
+            refresh_cohort(*previous)
+
+
+@receiver(post_delete, sender=Problem)
+@receiver(post_delete, sender=LastDateOfWeek)
+def refresh_cohort_progress_on_delete(sender, instance, origin=None, **kwargs):
+    """
+    Recomputes the progress of a whole cohort when one of its problems or deadlines is deleted.
+    """
+    if deleted_directly(origin, sender):
+        refresh_cohort(instance.course, instance.semester)
+
+
+@receiver(post_save, sender=Student)
+def refresh_new_student_progress(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """
+    Creates the progress rows of a new student, and recomputes them when the student changes cohort, in
+    which case the reports of the cohort left are invalidated too. Saves touching other fields only (such as
+    `last_login`) are ignored.
+    """
+    if raw:
+        return
+    if created or update_fields is None or {'course', 'semester'} & set(update_fields):
+        refresh_progress([instance])
+        previous = cohort_moved(instance)
+        if previous:
+            bump_versions([previous])
+
+
+@receiver(post_delete, sender=Student)
+def invalidate_deleted_student_reports(sender, instance, **kwargs):
+    """
+    Invalidates the cached reports of a deleted student's cohort; their progress rows went with them.
+    """
+    bump_versions([(instance.course, instance.semester)])
@@ -0,0 +1,709 @@
+"""
+Shared logic for syncing student GitHub repositories into `ProblemCompletion` and `WeekCommit`.
+
+A sync is split in three phases:
+- A `SyncBatch` loads what the previous sync recorded for a group of students (HEAD hashes, week
+  folder trees, completion rows) with one query per table.
+- `fetch_snapshot` talks to GitHub only. It first asks for the repository's HEAD hash and stops there if
+  nothing moved since the last sync. Otherwise it pulls the whole file manifest with a single recursive
+  Git Trees call and fetches the commit history of the week folders whose tree changed. It never
+  touches the database, so it can run on worker threads. With `GITHUB_SYNC_BACKEND = 'mirror'`,
+  `problems.mirror.GitMirror.fetch_snapshot` reads the same snapshot from a local bare clone instead.
+- `SyncBatch.add` compares fetched snapshots with the stored rows, and `SyncBatch.commit` writes the
+  differences with bulk statements inside one transaction.
+
+Both the nightly `check_github_repos` command and the faculty-triggered `update_student_data`
+use these functions; the nightly sync runs them one cohort at a time through `sync_shard`, which
+checkpoints its progress. The push webhook skips the fetch phase: `apply_push` derives the changes from the
+event payload alone.
+"""
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from problems.github import API_ROOT, GitHubClient, ResponseCache, TokenPool, raw_url
+from problems.mirror import GitMirror, MirrorError
+from problems.models import (Problem, ProblemCompletion, RepositorySyncState, SyncCheckpoint, SyncStudentResult,
+                             WeekCommit)
+from problems.priority import order_shards, prioritize
+from problems.progress import refresh_progress
+from students.models import Student
+
+
+# Extensions recognised as a solution file and as an output image.
+FILE_EXTENSIONS = ['.cpp', '.java', '.py', '.c', '.js', '.rb', '.go', '.swift']
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png']
+
+
+def group_problems_by_week(problems):
+    """
+    Groups an iterable of problems into a dictionary keyed by week number.
+
+    :param problems: Iterable of `Problem` objects.
+    :return: Dictionary mapping each week number to the list of its problems.
+    """
+    problems_by_week = {}
+    for problem in problems:
+        problems_by_week.setdefault(problem.week, []).append(problem)
+    return problems_by_week
+
+
+def problem_signature(problems_by_week):
+    """
+    Returns a fingerprint of a cohort's problem set. It changes whenever a problem is added, removed or
+    renumbered, which forces a full sync of repositories whose HEAD did not move.
+
+    :param problems_by_week: Dictionary mapping week numbers to lists of problems.
+    """
+    keys = sorted((problem.id, problem.week, problem.problemNumber)
+                  for problems in problems_by_week.values() for problem in problems)
+    return hashlib.sha256(repr(keys).encode()).hexdigest()
+
+
+def fetch_head_sha(client, owner, repo_name):
+    """
+    Fetches the hash of the latest commit on the repository's default branch. The response body is the
+    bare hash, which makes this the cheapest way to tell whether a repository changed.
+
+    :return: The commit hash, or None if the repository does not exist or is empty.
+    """
+    response = client.get(f"{API_ROOT}/repos/{owner}/{repo_name}/commits/HEAD",
+                          headers={'Accept': 'application/vnd.github.sha'})
+    if response.status_code in (404, 409, 422):  # 409 and 422 are returned for an empty repository.
+        return None
+    response.raise_for_status()
+    return response.text.strip()
+
+
+def manifest_from_tree(owner, repo_name, entries):
+    """
+    Builds the week folder manifest of a repository from a recursive Git Trees listing.
+
+    :param owner: GitHub username owning the repository.
+    :param repo_name: The GitHub repository name.
+    :param entries: The `tree` list of a `git/trees/<sha>?recursive=1` response.
+    :return: Dictionary mapping week folder names (e.g. "Week3") to a dictionary holding the folder's
+             `tree_sha` and the `files` directly inside it (each with `name` and `download_url`).
+    """
+    week_dirs = {}
+    for entry in entries:
+        parts = entry['path'].split('/')
+        if not parts[0].startswith('Week'):
+            continue
+
+        if len(parts) == 1 and entry['type'] == 'tree':
+            week_dirs.setdefault(parts[0], {'files': []})['tree_sha'] = entry['sha']
+        elif len(parts) == 2 and entry['type'] == 'blob':
+            week_dirs.setdefault(parts[0], {'files': []})['files'].append({
+                'name': parts[1],
+                'download_url': raw_url(owner, repo_name, entry['path']),
+            })
+    return week_dirs
+
+
+def fetch_week_dirs_from_contents(client, owner, repo_name):
+    """
+    Lists the week folders of a repository through the Contents API.
+
+    Used as a fallback when GitHub truncates the recursive tree listing of a very large repository.
+    The folder contents are fetched later, one call per week that is actually needed.
+
+    :return: Dictionary mapping week folder names to a dictionary holding `tree_sha` and `url`.
+    """
+    response = client.get(f"{API_ROOT}/repos/{owner}/{repo_name}/contents/")
+    response.raise_for_status()
+    return {content['name']: {'tree_sha': content['sha'], 'url': content['url']}
+            for content in response.json()
+            if content['type'] == 'dir' and content['name'].startswith('Week')}
+
+
+def fetch_week_commits(client, owner, repo_name, week_dir_name):
+    """
+    Fetches the latest commit that touched a week folder.
+
+    :return: The commit list returned by GitHub (at most one entry), or None if the request failed.
+    """
+    url = f"{API_ROOT}/repos/{owner}/{repo_name}/commits?path={week_dir_name}&per_page=1"
+    try:
+        response = client.get(url)
+        response.raise_for_status()
+        return response.json()
+    except requests.exceptions.RequestException:
+        return None
+
+
+def fetch_snapshot(client, student, week_numbers, sync_state):
+    """
+    Fetches a snapshot of a student's repository with as few API calls as possible.
+
+    The repository's HEAD hash is fetched first; if it matches the one recorded at the last complete sync,
+    nothing else is requested. Otherwise the whole file manifest comes from one
+    `git/trees/<sha>?recursive=1` call. The commit history of a week folder is only requested when the
+    folder's tree sha differs from the one recorded at the last sync, since an unchanged tree means its
+    last commit is unchanged too.
+
+    This function performs no database access and is safe to call from a worker thread.
+
+    :param client: The `GitHubClient` used to perform the requests.
+    :param student: Student object.
+    :param week_numbers: Week numbers that have problems for the student's cohort.
+    :param sync_state: The dictionary returned by `SyncBatch.sync_state` for the student.
+    :return: None if the repository does not exist or is empty. Otherwise a dictionary with the `head_sha`
+             and either `unchanged` set to True, or a `weeks` entry mapping week numbers to their `files`,
+             `tree_sha` and, when fetched, `commits`.
+    :raises requests.exceptions.RequestException: If the manifest could not be fetched.
+    """
+    owner, repo_name = student.username, student.repo_name
+    tree_shas = sync_state['tree_shas']
+
+    head_sha = fetch_head_sha(client, owner, repo_name)
+    if head_sha is None:
+        return None
+    if head_sha == sync_state['head_sha']:
+        return {'head_sha': head_sha, 'unchanged': True}
+
+    response = client.get(f"{API_ROOT}/repos/{owner}/{repo_name}/git/trees/{head_sha}?recursive=1")
+    response.raise_for_status()
+    tree = response.json()
+
+    if tree.get('truncated'):
+        week_dirs = fetch_week_dirs_from_contents(client, owner, repo_name)
+    else:
+        week_dirs = manifest_from_tree(owner, repo_name, tree['tree'])
+
+    weeks = {}
+    for week_number in week_numbers:
+        week_dir_name = f"Week{week_number}"
+        if week_dir_name not in week_dirs:
+            continue
+
+        week_dir = week_dirs[week_dir_name]
+        if 'url' in week_dir:
+            week_response = client.get(week_dir['url'])
+            week_response.raise_for_status()
+            week_dir['files'] = week_response.json()
+
+        week = {'files': week_dir['files'], 'tree_sha': week_dir.get('tree_sha')}
+        if week['tree_sha'] is None or tree_shas.get(week_number) != week['tree_sha']:
+            week['commits'] = fetch_week_commits(client, owner, repo_name, week_dir_name)
+        weeks[week_number] = week
+
+    return {'head_sha': head_sha, 'weeks': weeks}
+
+
+def problem_status(problem, week_contents):
+    """
+    Checks if a student's solution or output image for a problem is present in their week directory.
+
+    :param problem: Problem object representing the specific problem to check.
+    :param week_contents: The files of the repository's week directory, each with `name` and `download_url`.
+    :return: Tuple of the completion flag, the solution URL and the output image URL.
+    """
+    formatted_problem_number = problem.problemNumber.replace(" ", "")
+    files = {file['name']: file['download_url'] for file in week_contents}
+
+    problem_completed = False
+    solution_url = None
+    output_image_url = None
+
+    # Check if the solution file exists in the repository.
+    for extension in FILE_EXTENSIONS:
+        problem_file_name = f"{formatted_problem_number}{extension}"
+        if problem_file_name in files:
+            problem_completed = True
+            solution_url = files[problem_file_name]
+
+    # Check if the output image exists in the repository.
+    for extension in IMAGE_EXTENSIONS:
+        image_file_name = f"{formatted_problem_number}{extension}"
+        if image_file_name in files:
+            output_image_url = files[image_file_name]
+
+    return problem_completed, solution_url, output_image_url
+
+
+def last_commit_of(commits):
+    """
+    Returns the time and hash of the newest commit in a list fetched by `fetch_week_commits`.
+    """
+    last_commit = commits[0]
+    return parse_datetime(last_commit['commit']['committer']['date']), last_commit['sha']
+
+
+class SyncBatch:
+    """
+    Collects the database changes of a batch of repository snapshots and writes them in one go.
+
+    The existing `ProblemCompletion`, `WeekCommit` and `RepositorySyncState` rows of every student in the
+    batch are loaded with one query per table when the batch is created. `add` compares each snapshot with
+    those rows in memory, and `commit` applies the differences with `bulk_create` / `bulk_update` inside
+    a single transaction. On SQLite this replaces thousands of autocommitted writes (and fsyncs) with a
+    handful of statements, and keeps the write lock short for the web requests running next to the sync.
+    """
+
+    def __init__(self, students):
+        """
+        :param students: The students whose snapshots will be added to the batch.
+        """
+        student_ids = [student.pk for student in students]
+        self.students = {student.pk: student for student in students}
+
+        self.completions = {(completion.student_id, completion.problem_id): completion
+                            for completion in ProblemCompletion.objects.filter(student_id__in=student_ids)}
+        self.week_commits = {(week_commit.student_id, week_commit.week_number): week_commit
+                             for week_commit in WeekCommit.objects.filter(student_id__in=student_ids)}
+        self.states = {state.student_id: state
+                       for state in RepositorySyncState.objects.filter(student_id__in=student_ids)}
+
+        self._weeks_by_student = {}
+        for week_commit in self.week_commits.values():
+            self._weeks_by_student.setdefault(week_commit.student_id, []).append(week_commit)
+
+        self._created = {ProblemCompletion: [], WeekCommit: [], RepositorySyncState: []}
+        self._updated = {ProblemCompletion: {}, WeekCommit: {}, RepositorySyncState: {}}
+        self.rows_changed = 0
+        self.student_rows = {}  # Completion and commit rows changed per student id, for telemetry.
+
+    def sync_state(self, student, problems_by_week):
+        """
+        Returns what the previous sync recorded for a student's repository.
+
+        :param student: Student object, which must be part of the batch.
+        :param problems_by_week: Dictionary mapping week numbers to the problems of the student's cohort.
+        :return: Dictionary with `head_sha`, the HEAD hash of the last complete sync (None when the repository
+                 must be synced in full), and `tree_shas`, mapping week numbers to the recorded folder tree shas.
+        """
+        state = self.states.get(student.pk)
+        head_sha = None
+        if state and state.problem_signature == problem_signature(problems_by_week):
+            head_sha = state.head_sha
+
+        tree_shas = {week_commit.week_number: week_commit.tree_sha
+                     for week_commit in self._weeks_by_student.get(student.pk, []) if week_commit.tree_sha}
+        return {'head_sha': head_sha, 'tree_shas': tree_shas}
+
+    def _set(self, instance, **values):
+        """
+        Assigns the given field values to an existing row and queues it for `bulk_update` if any changed.
+
+        :return: True if the row was not already queued and now has to be written.
+        """
+        changed = [field for field, value in values.items() if getattr(instance, field) != value]
+        for field in changed:
+            setattr(instance, field, values[field])
+        if not changed or instance.pk is None:  # New rows are already queued for `bulk_create`.
+            return False
+        queued = id(instance) in self._updated[type(instance)]
+        fields = self._updated[type(instance)].setdefault(id(instance), (instance, set()))[1]
+        fields.update(changed)
+        return not queued
+
+    def _count_row(self, student):
+        self.student_rows[student.pk] = self.student_rows.get(student.pk, 0) + 1
+
+    def _set_completion(self, student, problem, **values):
+        """
+        Queues the creation or update of a student's `ProblemCompletion` row for a problem.
+        """
+        completion = self.completions.get((student.pk, problem.pk))
+        if completion is None:
+            completion = ProblemCompletion(student=student, problem=problem, **values)
+            self.completions[(student.pk, problem.pk)] = completion
+            self._created[ProblemCompletion].append(completion)
+            self._count_row(student)
+        elif self._set(completion, **values):
+            self._count_row(student)
+
+    def _set_week_commit(self, student, week_number, **values):
+        """
+        Queues the creation or update of a student's `WeekCommit` row for a week.
+        """
+        week_commit = self.week_commits.get((student.pk, week_number))
+        if week_commit is None:
+            week_commit = WeekCommit(student=student, week_number=week_number, **values)
+            self.week_commits[(student.pk, week_number)] = week_commit
+            self._created[WeekCommit].append(week_commit)
+            self._count_row(student)
+        elif self._set(week_commit, **values):
+            self._count_row(student)
+
+    def add(self, student, problems_by_week, snapshot):
+        """
+        Compares a snapshot fetched by `fetch_snapshot` with the student's stored rows and queues the
+        differences. Nothing is written until `commit` is called.
+
+        The HEAD hash is only recorded when every week's commit lookup succeeded, so a partially failed
+        sync is retried in full the next night.
+
+        :param student: Student object, which must be part of the batch.
+        :param problems_by_week: Dictionary mapping week numbers to the problems of the student's cohort.
+        :param snapshot: The value returned by `fetch_snapshot` for this student.
+        """
+        if snapshot is None:
+            return
+
+        now = timezone.now()
+        state = self.states.get(student.pk)
+        if snapshot.get('unchanged'):
+            if state:
+                self._set(state, last_checked_at=now, last_synced_at=now)
+            return
+
+        complete = True
+        for week_number, week in snapshot['weeks'].items():
+            for problem in problems_by_week[week_number]:
+                is_completed, solution_url, output_image_url = problem_status(problem, week['files'])
+                self._set_completion(student, problem, is_completed=is_completed, solution_url=solution_url,
+                                     output_image_url=output_image_url)
+
+            if 'commits' not in week:
+                continue
+            if week['commits'] is None:
+                complete = False
+                continue
+            if not week['commits']:
+                continue
+
+            last_commit_time, last_commit_hash = last_commit_of(week['commits'])
+            self._set_week_commit(student, week_number, last_commit_time=last_commit_time,
+                                  last_commit_hash=last_commit_hash, tree_sha=week['tree_sha'])
+
+        values = {
+            'head_sha': snapshot['head_sha'] if complete else None,
+            'problem_signature': problem_signature(problems_by_week),
+            'last_checked_at': now,
+            'last_synced_at': now,
+        }
+        if state is None:
+            state = RepositorySyncState(student=student, **values)
+            self.states[student.pk] = state
+            self._created[RepositorySyncState].append(state)
+        else:
+            self._set(state, **values)
+
+    def add_push(self, student, problems_by_week, changes):
+        """
+        Queues the changes described by a push event, as summarised by `push_changes`, without contacting
+        GitHub.
+
+        Only the problems whose files were touched by the push are updated: an added or modified solution
+        or output image marks the problem with the file's URL, and removing the file a completion points to
+        clears it. The week folders' tree shas are forgotten, so the next full sync re-reads the commit
+        history of the pushed weeks and reconciles anything a push payload cannot tell (for instance
+        another solution file that was already present when the recorded one was removed).
+
+        :param student: Student object, which must be part of the batch.
+        :param problems_by_week: Dictionary mapping week numbers to the problems of the student's cohort.
+        :param changes: The value returned by `push_changes` for the event.
+        """
+        for week_number, week in changes.items():
+            for problem in problems_by_week.get(week_number, []):
+                formatted_problem_number = problem.problemNumber.replace(" ", "")
+                completion = self.completions.get((student.pk, problem.pk))
+                values = {}
+
+                for extensions, url_field in ((FILE_EXTENSIONS, 'solution_url'), (IMAGE_EXTENSIONS, 'output_image_url')):
+                    current_url = getattr(completion, url_field, None)
+                    # Later extensions win, as in `problem_status`.
+                    for extension in extensions:
+                        change = week['files'].get(f"{formatted_problem_number}{extension}")
+                        if change is None:
+                            continue
+                        present, url = change
+                        if present:
+                            values[url_field] = url
+                        elif url == current_url and url_field not in values:
+                            values[url_field] = None
+
+                if not values:
+                    continue
+                if 'solution_url' in values:
+                    values['is_completed'] = values['solution_url'] is not None
+                self._set_completion(student, problem, **values)
+
+            if week['commit']:
+                last_commit_time, last_commit_hash = week['commit']
+                self._set_week_commit(student, week_number, last_commit_time=last_commit_time,
+                                      last_commit_hash=last_commit_hash, tree_sha=None)
+
+    def commit(self):
+        """
+        Writes every queued change inside one transaction, together with the `StudentWeekProgress` rows of
+        the students whose completions or commits changed.
+
+        :return: The number of `ProblemCompletion` and `WeekCommit` rows created or updated. Sync state
+                 bookkeeping is not counted.
+        """
+        touched = {instance.student_id for model in (ProblemCompletion, WeekCommit)
+                   for instance in self._created[model] + [instance for instance, _ in self._updated[model].values()]}
+        rows_changed = 0
+        with transaction.atomic():
+            for model, instances in self._created.items():
+                if instances:
+                    model.objects.bulk_create(instances)
+                    if model is not RepositorySyncState:
+                        rows_changed += len(instances)
+
+            for model, updates in self._updated.items():
+                # Rows are grouped by the set of changed fields so each `bulk_update` only touches those columns.
+                by_fields = {}
+                for instance, fields in updates.values():
+                    by_fields.setdefault(tuple(sorted(fields)), []).append(instance)
+                for fields, instances in by_fields.items():
+                    model.objects.bulk_update(instances, fields, batch_size=500)
+                    if model is not RepositorySyncState:
+                        rows_changed += len(instances)
+
+            refresh_progress([self.students[student_id] for student_id in touched])
+
+        self._created = {model: [] for model in self._created}
+        self._updated = {model: {} for model in self._updated}
+        self.rows_changed += rows_changed
+        return rows_changed
+
+
+def push_changes(payload):
+    """
+    Summarises a GitHub `push` event payload per week folder, replaying its commits in order. Commits without
+    a hash or a readable `timestamp` are skipped rather than failing the delivery.
+
+    The payload carries no committer date, which the full sync records (see `last_commit_of`), so a week's
+    commit time is the pushed commit's `timestamp` until the next sync re-reads the week's history.
+
+    :param payload: The decoded JSON body of the webhook delivery.
+    :return: Dictionary mapping week numbers to a dictionary with `files`, mapping each touched file name to
+             a tuple of whether it exists after the push and its raw download URL, and `commit`, the time and
+             hash of the last commit touching the folder.
+    """
+    owner = payload['repository']['owner'].get('login') or payload['repository']['owner'].get('name')
+    repo_name = payload['repository']['name']
+
+    weeks = {}
+    for commit in payload.get('commits') or []:
+        try:
+            commit_time = parse_datetime(commit['timestamp'])
+        except (KeyError, TypeError, ValueError):
+            commit_time = None
+        if commit_time is None or not isinstance(commit.get('id'), str):
+            continue
+
+        touched = []
+        for key, present in (('added', True), ('modified', True), ('removed', False)):
+            if isinstance(commit.get(key), list):
+                touched += [(path, present) for path in commit[key] if isinstance(path, str)]
+
+        for path, present in touched:
+            parts = path.split('/')
+            if not parts[0].startswith('Week'):
+                continue
+            try:
+                week_number = int(parts[0][len('Week'):])
+            except ValueError:
+                continue
+
+            week = weeks.setdefault(week_number, {'files': {}, 'commit': None})
+            week['commit'] = (commit_time, commit['id'])
+            if len(parts) == 2:
+                week['files'][parts[1]] = (present, raw_url(owner, repo_name, path))
+    return weeks
+
+
+def apply_snapshot(student, problems_by_week, snapshot):
+    """
+    Writes a single snapshot fetched by `fetch_snapshot` to the database. Callers syncing many students
+    should use a `SyncBatch` directly.
+
+    :return: The number of rows changed.
+    """
+    batch = SyncBatch([student])
+    batch.add(student, problems_by_week, snapshot)
+    return batch.commit()
+
+
+def apply_push(student, problems_by_week, payload):
+    """
+    Writes the changes of a GitHub `push` event to the database without any call to GitHub.
+
+    :param student: The student owning the pushed repository.
+    :param problems_by_week: Dictionary mapping week numbers to the problems of the student's cohort.
+    :param payload: The decoded JSON body of the webhook delivery.
+    :return: The number of rows changed.
+    """
+    batch = SyncBatch([student])
+    batch.add_push(student, problems_by_week, push_changes(payload))
+    return batch.commit()
+
+
+def snapshot_source(client):
+    """
+    Returns how snapshots are fetched with the configured `GITHUB_SYNC_BACKEND`.
+
+    :param client: The `GitHubClient` used by the 'api' backend.
+    :return: Tuple of a function taking (student, week_numbers, sync_state) and returning a snapshot, and
+             the `RequestStats` its network calls are recorded in.
+    """
+    if settings.GITHUB_SYNC_BACKEND == 'mirror':
+        mirror = GitMirror.from_settings()
+        return mirror.fetch_snapshot, mirror.stats
+    return partial(fetch_snapshot, client), client.stats
+
+
+def fetch_with_telemetry(source, student, problems_by_week, sync_state):
+    """
+    Fetches a student's snapshot and measures what it cost. Meant to run on a worker thread.
+
+    :param source: The value returned by `snapshot_source`.
+    :return: Tuple of the snapshot (None on failure), the error message (None on success) and a dictionary
+             with the `duration`, `http_calls`, `bytes` and `cache_hits` of the student's requests.
+    """
+    fetch, stats = source
+    started = time.monotonic()
+    with stats.tally() as counters:
+        try:
+            snapshot, error = fetch(student, problems_by_week, sync_state), None
+        except (requests.exceptions.RequestException, MirrorError) as e:
+            snapshot, error = None, str(e)
+    return snapshot, error, dict(counters, duration=time.monotonic() - started)
+
+
+def record_student_results(run_id, writer, results):
+    """
+    Stores the `SyncStudentResult` rows of a committed batch.
+
+    :param run_id: Id of the `SyncRun` the batch belongs to, or None to skip recording.
+    :param writer: The committed `SyncBatch`, which knows how many rows changed per student.
+    :param results: List of (student, snapshot, error, cost) tuples as returned by `fetch_with_telemetry`.
+    """
+    if run_id is None:
+        return
+    SyncStudentResult.objects.bulk_create([
+        SyncStudentResult(run_id=run_id, student=student, error=error,
+                          unchanged=bool(snapshot and snapshot.get('unchanged')),
+                          rows_changed=writer.student_rows.get(student.pk, 0), **cost)
+        for student, snapshot, error, cost in results
+    ])
+
+
+def list_shards():
+    """
+    Returns the shards of the nightly sync: every (course, semester) pair that has students, the cohorts with
+    the closest deadline first and the others in a stable order.
+    """
+    return order_shards(list(
+        Student.objects.filter(is_superuser=False, is_staff=False)
+        .values_list('course', 'semester').distinct().order_by('course', 'semester')
+    ))
+
+
+def sync_shard(course, semester, resume=False, concurrency=1, rate=None, batch_size=150, run_id=None,
+               record_checkpoint=True):
+    """
+    Syncs the repositories of one cohort, moving the shard's `SyncCheckpoint` forward after every batch.
+
+    Students are drawn from a priority queue (see `problems.priority.prioritize`), so if the run is cut short
+    the students with recent pushes, stale data or earlier failures have been synced first. Each batch is
+    fetched by `concurrency` threads and written by a `SyncBatch` in one transaction, after which the
+    checkpoint records the progress. When `resume` is True and the checkpoint was written by the run being
+    resumed (`run_id`), a shard that already finished in that run is skipped and an unfinished one skips the
+    students already checked since it started; otherwise, including for a checkpoint left by an earlier run,
+    the shard starts from its highest-priority student. Runs covering only some cohorts (the deadline syncs)
+    pass `record_checkpoint=False`: their progress is kept in memory and the nightly checkpoints are left
+    untouched.
+
+    The function sets up its own GitHub client and token pool, so it can run in a separate worker process.
+
+    :param course: The course of the shard.
+    :param semester: The semester of the shard.
+    :param resume: Whether `run_id` is an interrupted run being continued.
+    :param concurrency: Number of repositories fetched in parallel.
+    :param rate: Requests per second allowed for this shard's token pool. Defaults to the configured rate.
+    :param batch_size: Number of students written per transaction.
+    :param run_id: Id of the `SyncRun` the per-student telemetry is recorded under, if any.
+    :param record_checkpoint: Whether to save the shard's progress to its `SyncCheckpoint`.
+    :return: Dictionary summarising the shard: `shard`, `students`, `unchanged`, `rows_changed`, `errors`
+             (one message per failed student), `elapsed`, `resumed_from`, `skipped`, the raw request
+             `latencies`, the `bytes` received, the `cache_hits`/`cache_misses` counters, the per-endpoint
+             counters in `endpoints` and the token pool `rate_limits`.
+    """
+    started = time.monotonic()
+    if record_checkpoint:
+        checkpoint, _ = SyncCheckpoint.objects.get_or_create(course=course, semester=str(semester))
+    else:
+        checkpoint = SyncCheckpoint(course=course, semester=str(semester))
+    summary = {'shard': f"{course}-{semester}", 'students': 0, 'unchanged': 0, 'rows_changed': 0, 'errors': [],
+               'elapsed': 0.0, 'resumed_from': None, 'skipped': False, 'latencies': [],
+               'bytes': 0, 'cache_hits': 0, 'cache_misses': 0, 'endpoints': {}, 'rate_limits': None}
+
+    # Only the checkpoint of the run being resumed counts; one left by an earlier run is started over
+    resumed_run = resume and run_id is not None and checkpoint.run_id == run_id and checkpoint.started_at
+    if resumed_run and checkpoint.finished_at:
+        summary['skipped'] = True
+        return summary
+    if resumed_run and checkpoint.students_done:
+        summary['resumed_from'] = checkpoint.students_done
+    else:
+        checkpoint.students_done = 0
+        checkpoint.elapsed = 0
+        checkpoint.started_at = timezone.now()
+    checkpoint.run_id = run_id
+    checkpoint.finished_at = None
+    if record_checkpoint:
+        checkpoint.save()
+
+    pool = TokenPool(settings.GITHUB_TOKENS, rate=rate)
+    client = GitHubClient(pool, cache=ResponseCache(settings.GITHUB_CACHE_DIR))
+    problems_by_week = group_problems_by_week(Problem.objects.filter(course=course, semester=semester))
+    students = Student.objects.filter(is_superuser=False, is_staff=False, course=course, semester=semester)
+    if summary['resumed_from']:
+        students = students.exclude(sync_state__last_checked_at__gte=checkpoint.started_at)
+    queue = prioritize(list(students), course, semester)
+
+    source = snapshot_source(client)
+
+    def fetch(job):
+        return fetch_with_telemetry(source, job[0], problems_by_week, job[1])
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        for start in range(0, len(queue), batch_size):
+            batch_started = time.monotonic()
+            batch = queue[start:start + batch_size]
+
+            writer = SyncBatch(batch)
+            jobs = [(student, writer.sync_state(student, problems_by_week)) for student in batch]
+            results = []
+            # `map` yields results in submission order, so writes follow the priority order.
+            for (student, _), (snapshot, error, cost) in zip(jobs, executor.map(fetch, jobs)):
+                results.append((student, snapshot, error, cost))
+                if error:
+                    summary['errors'].append(f"Error checking repository for {student.username}: {error}")
+                    continue
+                if snapshot is not None and snapshot.get('unchanged'):
+                    summary['unchanged'] += 1
+                writer.add(student, problems_by_week, snapshot)
+
+            summary['rows_changed'] += writer.commit()
+            summary['students'] += len(batch)
+            record_student_results(run_id, writer, results)
+
+            checkpoint.students_done += len(batch)
+            checkpoint.elapsed += time.monotonic() - batch_started
+            if record_checkpoint:
+                checkpoint.save(update_fields=['students_done', 'elapsed'])
+
+    checkpoint.finished_at = timezone.now()
+    if record_checkpoint:
+        checkpoint.save(update_fields=['finished_at'])
+
+    stats = source[1]
+    summary.update(elapsed=time.monotonic() - started, latencies=list(stats.latencies), bytes=stats.bytes,
+                   cache_hits=stats.cache_hits, cache_misses=stats.cache_misses,
+                   endpoints={endpoint: dict(counters) for endpoint, counters in stats.endpoints.items()},
+                   rate_limits=pool.summary())
+    return summary
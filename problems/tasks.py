@@ -167,6 +167,7 @@ import threading
 import time
 import queue
 import requests
+from .github import shared_client
 from .models import ProblemCompletion
 from .utils import analyze_code_with_ai
 
@@ -210,7 +211,7 @@ def process_problem_completion(problem_completion):
 
     try:
         print(f"Fetching code from: {code_url}")
-        code_response = requests.get(code_url)
+        code_response = shared_client().get(code_url)
         code_response.raise_for_status()
         code = code_response.text.strip()
 
@@ -1,3 +1,1004 @@
-from django.test import TestCase
+import copy
+import hashlib
+import hmac
+import io
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from faculty.models import LastDateOfWeek
+from problems import scheduler
+from problems.github import (API_ROOT, CircuitBreaker, GitHubClient, GitHubUnavailable, RequestStats, ResponseCache,
+                             TokenPool, TokensExhausted, endpoint_of, get_breaker, raw_url)
+from problems.management.commands import check_github_repos
+from problems.mirror import GitMirror
+from problems.models import (Problem, ProblemCompletion, RepositorySyncState, StudentWeekProgress, SyncCheckpoint,
+                             SyncRun, SyncStudentResult, WeekCommit)
+from problems.priority import order_shards, prioritize
+from problems.progress import refresh_cohort
+from problems.report_cache import cached_export, cached_report, data_version
+from problems.sync import SyncBatch, apply_push, fetch_snapshot, group_problems_by_week, sync_shard
+from students.models import Student
+
+# A push delivery recorded from GitHub, trimmed to the fields the webhook reads.
+PUSH_PAYLOAD = {
+    "ref": "refs/heads/main",
+    "before": "9049f1265b7d61be4a8904a9a27120d2064dab3b",
+    "after": "0d1a26e67d8f5eaf1f6ba5c57fc3c7d91ac0fd1c",
+    "created": False,
+    "deleted": False,
+    "forced": False,
+    "repository": {
+        "id": 186853002,
+        "name": "BCALab3",
+        "full_name": "octo-student/BCALab3",
+        "private": False,
+        "owner": {"name": "octo-student", "login": "octo-student", "id": 21031067, "type": "User"},
+        "default_branch": "main",
+        "master_branch": "main",
+    },
+    "pusher": {"name": "octo-student", "email": "octo-student@example.com"},
+    "commits": [
+        {
+            "id": "6113728f27ae82c7b1a177c8d03f9e96e0adf246",
+            "message": "Week 1 solutions",
+            "timestamp": "2024-10-01T12:00:00+05:30",
+            "added": ["Week1/P1.c", "Week1/P1.png"],
+            "removed": [],
+            "modified": ["README.md"],
+        },
+        {
+            "id": "0d1a26e67d8f5eaf1f6ba5c57fc3c7d91ac0fd1c",
+            "message": "Fix problem 2",
+            "timestamp": "2024-10-02T09:30:00+05:30",
+            "added": [],
+            "removed": [],
+            "modified": ["Week1/P2.py"],
+        },
+    ],
+    "head_commit": {
+        "id": "0d1a26e67d8f5eaf1f6ba5c57fc3c7d91ac0fd1c",
+        "timestamp": "2024-10-02T09:30:00+05:30",
+    },
+}
+
+# A later delivery removing the solution of problem 1.
+REMOVAL_PAYLOAD = dict(copy.deepcopy(PUSH_PAYLOAD), commits=[{
+    "id": "a10867b14bb761a232cd80139fbd4c0d33264240",
+    "message": "Remove problem 1",
+    "timestamp": "2024-10-03T10:00:00+05:30",
+    "added": [],
+    "removed": ["Week1/P1.c"],
+    "modified": [],
+}])
+
+WEBHOOK_SECRET = 'webhook-test-secret'
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'problems-tests'},
+    'reports': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'problems-tests-reports'},
+}
+
+
+def create_student(number, course='BCA', semester='3', **fields):
+    """
+    Creates a student of a cohort with unique enrollment and faculty numbers.
+    """
+    return Student.objects.create(username=f'student{number}', enrollment_number=f'GK{number:04}',
+                                  faculty_number=f'22{course}{number:03}', course=course, semester=semester, **fields)
+
+
+def github_response(status_code, content=b'', headers=None):
+    """
+    Builds a `requests` response as GitHub would send it.
+    """
+    response = requests.models.Response()
+    response.status_code = status_code
+    response._content = content
+    response.headers.update(headers or {})
+    return response
+
+
+class GitHubCacheDirMixin:
+    """
+    Points the GitHub response cache at a temporary directory and configures no tokens.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        settings_override = override_settings(GITHUB_CACHE_DIR=self.cache_dir.name, GITHUB_TOKENS=[])
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+class SyncShardResumeTests(GitHubCacheDirMixin, TestCase):
+    """
+    `sync_shard` only skips or continues a shard whose checkpoint was written by the run being resumed.
+    """
+
+    def test_shard_finished_in_resumed_run_is_skipped(self):
+        run = SyncRun.objects.create(kind='nightly')
+        sync_shard('MCA', '3', run_id=run.id)
+
+        summary = sync_shard('MCA', '3', resume=True, run_id=run.id)
+
+        self.assertTrue(summary['skipped'])
+
+    def test_shard_finished_in_earlier_run_is_synced_again(self):
+        earlier = SyncRun.objects.create(kind='nightly')
+        sync_shard('MCA', '3', run_id=earlier.id)
+        interrupted = SyncRun.objects.create(kind='nightly')
+
+        summary = sync_shard('MCA', '3', resume=True, run_id=interrupted.id)
+
+        self.assertFalse(summary['skipped'])
+        checkpoint = SyncCheckpoint.objects.get(course='MCA', semester='3')
+        self.assertEqual(checkpoint.run_id, interrupted.id)
+        self.assertIsNotNone(checkpoint.finished_at)
+
+
+class SyncWorkerPoolTests(TestCase):
+    """
+    The worker processes of a multi-process sync set Django up without starting a scheduler of their own.
+    """
+
+    def test_worker_started_from_the_server_starts_no_scheduler(self):
+        with mock.patch.dict(os.environ, {'RUN_MAIN': 'true'}), \
+                check_github_repos.Command().worker_pool(1) as executor:
+            threads = executor.submit(threading.active_count).result(timeout=60)
+
+        self.assertEqual(threads, 1)
+
+
+class SyncRunCoordinationTests(GitHubCacheDirMixin, TestCase):
+    """
+    Deadline syncs leave the nightly checkpoints alone, and the nightly resumes only its own run, once it has died.
+    """
+
+    def test_deadline_shard_writes_no_checkpoint(self):
+        run = SyncRun.objects.create(kind='deadline', course='MCA:3')
+
+        sync_shard('MCA', '3', run_id=run.id, record_checkpoint=False)
+
+        self.assertFalse(SyncCheckpoint.objects.exists())
+
+    def test_stray_checkpoint_does_not_resume_the_nightly(self):
+        SyncCheckpoint.objects.create(course='MCA', semester='3', started_at=timezone.now())
+        SyncRun.objects.create(kind='deadline', course='MCA:3')
+        output = io.StringIO()
+
+        call_command('check_github_repos', stdout=output)
+
+        self.assertNotIn('Resuming', output.getvalue())
+        self.assertEqual(SyncRun.objects.filter(kind='nightly').count(), 1)
+
+    def test_unfinished_nightly_run_is_resumed(self):
+        interrupted = SyncRun.objects.create(kind='nightly')
+        SyncRun.objects.filter(pk=interrupted.pk).update(started_at=timezone.now() - timedelta(hours=7))
+        output = io.StringIO()
+
+        call_command('check_github_repos', stdout=output)
+
+        self.assertIn(f'Resuming the interrupted sync run {interrupted.id}', output.getvalue())
+        interrupted.refresh_from_db()
+        self.assertIsNotNone(interrupted.finished_at)
+        self.assertEqual(SyncRun.objects.filter(kind='nightly').count(), 1)
+
+    def test_running_nightly_run_is_not_started_twice(self):
+        running = SyncRun.objects.create(kind='nightly')
+        output = io.StringIO()
+
+        call_command('check_github_repos', stdout=output)
+
+        self.assertIn('still in progress', output.getvalue())
+        self.assertEqual(list(SyncRun.objects.all()), [running])
+        running.refresh_from_db()
+        self.assertIsNone(running.finished_at)
+
+    def test_old_unfinished_nightly_run_is_started_over(self):
+        abandoned = SyncRun.objects.create(kind='nightly')
+        SyncRun.objects.filter(pk=abandoned.pk).update(started_at=timezone.now() - timedelta(days=3))
+        output = io.StringIO()
+
+        call_command('check_github_repos', stdout=output)
+
+        self.assertNotIn('Resuming', output.getvalue())
+        self.assertEqual(SyncRun.objects.filter(kind='nightly', finished_at__isnull=False).count(), 1)
+        abandoned.refresh_from_db()
+        self.assertIsNone(abandoned.finished_at)
+
+    def test_nightly_waits_for_a_running_deadline_sync(self):
+        deadline_run = SyncRun.objects.create(kind='deadline', course='MCA:3')
+
+        def finish_deadline_run(seconds):
+            SyncRun.objects.filter(pk=deadline_run.pk).update(finished_at=timezone.now())
+
+        with mock.patch.object(scheduler.time, 'sleep', side_effect=finish_deadline_run) as sleep, \
+                mock.patch.object(scheduler, 'call_command') as command:
+            scheduler.run_management_command()
+
+        sleep.assert_called_once()
+        command.assert_called_once_with('check_github_repos')
+
+    def test_deadline_sync_skipped_while_nightly_runs(self):
+        SyncRun.objects.create(kind='nightly')
+
+        with mock.patch.object(scheduler, 'call_command') as command:
+            scheduler.run_deadline_sync()
+
+        command.assert_not_called()
+
+
+@override_settings(GITHUB_WEBHOOK_SECRET=WEBHOOK_SECRET)
+class GitHubWebhookTests(TestCase):
+    """
+    Replays recorded push deliveries against `github_webhook` and `apply_push`; no call is made to GitHub.
+    """
+
+    def setUp(self):
+        self.student = Student.objects.create(username='octo-student', enrollment_number='GK0001',
+                                              faculty_number='22BCA001', course='BCA', semester='3')
+        self.problems = {
+            number: Problem.objects.create(course='BCA', semester=3, week=1, problemNumber=number,
+                                           description=f'Problem {number}')
+            for number in ('P1', 'P2')
+        }
+
+    def deliver(self, payload, event='push', signature=None):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        if signature is None:
+            signature = 'sha256=' + hmac.new(WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+        headers = {'HTTP_X_GITHUB_EVENT': event}
+        if signature:
+            headers['HTTP_X_HUB_SIGNATURE_256'] = signature
+        return self.client.post('/problems/webhooks/github/', body, content_type='application/json', **headers)
+
+    def test_bad_or_missing_signature_is_rejected(self):
+        self.assertEqual(self.deliver(PUSH_PAYLOAD, signature='sha256=' + '0' * 64).status_code, 403)
+        self.assertEqual(self.deliver(PUSH_PAYLOAD, signature='').status_code, 403)
+        self.assertFalse(ProblemCompletion.objects.exists())
+
+    def test_ping_is_acknowledged(self):
+        response = self.deliver({'zen': 'Keep it logically awesome.', 'hook_id': 1}, event='ping')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'success': 'pong'})
+
+    def test_push_to_other_branch_is_ignored(self):
+        response = self.deliver(dict(PUSH_PAYLOAD, ref='refs/heads/feature'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ignored', response.json())
+        self.assertFalse(WeekCommit.objects.exists())
+
+    def test_payload_without_repository_name_is_rejected(self):
+        payload = copy.deepcopy(PUSH_PAYLOAD)
+        del payload['repository']['name']
+
+        self.assertEqual(self.deliver(payload).status_code, 400)
+
+    def test_malformed_commits_are_skipped(self):
+        payload = copy.deepcopy(PUSH_PAYLOAD)
+        payload['commits'][1:1] = [
+            'not a commit',
+            {'id': 'b1d2cf3', 'message': 'No timestamp', 'added': ['Week2/P1.c']},
+            {'id': 'c4e5f60', 'timestamp': 'yesterday', 'added': ['Week2/P1.c']},
+            {'timestamp': '2024-10-03T10:00:00+05:30', 'added': ['Week2/P1.c']},
+            {'id': 'd7f8a90', 'timestamp': '2024-10-03T10:00:00+05:30', 'added': {'Week1/P2.c': True}},
+        ]
+
+        response = self.deliver(payload)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(WeekCommit.objects.values_list('week_number', 'last_commit_hash')),
+                         [(1, '0d1a26e67d8f5eaf1f6ba5c57fc3c7d91ac0fd1c')])
+
+    def test_push_marks_solutions_and_week_commit(self):
+        response = self.deliver(PUSH_PAYLOAD)
+
+        self.assertEqual(response.status_code, 200)
+        completion = ProblemCompletion.objects.get(student=self.student, problem=self.problems['P1'])
+        self.assertTrue(completion.is_completed)
+        self.assertTrue(completion.solution_url.endswith('/octo-student/BCALab3/HEAD/Week1/P1.c'))
+        self.assertTrue(completion.output_image_url.endswith('/Week1/P1.png'))
+        self.assertTrue(ProblemCompletion.objects.get(student=self.student, problem=self.problems['P2']).is_completed)
+
+        week_commit = WeekCommit.objects.get(student=self.student, week_number=1)
+        self.assertEqual(week_commit.last_commit_hash, '0d1a26e67d8f5eaf1f6ba5c57fc3c7d91ac0fd1c')
+        self.assertEqual(week_commit.last_commit_time.isoformat(), '2024-10-02T04:00:00+00:00')
+
+    def test_removed_solution_clears_completion(self):
+        problems_by_week = group_problems_by_week(Problem.objects.filter(course='BCA', semester=3))
+        apply_push(self.student, problems_by_week, PUSH_PAYLOAD)
+
+        apply_push(self.student, problems_by_week, REMOVAL_PAYLOAD)
+
+        completion = ProblemCompletion.objects.get(student=self.student, problem=self.problems['P1'])
+        self.assertFalse(completion.is_completed)
+        self.assertIsNone(completion.solution_url)
+        self.assertEqual(WeekCommit.objects.get(student=self.student, week_number=1).last_commit_hash,
+                         'a10867b14bb761a232cd80139fbd4c0d33264240')
+
+
+class LocalGitRemoteMixin:
+    """
+    Serves the repository of `octo-student/BCALab3` from a `git init` repository in a temporary folder, through a
+    `file://` URL, and points the mirrors at another temporary folder.
+    """
+
+    def setUp(self):
+        super().setUp()
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.remotes = os.path.join(folder.name, 'remotes')
+        self.source = os.path.join(self.remotes, 'octo-student', 'BCALab3')
+        os.makedirs(self.source)
+        self.git('init', '--quiet', '--initial-branch=main')
+
+        url = 'file://' + self.remotes + '/{owner}/{repo}'
+        settings_override = override_settings(GITHUB_MIRROR_DIR=os.path.join(folder.name, 'mirrors'),
+                                              GITHUB_MIRROR_URL=url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def git(self, *args):
+        env = dict(os.environ, GIT_AUTHOR_NAME='Octo', GIT_AUTHOR_EMAIL='octo@example.com',
+                   GIT_COMMITTER_NAME='Octo', GIT_COMMITTER_EMAIL='octo@example.com')
+        result = subprocess.run(['git', '-C', self.source] + list(args), capture_output=True, text=True,
+                                env=env, check=True)
+        return result.stdout.strip()
+
+    def commit(self, files, message):
+        for path, content in files.items():
+            os.makedirs(os.path.dirname(os.path.join(self.source, path)), exist_ok=True)
+            with open(os.path.join(self.source, path), 'w') as file:
+                file.write(content)
+        self.git('add', '-A')
+        self.git('commit', '--quiet', '-m', message)
+        return self.git('rev-parse', 'HEAD')
+
+
+class GitMirrorTests(LocalGitRemoteMixin, TestCase):
+    """
+    Syncs a mirror from a `git init` repository in a temporary folder, served through a `file://` URL.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.mirror = GitMirror.from_settings()
+        self.student = Student(username='octo-student', course='BCA', semester='3', repo_name='BCALab3')
+
+    def test_clone_then_incremental_fetch(self):
+        first = self.commit({'Week1/P1.c': 'int main() {}'}, 'Week 1')
+        self.assertEqual(self.mirror.update('octo-student', 'BCALab3'), first)
+        self.assertTrue(os.path.isdir(self.mirror.path('octo-student', 'BCALab3')))
+
+        second = self.commit({'Week2/P1.py': 'print(1)'}, 'Week 2')
+        self.assertEqual(self.mirror.update('octo-student', 'BCALab3'), second)
+
+        self.assertEqual(self.mirror.stats.endpoints['git clone']['count'], 1)
+        self.assertEqual(self.mirror.stats.endpoints['git fetch']['count'], 1)
+
+    def test_snapshot_reads_week_trees_and_last_commits(self):
+        week1 = self.commit({'Week1/P1.c': 'int main() {}', 'Week1/P1.png': 'png'}, 'Week 1')
+        head = self.commit({'Week2/P1.py': 'print(1)', 'README.md': 'labs'}, 'Week 2')
+
+        snapshot = self.mirror.fetch_snapshot(self.student, [1, 2, 3], {'head_sha': None, 'tree_shas': {}})
+
+        self.assertEqual(snapshot['head_sha'], head)
+        self.assertEqual(set(snapshot['weeks']), {1, 2})
+        week = snapshot['weeks'][1]
+        self.assertEqual(week['tree_sha'], self.git('rev-parse', 'HEAD:Week1'))
+        self.assertEqual(week['commits'][0]['sha'], week1)
+        self.assertEqual(sorted(file['name'] for file in week['files']), ['P1.c', 'P1.png'])
+        self.assertTrue(week['files'][0]['download_url'].startswith('https://raw.githubusercontent.com/'))
+        self.assertEqual(snapshot['weeks'][2]['commits'][0]['sha'], head)
+
+    def test_unchanged_head_short_circuits(self):
+        head = self.commit({'Week1/P1.c': 'int main() {}'}, 'Week 1')
+
+        snapshot = self.mirror.fetch_snapshot(self.student, [1], {'head_sha': head, 'tree_shas': {}})
+
+        self.assertEqual(snapshot, {'head_sha': head, 'unchanged': True})
+
+    def test_unchanged_week_tree_skips_the_commit_lookup(self):
+        self.commit({'Week1/P1.c': 'int main() {}'}, 'Week 1')
+        tree_sha = self.git('rev-parse', 'HEAD:Week1')
+        self.commit({'Week2/P1.py': 'print(1)'}, 'Week 2')
+
+        snapshot = self.mirror.fetch_snapshot(self.student, [1, 2], {'head_sha': 'old', 'tree_shas': {1: tree_sha}})
+
+        self.assertNotIn('commits', snapshot['weeks'][1])
+        self.assertIn('commits', snapshot['weeks'][2])
+
+    def test_missing_repository_returns_none(self):
+        self.student.username = 'nobody'
+
+        self.assertIsNone(self.mirror.fetch_snapshot(self.student, [1], {'head_sha': None, 'tree_shas': {}}))
+
+
+class TokenWaitTests(TestCase):
+    """
+    Web callers give up instead of waiting for a rate limit reset, and raw downloads never use a token.
+    """
+
+    def setUp(self):
+        self.pool = TokenPool(['token-1'], rate=10)
+        self.pool.update('token-1', {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': str(int(time.time()) + 3600)})
+        self.client = GitHubClient(self.pool, token_wait=0.5)
+        self.client.session = mock.Mock(get=mock.Mock(return_value=github_response(200, b'int main() {}')))
+
+    def test_acquire_gives_up_after_timeout(self):
+        with mock.patch('problems.github.time.sleep') as sleep, self.assertRaises(TokensExhausted):
+            self.pool.acquire(timeout=0.5)
+
+        sleep.assert_not_called()
+        self.assertEqual(self.pool.lowest_remaining(), 0)
+
+    def test_api_call_raises_when_tokens_are_exhausted(self):
+        with self.assertRaises(TokensExhausted):
+            self.client.get(f"{API_ROOT}/users/octo-student")
+
+        self.client.session.get.assert_not_called()
+
+    def test_raw_download_bypasses_the_token_pool(self):
+        fresh_pool = TokenPool(['token-2'], rate=10)
+        fresh_pool.update('token-2', {'X-RateLimit-Remaining': '10', 'X-RateLimit-Reset': str(int(time.time()) + 3600)})
+        self.client.pool = fresh_pool
+
+        response = self.client.get(raw_url('octo-student', 'BCALab3', 'Week1/P1.c'))
+
+        self.assertEqual(response.text, 'int main() {}')
+        self.assertNotIn('Authorization', self.client.session.get.call_args.kwargs['headers'])
+        self.assertEqual(fresh_pool.lowest_remaining(), 10)
+
+
+class ResponseCacheTests(GitHubCacheDirMixin, TestCase):
+    """
+    Cached responses round-trip through the disk and are pruned by age and total size, least recently used first.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.cache = ResponseCache(self.cache_dir.name)
+
+    def store(self, url, age):
+        self.cache.store(url, '"etag"', None, 'x' * 100)
+        modified = time.time() - age
+        os.utime(self.cache._path(url), (modified, modified))
+
+    def test_entry_round_trip(self):
+        self.cache.store(f"{API_ROOT}/users/octo-student", '"abc"', 'Tue, 01 Oct 2024 10:00:00 GMT', '{"id": 1}')
+
+        entry = self.cache.load(f"{API_ROOT}/users/octo-student")
+
+        self.assertEqual((entry['etag'], entry['body']), ('"abc"', '{"id": 1}'))
+        self.assertIsNone(self.cache.load(f"{API_ROOT}/users/nobody"))
+
+    def test_entries_are_kept_per_token(self):
+        url = f"{API_ROOT}/users/octo-student"
+        sent = []
+
+        def get(url, headers=None, **kwargs):
+            sent.append(headers.get('If-None-Match'))
+            return github_response(200, b'{"id": 1}', {'ETag': f'"{headers["Authorization"]}"'})
+
+        for token in ('token-a', 'token-b', 'token-a'):
+            client = GitHubClient(TokenPool([token], rate=100), cache=self.cache)
+            client.session = mock.Mock(get=mock.Mock(side_effect=get))
+            client.get(url)
+
+        self.assertEqual(sent, [None, None, '"token token-a"'])
+        self.assertIsNone(self.cache.load(url))
+
+    def test_prune_drops_entries_unused_for_max_age(self):
+        self.store('old', age=3600)
+        self.store('used', age=3600)
+        self.store('new', age=0)
+        self.cache.load('used')
+
+        deleted, _ = self.cache.prune(max_age=600)
+
+        self.assertEqual(deleted, 1)
+        self.assertIsNone(self.cache.load('old'))
+        self.assertIsNotNone(self.cache.load('used'))
+        self.assertIsNotNone(self.cache.load('new'))
+
+    def test_prune_keeps_most_recent_entries_within_max_bytes(self):
+        for age, url in enumerate(['newest', 'middle', 'oldest']):
+            self.store(url, age=age * 60)
+        size = os.path.getsize(self.cache._path('newest'))
+
+        self.cache.prune(max_bytes=2 * size)
+
+        self.assertIsNone(self.cache.load('oldest'))
+        self.assertIsNotNone(self.cache.load('middle'))
+        self.assertIsNotNone(self.cache.load('newest'))
+
+    def test_sync_prunes_the_cache(self):
+        self.store('old', age=7200)
+        output = io.StringIO()
+
+        with override_settings(GITHUB_CACHE_MAX_AGE=3600):
+            call_command('check_github_repos', stdout=output)
+
+        self.assertIsNone(self.cache.load('old'))
+        self.assertIn('Pruned 1 cached GitHub responses', output.getvalue())
+
+
+class StopWaiting(Exception):
+    """
+    Raised by a patched `time.sleep` to end a loop that would otherwise wait.
+    """
+
+
+class TokenPoolTests(TestCase):
+    """
+    The pool hands out the token with the most quota, paces requests and waits for the earliest reset.
+    """
+
+    def setUp(self):
+        self.reset = str(int(time.time()) + 3600)
+
+    def test_token_with_most_quota_is_used(self):
+        pool = TokenPool(['token-1', 'token-2'], rate=100)
+        pool.update('token-1', {'X-RateLimit-Remaining': '5', 'X-RateLimit-Reset': self.reset})
+        pool.update('token-2', {'X-RateLimit-Remaining': '50', 'X-RateLimit-Reset': self.reset})
+
+        self.assertEqual(pool.acquire(), 'token-2')
+        self.assertEqual(pool.summary()['tokens'][1]['remaining'], 49)
+
+    def test_exhausted_token_is_skipped(self):
+        pool = TokenPool(['token-1', 'token-2'], rate=100)
+        pool.update('token-1', {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': self.reset})
+        pool.update('token-2', {'X-RateLimit-Remaining': '1', 'X-RateLimit-Reset': self.reset})
+
+        self.assertEqual(pool.acquire(), 'token-2')
+
+    def test_out_of_order_responses_keep_the_lowest_count(self):
+        pool = TokenPool(['token-1'], rate=100)
+        pool.update('token-1', {'X-RateLimit-Remaining': '10', 'X-RateLimit-Reset': self.reset})
+        pool.update('token-1', {'X-RateLimit-Remaining': '20', 'X-RateLimit-Reset': self.reset})
+
+        self.assertEqual(pool.summary()['tokens'][0]['remaining'], 10)
+
+    def test_requests_are_paced_by_the_rate(self):
+        pool = TokenPool(['token-1'], rate=2, burst=1)
+        pool.acquire()
+
+        with mock.patch('problems.github.time.sleep', side_effect=StopWaiting) as sleep, \
+                self.assertRaises(StopWaiting):
+            pool.acquire()
+
+        self.assertAlmostEqual(sleep.call_args.args[0], 0.5, places=1)
+
+    def test_exhausted_pool_waits_for_the_earliest_reset(self):
+        pool = TokenPool(['token-1'], rate=100)
+        pool.update('token-1', {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': self.reset})
+
+        with mock.patch('problems.github.time.sleep', side_effect=StopWaiting) as sleep, \
+                self.assertRaises(StopWaiting):
+            pool.acquire()
+
+        self.assertGreater(sleep.call_args.args[0], 3500)
+
+
+class CircuitBreakerTests(TestCase):
+    """
+    A failing host is suspended after `threshold` failures, then probed with a single request.
+    """
+
+    def test_breaker_opens_probes_and_closes(self):
+        breaker = CircuitBreaker('api.github.com', threshold=2, cooldown=30)
+        breaker.record_failure()
+        breaker.check()
+        breaker.record_failure()
+        with self.assertRaises(GitHubUnavailable):
+            breaker.check()
+
+        with mock.patch('problems.github.time.monotonic', return_value=breaker.opened_at + 31):
+            breaker.check()
+            with self.assertRaises(GitHubUnavailable):
+                breaker.check()
+
+        breaker.record_success()
+        breaker.check()
+
+    def test_client_retries_server_errors(self):
+        client = GitHubClient(TokenPool([], rate=100))
+        client.session = mock.Mock(get=mock.Mock(side_effect=[github_response(502), github_response(200, b'{}')]))
+
+        with mock.patch('problems.github.time.sleep') as sleep:
+            response = client.get(f"{API_ROOT}/repos/octo-student/BCALab3")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(client.session.get.call_count, 2)
+        sleep.assert_called_once()
+        self.assertEqual(get_breaker(API_ROOT).failures, 0)
+
+
+def week_snapshot(owner, head_sha, files, commit_sha='c0ffee', tree_sha='tree1'):
+    """
+    Builds a snapshot, as returned by `fetch_snapshot`, of a repository with a single Week1 folder.
+    """
+    return {'head_sha': head_sha, 'weeks': {1: {
+        'files': [{'name': name, 'download_url': raw_url(owner, 'BCALab3', f"Week1/{name}")} for name in files],
+        'tree_sha': tree_sha,
+        'commits': [{'sha': commit_sha, 'commit': {'committer': {'date': '2024-10-01T10:00:00Z'}}}],
+    }}}
+
+
+class SyncBatchTests(TestCase):
+    """
+    `SyncBatch` writes only the differences, with a number of queries that does not grow with the batch.
+    """
+
+    def setUp(self):
+        self.problems = [Problem.objects.create(course='BCA', semester=3, week=1, problemNumber=f'P{number}',
+                                                description=f'Problem {number}') for number in (1, 2)]
+        self.problems_by_week = group_problems_by_week(self.problems)
+
+    def commit_batch(self, students, files=('P1.c',)):
+        batch = SyncBatch(students)
+        for student in students:
+            batch.add(student, self.problems_by_week, week_snapshot(student.username, 'head1', files))
+        with CaptureQueriesContext(connection) as queries:
+            rows_changed = batch.commit()
+        return rows_changed, len(queries)
+
+    def test_snapshot_is_written_and_progress_refreshed(self):
+        student = create_student(1)
+
+        rows_changed, _ = self.commit_batch([student])
+
+        self.assertEqual(rows_changed, 3)  # Two completions and one week commit
+        completion = ProblemCompletion.objects.get(student=student, problem=self.problems[0])
+        self.assertTrue(completion.is_completed)
+        self.assertFalse(ProblemCompletion.objects.get(student=student, problem=self.problems[1]).is_completed)
+        self.assertEqual(WeekCommit.objects.get(student=student, week_number=1).tree_sha, 'tree1')
+        self.assertEqual(RepositorySyncState.objects.get(student=student).head_sha, 'head1')
+        self.assertEqual(StudentWeekProgress.objects.get(student=student, week_number=1).problems_solved, 1)
+
+    def test_only_changed_rows_are_written(self):
+        student = create_student(1)
+        self.commit_batch([student])
+
+        self.assertEqual(self.commit_batch([student])[0], 0)
+        self.assertEqual(self.commit_batch([student], files=('P1.c', 'P2.py'))[0], 1)
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        _, few = self.commit_batch([create_student(number) for number in range(1, 3)])
+        _, many = self.commit_batch([create_student(number) for number in range(3, 13)])
+
+        self.assertEqual(few, many)
+
+    def test_new_problem_forgets_the_recorded_head(self):
+        student = create_student(1)
+        self.commit_batch([student])
+        self.assertEqual(SyncBatch([student]).sync_state(student, self.problems_by_week)['head_sha'], 'head1')
+
+        problems = self.problems + [Problem.objects.create(course='BCA', semester=3, week=2, problemNumber='P1',
+                                                           description='Problem 3')]
+
+        self.assertIsNone(SyncBatch([student]).sync_state(student, group_problems_by_week(problems))['head_sha'])
+
+    def test_failed_commit_lookup_keeps_the_head_unrecorded(self):
+        student = create_student(1)
+        snapshot = week_snapshot(student.username, 'head1', ['P1.c'])
+        snapshot['weeks'][1]['commits'] = None
+        batch = SyncBatch([student])
+
+        batch.add(student, self.problems_by_week, snapshot)
+        batch.commit()
+
+        self.assertIsNone(RepositorySyncState.objects.get(student=student).head_sha)
+        self.assertIsNone(batch.sync_state(student, self.problems_by_week)['head_sha'])
+
+
+class FakeGitHub:
+    """
+    Stands in for a `GitHubClient`, answering from a dictionary of URL paths (relative to the repository)
+    to JSON bodies or strings, and recording the requested URLs.
+    """
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.requested = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.requested.append(url)
+        path = url.split('/repos/octo-student/BCALab3/', 1)[1]
+        if path not in self.answers:
+            return github_response(404)
+        body = self.answers[path]
+        return github_response(200, body.encode() if isinstance(body, str) else json.dumps(body).encode())
+
+
+class FetchSnapshotTests(TestCase):
+    """
+    `fetch_snapshot` stops after the HEAD request when nothing moved, reads the week folders from one tree listing
+    and only asks for the commits of changed folders.
+    """
+
+    def setUp(self):
+        self.student = Student(username='octo-student', repo_name='BCALab3')
+        self.github = FakeGitHub({
+            'commits/HEAD': 'head2',
+            'git/trees/head2?recursive=1': {'truncated': False, 'tree': [
+                {'path': 'README.md', 'type': 'blob', 'sha': 'r'},
+                {'path': 'Week1', 'type': 'tree', 'sha': 'tree1'},
+                {'path': 'Week1/P1.c', 'type': 'blob', 'sha': 'a'},
+                {'path': 'Week2', 'type': 'tree', 'sha': 'tree2'},
+                {'path': 'Week2/P1.py', 'type': 'blob', 'sha': 'b'},
+                {'path': 'Week2/notes/P2.py', 'type': 'blob', 'sha': 'c'},
+            ]},
+            'commits?path=Week2&per_page=1': [{'sha': 'head2', 'commit': {'committer': {'date': '2024-10-01T10:00:00Z'}}}],
+        })
+
+    def test_unchanged_head_needs_a_single_request(self):
+        snapshot = fetch_snapshot(self.github, self.student, [1, 2], {'head_sha': 'head2', 'tree_shas': {}})
+
+        self.assertEqual(snapshot, {'head_sha': 'head2', 'unchanged': True})
+        self.assertEqual(len(self.github.requested), 1)
+
+    def test_manifest_comes_from_one_tree_listing(self):
+        snapshot = fetch_snapshot(self.github, self.student, [1, 2, 3], {'head_sha': 'head1', 'tree_shas': {1: 'tree1'}})
+
+        self.assertEqual(set(snapshot['weeks']), {1, 2})
+        self.assertEqual([file['name'] for file in snapshot['weeks'][2]['files']], ['P1.py'])
+        self.assertNotIn('commits', snapshot['weeks'][1])  # The folder's tree did not change
+        self.assertEqual(snapshot['weeks'][2]['commits'][0]['sha'], 'head2')
+        self.assertEqual(len(self.github.requested), 3)
+
+    def test_missing_repository_gives_no_snapshot(self):
+        self.github.answers.clear()
+
+        self.assertIsNone(fetch_snapshot(self.github, self.student, [1], {'head_sha': None, 'tree_shas': {}}))
+
+
+class PriorityTests(TestCase):
+    """
+    The sync visits recently pushed and never synced students first, and the cohorts with the closest deadline.
+    """
+
+    def test_students_are_ordered_by_score(self):
+        now = timezone.now()
+        idle, pushed, never_synced = (create_student(number) for number in (1, 2, 3))
+        for student in (idle, pushed):
+            RepositorySyncState.objects.create(student=student, last_synced_at=now - timedelta(hours=1))
+        WeekCommit.objects.create(student=pushed, week_number=1, last_commit_time=now - timedelta(minutes=10))
+
+        order = prioritize([idle, pushed, never_synced], 'BCA', '3', now)
+
+        self.assertEqual(order, [pushed, never_synced, idle])
+
+    def test_ties_keep_id_order(self):
+        students = [create_student(number) for number in (1, 2, 3)]
+
+        self.assertEqual(prioritize(list(reversed(students)), 'BCA', '3'), students)
+
+    def test_cohorts_with_the_closest_deadline_come_first(self):
+        today = timezone.localdate()
+        LastDateOfWeek.objects.create(course='MCA', semester=1, week=1, last_date=today + timedelta(days=5))
+        LastDateOfWeek.objects.create(course='BCA', semester=5, week=1, last_date=today + timedelta(days=1))
+
+        shards = order_shards([('BCA', 3), ('MCA', 1), ('BCA', 5)])
+
+        self.assertEqual(shards, [('BCA', 5), ('MCA', 1), ('BCA', 3)])
+
+
+class StudentWeekProgressTests(TestCase):
+    """
+    The signal handlers keep `StudentWeekProgress` current when rows are written one at a time.
+    """
+
+    def setUp(self):
+        self.student = create_student(1)
+        self.problems = [Problem.objects.create(course='BCA', semester=3, week=1, problemNumber=f'P{number}',
+                                                description=f'Problem {number}') for number in (1, 2)]
+
+    def progress(self, week=1):
+        return StudentWeekProgress.objects.get(student=self.student, week_number=week)
+
+    def test_new_problem_and_completion_update_the_counts(self):
+        self.assertEqual((self.progress().problems_solved, self.progress().total_problems), (0, 2))
+
+        ProblemCompletion.objects.create(student=self.student, problem=self.problems[0], is_completed=True)
+
+        self.assertEqual(self.progress().problems_solved, 1)
+
+    def test_commit_after_the_deadline_is_late(self):
+        LastDateOfWeek.objects.create(course='BCA', semester=3, week=1, last_date=timezone.localdate())
+        self.assertIsNone(self.progress().is_late)
+
+        WeekCommit.objects.create(student=self.student, week_number=1,
+                                  last_commit_time=timezone.now() + timedelta(days=2), last_commit_hash='abc')
+
+        self.assertTrue(self.progress().committed)
+        self.assertTrue(self.progress().is_late)
+
+    def test_week_without_problems_loses_its_rows(self):
+        for problem in self.problems:
+            problem.delete()
+
+        self.assertFalse(StudentWeekProgress.objects.filter(student=self.student).exists())
+
+    def test_cohort_change_moves_the_rows(self):
+        Problem.objects.create(course='MCA', semester=1, week=4, problemNumber='P1', description='Problem')
+        self.student.course, self.student.semester = 'MCA', '1'
+        self.student.save()
+
+        self.assertEqual(list(StudentWeekProgress.objects.filter(student=self.student)
+                              .values_list('week_number', flat=True)), [4])
+
+    def test_problem_moved_to_another_cohort_leaves_the_old_one(self):
+        other = create_student(2, course='MCA', semester='1')
+        moved = self.problems[1]
+        moved.course, moved.semester = 'MCA', 1
+        moved.save()
+
+        self.assertEqual(self.progress().total_problems, 1)
+        self.assertEqual(StudentWeekProgress.objects.get(student=other, week_number=1).total_problems, 1)
+
+    def test_refresh_cohort_repairs_bulk_updates(self):
+        completion = ProblemCompletion.objects.create(student=self.student, problem=self.problems[0], is_completed=True)
+        ProblemCompletion.objects.filter(pk=completion.pk).update(is_completed=False)
+
+        refresh_cohort('BCA', '3')
+
+        self.assertEqual(self.progress().problems_solved, 0)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ReportCacheTests(TestCase):
+    """
+    Cached reports are built once per data version, and a committed change bumps its cohort's version.
+    """
+
+    def setUp(self):
+        caches['reports'].clear()
+        self.student = create_student(1)
+        self.problem = Problem.objects.create(course='BCA', semester=3, week=1, problemNumber='P1',
+                                              description='Problem 1')
+
+    def test_report_is_built_once_per_version(self):
+        build = mock.Mock(return_value={'students': 1})
+
+        cached_report('class', build, 'BCA', 3)
+        self.assertEqual(cached_report('class', build, 'BCA', 3), {'students': 1})
+        build.assert_called_once()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProblemCompletion.objects.create(student=self.student, problem=self.problem, is_completed=True)
+        cached_report('class', build, 'BCA', 3)
+
+        self.assertEqual(build.call_count, 2)
+
+    def test_change_bumps_its_cohort_and_the_global_version(self):
+        versions = {cohort: data_version(*cohort) for cohort in (('BCA', 3), ('MCA', 1), (None, None))}
+
+        with self.captureOnCommitCallbacks(execute=True):
+            WeekCommit.objects.create(student=self.student, week_number=1, last_commit_hash='abc')
+
+        self.assertNotEqual(data_version('BCA', 3), versions[('BCA', 3)])
+        self.assertNotEqual(data_version(), versions[(None, None)])
+        self.assertEqual(data_version('MCA', 1), versions[('MCA', 1)])
+
+    def test_moves_bump_the_cohort_left_and_the_cohort_joined(self):
+        for move in ('problem', 'student'):
+            with self.subTest(move):
+                versions = {cohort: data_version(*cohort) for cohort in (('BCA', 3), ('MCA', 1))}
+                moved = self.problem if move == 'problem' else self.student
+                moved.course, moved.semester = ('MCA', 1) if moved.course == 'BCA' else ('BCA', 3)
+
+                with self.captureOnCommitCallbacks(execute=True):
+                    moved.save()
+
+                self.assertNotEqual(data_version('BCA', 3), versions[('BCA', 3)])
+                self.assertNotEqual(data_version('MCA', 1), versions[('MCA', 1)])
+
+    def test_version_is_kept_until_the_transaction_commits(self):
+        version = data_version('BCA', 3)
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            ProblemCompletion.objects.create(student=self.student, problem=self.problem, is_completed=True)
+            self.assertEqual(data_version('BCA', 3), version)
+
+        self.assertTrue(callbacks)
+
+    def test_export_is_written_once_per_version(self):
+        write = mock.Mock(side_effect=lambda file: file.write(b'csv'))
+        export_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(export_dir.cleanup)
+
+        with override_settings(REPORT_EXPORT_DIR=export_dir.name):
+            path = cached_export('class', 'csv', write, 'BCA', 3)
+            self.assertEqual(cached_export('class', 'csv', write, 'BCA', 3), path)
+
+        write.assert_called_once()
+        with open(path, 'rb') as file:
+            self.assertEqual(file.read(), b'csv')
+
+
+@override_settings(GITHUB_SYNC_BACKEND='mirror')
+class SyncTelemetryTests(LocalGitRemoteMixin, GitHubCacheDirMixin, TestCase):
+    """
+    A shard synced through the mirror backend records what each student cost under its `SyncRun`.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.student = Student.objects.create(username='octo-student', enrollment_number='GK0001',
+                                              faculty_number='22BCA001', course='BCA', semester='3')
+        self.missing = create_student(2)
+        Problem.objects.create(course='BCA', semester=3, week=1, problemNumber='P1', description='Problem 1')
+        self.commit({'Week1/P1.c': 'int main() {}'}, 'Week 1')
+
+    def sync(self):
+        run = SyncRun.objects.create(kind='nightly')
+        summary = sync_shard('BCA', '3', concurrency=2, run_id=run.id)
+        return summary, {result.student_id: result for result in SyncStudentResult.objects.filter(run=run)}
+
+    def test_results_are_recorded_per_student(self):
+        summary, results = self.sync()
+
+        self.assertEqual((summary['students'], summary['rows_changed'], summary['errors']), (2, 2, []))
+        self.assertEqual(results[self.student.pk].rows_changed, 2)
+        self.assertEqual(results[self.student.pk].http_calls, 1)
+        self.assertEqual(results[self.missing.pk].rows_changed, 0)
+        self.assertTrue(ProblemCompletion.objects.get(student=self.student).is_completed)
+
+    def test_second_run_finds_the_repository_unchanged(self):
+        self.sync()
+
+        summary, results = self.sync()
+
+        self.assertEqual(summary['unchanged'], 1)
+        self.assertTrue(results[self.student.pk].unchanged)
+        self.assertEqual(results[self.student.pk].rows_changed, 0)
+
+
+class RequestStatsTests(TestCase):
+    """
+    The latency statistics shared by the sync's worker threads.
+    """
+
+    def test_summary_percentiles(self):
+        stats = RequestStats()
+        for milliseconds in range(1, 101):
+            stats.record(milliseconds / 1000, size=10, endpoint=endpoint_of(f"{API_ROOT}/repos/octo/BCALab3/commits/HEAD"))
+
+        summary = stats.summary()
+
+        self.assertEqual(summary['count'], 100)
+        self.assertAlmostEqual(summary['p50_ms'], 51)
+        self.assertAlmostEqual(summary['p95_ms'], 95)
+        self.assertAlmostEqual(summary['max_ms'], 100)
+        self.assertEqual(summary['bytes'], 1000)
+        self.assertEqual(summary['endpoints']['api.github.com/repos/:owner/:repo/commits']['count'], 100)
+
+    def test_tally_counts_the_current_thread_only(self):
+        stats = RequestStats(max_samples=10)
+        with stats.tally() as counters:
+            stats.record(0.1, size=5)
+            other = threading.Thread(target=stats.record, args=(0.2,), kwargs={'size': 7})
+            other.start()
+            other.join()
+
+        self.assertEqual(counters, {'http_calls': 1, 'bytes': 5, 'cache_hits': 0})
+        self.assertEqual(stats.summary()['count'], 2)
@@ -8,4 +8,5 @@ urlpatterns = [
     path('api/get_weeks/', views.get_weeks, name='get_weeks'),
     path('api/get_problems/', views.get_problems, name='get_problems'),
     path('api/get_problem_details/', views.get_problem_details, name='get_problem_details'),
+    path('webhooks/github/', views.github_webhook, name='github_webhook'),
 ]
\ No newline at end of file
@@ -1,11 +1,18 @@
+import hashlib
+import hmac
+import json
+from django.conf import settings
 from django.contrib import messages
 from django.http import JsonResponse
-from django.views.decorators.http import require_GET
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
 from django.shortcuts import render, get_object_or_404, redirect
 from LabTrackerAMU.decorators import faculty_required
 from faculty.models import FacultyActivity
+from students.models import Student
 from .models import Problem
 from .forms import ProblemForm
+from .sync import apply_push, group_problems_by_week
 
 
 def add_problem(request):
@@ -265,3 +272,58 @@ def edit_problem(request):
 
     # Render the edit problem page with the form and the problem details
     return render(request, 'problems/editproblem.html', {'form': form, 'problem': problem})
+
+
+@csrf_exempt
+@require_POST
+def github_webhook(request):
+    """
+    Receives GitHub `push` events for student repositories and updates only the pushed student's records.
+
+    GitHub signs every delivery with the webhook secret; the `X-Hub-Signature-256` header must match an
+    HMAC-SHA256 of the raw body computed with `settings.GITHUB_WEBHOOK_SECRET`, otherwise the delivery is
+    rejected. The repository owner and name are mapped to `Student.username` and `Student.repo_name`, and the
+    added, modified and removed file lists of the pushed commits are applied to the student's
+    `ProblemCompletion` and `WeekCommit` rows (see `problems.sync.apply_push`). No call is made to GitHub,
+    so recorded payloads can be replayed locally.
+
+    Only pushes to the repository's default branch are applied. `ping` events are acknowledged and every
+    other event is ignored.
+
+    Returns:
+        JsonResponse: `{"rows_changed": n}` for an applied push, `{"ignored": reason}` for an ignored delivery,
+        or an error with status 403 (bad signature) or 400 (malformed payload).
+    """
+    secret = settings.GITHUB_WEBHOOK_SECRET
+    signature = request.headers.get('X-Hub-Signature-256', '')
+    expected = 'sha256=' + hmac.new(secret.encode(), request.body, hashlib.sha256).hexdigest() if secret else None
+    if not expected or not hmac.compare_digest(signature, expected):
+        return JsonResponse({'error': 'Invalid signature'}, status=403)
+
+    event = request.headers.get('X-GitHub-Event')
+    if event == 'ping':
+        return JsonResponse({'success': 'pong'})
+    if event != 'push':
+        return JsonResponse({'ignored': f'Unsupported event {event}'})
+
+    try:
+        payload = json.loads(request.body)
+        repository = payload['repository']
+        owner = repository['owner'].get('login') or repository['owner'].get('name')
+        repo_name = repository['name']
+        ref = payload['ref']
+        if not all(isinstance(value, str) and value for value in (owner, repo_name, ref)):
+            raise ValueError('owner, name and ref must be non-empty strings')
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return JsonResponse({'error': 'Malformed push payload'}, status=400)
+
+    if payload.get('deleted') or ref != f"refs/heads/{repository.get('default_branch')}":
+        return JsonResponse({'ignored': f'Push to {ref} is not on the default branch'})
+
+    student = Student.objects.filter(username__iexact=owner, repo_name__iexact=repo_name).first()
+    if student is None:
+        return JsonResponse({'ignored': f"No student owns {owner}/{repo_name}"})
+
+    problems_by_week = group_problems_by_week(Problem.objects.filter(course=student.course, semester=student.semester))
+    rows_changed = apply_push(student, problems_by_week, payload)
+    return JsonResponse({'rows_changed': rows_changed})
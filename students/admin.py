@@ -22,13 +22,13 @@ class StudentAdmin(admin.ModelAdmin):
 
     # Defines which fields will be displayed in the admin list view
     list_display = ('id', 'username', 'enrollment_number', 'faculty_number',
-                    'course', 'semester', 'repo_name', 'date_of_birth')
+                    'course', 'semester', 'repo_name', 'date_of_birth', 'github_status')
 
     # Adds search functionality for the specified fields in the admin interface
     search_fields = ('username', 'email', 'enrollment_number')
 
     # Add filtering by course and semester
-    list_filter = ('course', 'semester')
+    list_filter = ('course', 'semester', 'github_status')
 
     # Sorting based on faculty_number
     ordering = ('faculty_number',)
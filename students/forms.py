@@ -1,7 +1,7 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
+from .github import MISSING, UNKNOWN, check_account
 from .models import Student
-import requests
 
 
 class StudentSignUpForm(UserCreationForm):
@@ -43,44 +43,56 @@ class StudentSignUpForm(UserCreationForm):
         """
         Overrides the default clean method to perform additional validation.
 
-        - Checks if the GitHub username exists using the GitHub API.
+        - Checks if the GitHub username exists.
         - Checks if a repository exists on GitHub for the selected course and semester.
-        If either the username or repository does not exist, appropriate validation
-        errors are raised.
+        Both lookups run concurrently through the cached checker of `students.github`. If either the username
+        or repository does not exist, appropriate validation errors are raised. If GitHub does not answer
+        within `GITHUB_SIGNUP_TIMEOUT` seconds, the signup is accepted provisionally and the account is
+        verified later by the `verify_github_accounts` command.
 
         Returns:
             dict: The cleaned data after validation.
         """
         cleaned_data = super().clean()
+        self.github_pending = False
 
         # Fetch the necessary fields from the cleaned data
         username = cleaned_data.get('username')
         course = cleaned_data.get('course')
         semester = cleaned_data.get('semester')
 
+        if not username:
+            return cleaned_data
+
         # Remove any periods from the course code for repository name formatting
         formatted_course = course.replace('.', '') if course else None
-
-        # Validate the GitHub username
-        if username:
-            url = f"https://api.github.com/users/{username}"
-            response = requests.get(url)
-            if response.status_code != 200:
-                # If the GitHub user does not exist, raise a validation error
-                self.add_error('username', 'GitHub user does not exist')
-                return cleaned_data
-
-        # Validate if the repository exists for the selected course and semester
-        if username and formatted_course and semester:
-            repo_name = f"{formatted_course}Lab{semester}"
-            url = f"https://api.github.com/repos/{username}/{repo_name}"
-            response = requests.get(url)
-            if response.status_code != 200:
-                # If the repository does not exist, raise a validation error
-                self.add_error('username', f"GitHub repository '{repo_name}' does not exist.")
+        repo_name = f"{formatted_course}Lab{semester}" if formatted_course and semester else None
+
+        user_status, repo_status = check_account(username, repo_name)
+        if user_status == MISSING:
+            # If the GitHub user does not exist, raise a validation error
+            self.add_error('username', 'GitHub user does not exist')
+        elif repo_status == MISSING:
+            # If the repository does not exist, raise a validation error
+            self.add_error('username', f"GitHub repository '{repo_name}' does not exist.")
+        elif UNKNOWN in (user_status, repo_status):
+            self.github_pending = True
 
         return cleaned_data
 
+    def save(self, commit=True):
+        """
+        Saves the student, marking their GitHub account as pending verification if it could not be
+        confirmed during validation.
+        """
+        student = super().save(commit=False)
+        if getattr(self, 'github_pending', False):
+            student.github_status = Student.GITHUB_PENDING
+        if commit:
+            student.save()
+            self._save_m2m()
+        return student
+
 
 class EnrollmentFacultyForm(forms.Form):
     """
@@ -0,0 +1,94 @@
+"""
+Cached checks of whether GitHub accounts and repositories exist, used at signup.
+
+Every lookup goes through the shared `GitHubClient` (see `problems.github.shared_client`), so it is
+authenticated with the configured tokens instead of counting against the 60 requests per hour GitHub
+grants an unauthenticated IP, and a GitHub outage trips its circuit breaker instead of stalling signups.
+When every token is exhausted the client gives up after `GITHUB_WEB_TOKEN_WAIT` seconds and the lookup
+answers `UNKNOWN` rather than waiting for the rate limit to reset.
+Answers are kept in Django's cache: an existing account for `GITHUB_EXISTS_TTL` seconds and a missing one
+for `GITHUB_MISSING_TTL` seconds, so a student correcting a typo is not locked out for long. An answer
+GitHub could not give (network error, timeout, rate limit) is never cached.
+"""
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+from problems.github import API_ROOT, shared_client
+
+EXISTS = 'exists'
+MISSING = 'missing'
+UNKNOWN = 'unknown'
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='github-exists')
+
+
+def _cache_key(path):
+    return f"github-exists:{path.lower()}"
+
+
+def _lookup(path):
+    """
+    Asks GitHub whether `API_ROOT/path` exists and caches a definite answer.
+
+    :return: `EXISTS`, `MISSING` or `UNKNOWN`.
+    """
+    try:
+        response = shared_client().get(f"{API_ROOT}/{path}", timeout=settings.GITHUB_SIGNUP_TIMEOUT * 2)
+    except requests.exceptions.RequestException:
+        return UNKNOWN
+
+    if response.status_code == 200:
+        cache.set(_cache_key(path), EXISTS, settings.GITHUB_EXISTS_TTL)
+        return EXISTS
+    if response.status_code == 404:
+        cache.set(_cache_key(path), MISSING, settings.GITHUB_MISSING_TTL)
+        return MISSING
+    return UNKNOWN
+
+
+def check_paths(paths, timeout=None):
+    """
+    Looks up several GitHub API paths (e.g. `users/<name>`) concurrently, answering from the cache when
+    possible.
+
+    Lookups still running when the timeout expires are reported as `UNKNOWN`; they keep running in the
+    background and cache their answer for the next check.
+
+    :param paths: API paths relative to `API_ROOT`.
+    :param timeout: Seconds to wait for GitHub. Defaults to `GITHUB_SIGNUP_TIMEOUT`.
+    :return: Dictionary mapping each path to `EXISTS`, `MISSING` or `UNKNOWN`.
+    """
+    cached = cache.get_many([_cache_key(path) for path in paths])
+    results = {path: cached[_cache_key(path)] for path in paths if _cache_key(path) in cached}
+
+    futures = {path: _executor.submit(_lookup, path) for path in paths if path not in results}
+    if futures:
+        wait(futures.values(), timeout=settings.GITHUB_SIGNUP_TIMEOUT if timeout is None else timeout)
+    for path, future in futures.items():
+        results[path] = future.result() if future.done() else UNKNOWN
+    return results
+
+
+def check_account(username, repo_name=None, timeout=None):
+    """
+    Checks a GitHub user and, optionally, one of their repositories, with both lookups running concurrently.
+
+    :param username: The GitHub username.
+    :param repo_name: The repository name, or None to only check the user.
+    :param timeout: Seconds to wait for GitHub. Defaults to `GITHUB_SIGNUP_TIMEOUT`.
+    :return: Tuple of the user's and the repository's status (`EXISTS`, `MISSING` or `UNKNOWN`); the
+             repository status is None when no repository was asked for.
+    """
+    user_path = f"users/{username}"
+    repo_path = f"repos/{username}/{repo_name}" if repo_name else None
+    results = check_paths([path for path in (user_path, repo_path) if path], timeout)
+
+    user_status = results[user_path]
+    repo_status = results[repo_path] if repo_path else None
+    if repo_status == EXISTS:
+        # A repository can only exist if its owner does.
+        user_status = EXISTS
+    return user_status, repo_status
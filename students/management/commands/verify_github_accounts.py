@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from students.github import EXISTS, MISSING, check_account
+from students.models import Student
+
+
+class Command(BaseCommand):
+    """
+    Verifies the GitHub accounts of students whose signup was accepted provisionally because GitHub did not
+    answer in time.
+
+    Each pending student is marked 'verified' once both their user and repository are found, or 'invalid' if
+    either is missing. Students GitHub still cannot answer for stay pending until the next run. The scheduler
+    runs this command every ten minutes.
+    """
+
+    help = 'Verify the GitHub accounts of students signed up provisionally'
+
+    def handle(self, *args, **kwargs):
+        """
+        Checks every pending student and prints how many were verified, rejected or left pending.
+        """
+        counts = {Student.GITHUB_VERIFIED: 0, Student.GITHUB_INVALID: 0, Student.GITHUB_PENDING: 0}
+
+        for student in Student.objects.filter(github_status=Student.GITHUB_PENDING):
+            # Background checks can afford to wait for GitHub's answer.
+            user_status, repo_status = check_account(student.username, student.repo_name, timeout=30)
+            if MISSING in (user_status, repo_status):
+                status = Student.GITHUB_INVALID
+                self.stdout.write(self.style.WARNING(
+                    f"{student.username}: GitHub repository '{student.repo_name}' not found"
+                ))
+            elif user_status == repo_status == EXISTS:
+                status = Student.GITHUB_VERIFIED
+            else:
+                status = Student.GITHUB_PENDING
+
+            if status != Student.GITHUB_PENDING:
+                Student.objects.filter(pk=student.pk).update(github_status=status)
+            counts[status] += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{counts[Student.GITHUB_VERIFIED]} verified, {counts[Student.GITHUB_INVALID]} not found, "
+            f"{counts[Student.GITHUB_PENDING]} still pending"
+        ))
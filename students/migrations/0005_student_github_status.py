@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 16:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0004_alter_student_groups_alter_student_user_permissions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='github_status',
+            field=models.CharField(choices=[('verified', 'Verified'), ('pending', 'Pending verification'), ('invalid', 'Not found on GitHub')], default='verified', max_length=10),
+        ),
+    ]
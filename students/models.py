@@ -1,9 +1,9 @@
 import uuid
 from datetime import timezone
-import requests
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
+from students.github import EXISTS, UNKNOWN, check_account
 
 
 # Custom User model that extends Django's AbstractUser to represent a Student.
@@ -19,6 +19,8 @@ class Student(AbstractUser):
         semester (str): The current semester of the student.
         repo_name (str): The name of the GitHub repository automatically generated based on the course and semester.
         date_of_birth (date): Date of birth of the student.
+        github_status (str): Whether the GitHub account and repository were confirmed at signup, or are
+            still 'pending' because GitHub did not answer in time (see `verify_github_accounts`).
     """
 
     enrollment_number = models.CharField(max_length=11, unique=True)
@@ -53,6 +55,18 @@ class Student(AbstractUser):
     # Optional field for the date of birth
     date_of_birth = models.DateField(blank=True, null=True)
 
+    # Choices for the GitHub verification status
+    GITHUB_VERIFIED = 'verified'
+    GITHUB_PENDING = 'pending'
+    GITHUB_INVALID = 'invalid'
+    GITHUB_STATUS_CHOICES = [
+        (GITHUB_VERIFIED, 'Verified'),
+        (GITHUB_PENDING, 'Pending verification'),
+        (GITHUB_INVALID, 'Not found on GitHub'),
+    ]
+
+    github_status = models.CharField(max_length=10, choices=GITHUB_STATUS_CHOICES, default=GITHUB_VERIFIED)
+
     def __str__(self):
         """
         Returns the username of the student as the string representation of the object.
@@ -82,28 +96,27 @@ class Student(AbstractUser):
 
     def github_username_exists(self):
         """
-        Checks if the student's GitHub username exists using the GitHub API.
+        Checks if the student's GitHub username exists, using the cached checker of `students.github`.
 
         Returns:
-            bool: True if the GitHub username exists, False otherwise.
+            bool or None: True if the GitHub username exists, False if it does not, None if GitHub could
+            not be asked.
         """
-        url = f"https://api.github.com/users/{self.username}"
-        response = requests.get(url)
-        return response.status_code == 200
+        status, _ = check_account(self.username)
+        return None if status == UNKNOWN else status == EXISTS
 
     def github_repository_exists(self):
         """
-        Checks if the GitHub repository for the student exists using the GitHub API.
+        Checks if the GitHub repository for the student exists, using the cached checker of `students.github`.
 
         The repository name is constructed based on the student's course and semester.
 
         Returns:
-            bool: True if the GitHub repository exists, False otherwise.
+            bool or None: True if the GitHub repository exists, False if it does not, None if GitHub could
+            not be asked.
         """
-        repo_name = f"{self.course}Lab{self.semester}"
-        url = f"https://api.github.com/repos/{self.username}/{repo_name}"
-        response = requests.get(url)
-        return response.status_code == 200
+        _, status = check_account(self.username, f"{self.course}Lab{self.semester}")
+        return None if status == UNKNOWN else status == EXISTS
 
 
 class PasswordResetToken(models.Model):
@@ -1,3 +1,94 @@
-from django.test import TestCase
+import io
+import threading
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from problems.github import TokensExhausted
+from students import github
+from students.models import Student
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'students-tests'},
+}
+
+
+def github_answer(status_code):
+    response = requests.models.Response()
+    response.status_code = status_code
+    return response
+
+
+@override_settings(CACHES=LOCMEM_CACHES, GITHUB_SIGNUP_TIMEOUT=5)
+class CheckAccountTests(TestCase):
+    """
+    The signup checker answers from GitHub, caches definite answers, and reports UNKNOWN without waiting
+    when no GitHub token is available.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_definite_answers_are_cached(self):
+        client = mock.Mock(get=mock.Mock(side_effect=lambda url, **kwargs: github_answer(
+            200 if url.endswith('users/octo-student') else 404)))
+
+        with mock.patch.object(github, 'shared_client', return_value=client):
+            self.assertEqual(github.check_account('octo-student', 'BCALab3'), (github.EXISTS, github.MISSING))
+            self.assertEqual(github.check_account('octo-student', 'BCALab3'), (github.EXISTS, github.MISSING))
+
+        self.assertEqual(client.get.call_count, 2)
+
+    def test_exhausted_tokens_answer_unknown(self):
+        client = mock.Mock(get=mock.Mock(side_effect=TokensExhausted('No GitHub token available')))
+
+        with mock.patch.object(github, 'shared_client', return_value=client):
+            self.assertEqual(github.check_account('octo-student', 'BCALab3'), (github.UNKNOWN, github.UNKNOWN))
+
+        self.assertIsNone(cache.get(github._cache_key('users/octo-student')))
+
+    def test_slow_lookup_answers_unknown_and_caches_later(self):
+        answered = threading.Event()
+        release = threading.Event()
+
+        def slow_get(url, **kwargs):
+            release.wait(5)
+            return github_answer(200)
+
+        client = mock.Mock(get=mock.Mock(side_effect=slow_get))
+        # Django's cache handle is per thread, so the background lookup is observed through a stand-in
+        stand_in = mock.Mock(get_many=mock.Mock(return_value={}), set=mock.Mock(side_effect=lambda *args: answered.set()))
+        with mock.patch.object(github, 'shared_client', return_value=client), \
+                mock.patch.object(github, 'cache', stand_in):
+            self.assertEqual(github.check_paths(['users/octo-student'], timeout=0.05),
+                             {'users/octo-student': github.UNKNOWN})
+            release.set()
+            self.assertTrue(answered.wait(5))
+
+        stand_in.set.assert_called_once_with(github._cache_key('users/octo-student'), github.EXISTS,
+                                             github.settings.GITHUB_EXISTS_TTL)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class VerifyGitHubAccountsTests(TestCase):
+    """
+    Students accepted provisionally are verified, rejected, or left pending while GitHub cannot answer.
+    """
+
+    def test_pending_students_are_resolved(self):
+        answers = {'found': (github.EXISTS, github.EXISTS), 'norepo': (github.EXISTS, github.MISSING),
+                   'slow': (github.UNKNOWN, github.UNKNOWN)}
+        for number, username in enumerate(answers, start=1):
+            Student.objects.create(username=username, enrollment_number=f'GK{number:04}', faculty_number=f'22BCA{number:03}',
+                                   course='BCA', semester='3', github_status=Student.GITHUB_PENDING)
+
+        with mock.patch('students.management.commands.verify_github_accounts.check_account',
+                        side_effect=lambda username, repo_name, timeout: answers[username]):
+            call_command('verify_github_accounts', stdout=io.StringIO())
+
+        self.assertEqual(dict(Student.objects.values_list('username', 'github_status')), {
+            'found': Student.GITHUB_VERIFIED, 'norepo': Student.GITHUB_INVALID, 'slow': Student.GITHUB_PENDING,
+        })
@@ -8,10 +8,10 @@ from docx.enum.table import WD_TABLE_ALIGNMENT, WD_ALIGN_VERTICAL
 from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_PARAGRAPH_ALIGNMENT
 from LabTrackerAMU import settings
 from LabTrackerAMU.decorators import student_required
-from faculty.models import LastDateOfWeek
 from instructor.models import SelectedStudent
 from .forms import StudentSignUpForm, EnrollmentFacultyForm, DateOfBirthForm, PasswordResetForm
-from problems.models import Problem, ProblemCompletion, WeekCommit
+from problems.github import shared_client
+from problems.models import Problem, ProblemCompletion, StudentWeekProgress
 from django.http import HttpResponse, JsonResponse
 from docx import Document
 from io import BytesIO
@@ -155,62 +155,27 @@ def student_dashboard(request):
     # Fetch the student's completion records for the filtered problems
     problem_completions = ProblemCompletion.objects.filter(student=student, problem__in=problems).order_by('problem')
 
-    # Fetch WeekCommit entries for the student, ordered by week number
-    week_commits = WeekCommit.objects.filter(student=student).order_by('week_number')
-
-    # Convert week commit data into a dictionary for easy access by week number
-    week_commit_data = {week_commit.week_number: week_commit for week_commit in week_commits}
-
-    # Fetch deadlines (last dates) for each week of the student's course and semester
-    week_last_dates = LastDateOfWeek.objects.filter(course=course, semester=semester)
-
-    # Store week deadlines in a dictionary for quick lookup by week number
-    week_last_date_data = {week_last.week: week_last.last_date for week_last in week_last_dates}
-
-    # Initialize dictionaries to track weekly and overall progress
-    weekly_progress = {}
-    overall_progress = {'total': len(problems), 'completed': 0}
+    # Ids of the problems the student completed, read once for the completion list
+    completed_ids = set(problem_completions.filter(is_completed=True).values_list('problem_id', flat=True))
+
+    # Weekly progress is read from the precomputed `StudentWeekProgress` rows, one per week with problems
+    weekly_progress = {
+        row.week_number: {
+            'total': row.total_problems,
+            'completed': row.problems_solved,
+            'last_commit_time': row.last_commit_time,
+            'last_commit_hash': row.last_commit_hash,
+            'last_date': row.last_date or 'No Deadline'  # Provide deadline if available
+        }
+        for row in StudentWeekProgress.objects.filter(student=student).order_by('week_number')
+    }
+    overall_progress = {
+        'total': len(problems),
+        'completed': sum(week['completed'] for week in weekly_progress.values())
+    }
 
     # List to store the completion status of each problem for rendering purposes
-    completion_list = []
-
-    # Loop through each problem and calculate the student's progress
-    for prob in problems:
-        week = prob.week
-
-        # Initialize weekly progress if it hasn't been done for the current week
-        if week not in weekly_progress:
-            weekly_progress[week] = {
-                'total': 0,
-                'completed': 0,
-                'last_commit_time': None,
-                'last_commit_hash': None,
-                'last_date': week_last_date_data.get(week, 'No Deadline')  # Provide deadline if available
-            }
-
-        # Increment the total number of problems for the current week
-        weekly_progress[week]['total'] += 1
-
-        # Check if the current problem is completed by the student
-        completion = problem_completions.filter(problem=prob).first()
-        is_completed = completion and completion.is_completed
-
-        # Append the completion status for the current problem
-        completion_list.append({
-            'problem_id': prob.id,
-            'is_completed': is_completed
-        })
-
-        # If the problem is completed, update weekly and overall progress
-        if is_completed:
-            weekly_progress[week]['completed'] += 1
-            overall_progress['completed'] += 1
-
-        # If commit data is available for the week, update the last commit information
-        if week in week_commit_data:
-            week_commit = week_commit_data[week]
-            weekly_progress[week]['last_commit_time'] = week_commit.last_commit_time
-            weekly_progress[week]['last_commit_hash'] = week_commit.last_commit_hash
+    completion_list = [{'problem_id': prob.id, 'is_completed': prob.id in completed_ids} for prob in problems]
 
     # Calculate the overall completion percentage (avoid division by zero)
     overall_progress['percentage'] = (
@@ -417,7 +382,7 @@ def generate_problem_doc(request):
 
 def fetch_url_content(url):
     """
-    Fetches the content of a given URL using an HTTP GET request.
+    Fetches the content of a given URL through the shared GitHub client, which applies timeouts and retries.
 
     Args:
         url (str): The URL from which to fetch the content.
@@ -430,7 +395,7 @@ def fetch_url_content(url):
         None: All exceptions are caught and handled within the function.
     """
     try:
-        response = requests.get(url)
+        response = shared_client().get(url)
         response.raise_for_status()
         return response.text
     except requests.exceptions.RequestException:
@@ -439,7 +404,7 @@ def fetch_url_content(url):
 
 def fetch_image(url):
     """
-    Fetches an image from a given URL using an HTTP GET request.
+    Fetches an image from a given URL through the shared GitHub client, which applies timeouts and retries.
 
     Args:
         url (str): The URL of the image to be fetched.
@@ -451,7 +416,7 @@ def fetch_image(url):
     """
 
     try:
-        response = requests.get(url)
+        response = shared_client().get(url)
         response.raise_for_status()
         image_data = BytesIO(response.content)
         image = Image.open(image_data)